@@ -0,0 +1,194 @@
+'''ASGI server.
+
+This file contains the class DeliveryAsgiApi, an asyncio-native
+version of the delivery fee end points that serves many concurrent
+keep-alive connections from a single process without a thread per request.
+It uses the same PricingContext as DeliveryApi. To serve it, run for example:
+uvicorn asgi:app --host 0.0.0.0 --port 5000
+The environment variable DELIVERY_API_FEE_CONFIG is the path of the fee
+configuration file, like for DeliveryApi.
+'''
+import os
+from http import HTTPStatus
+from urllib.parse import parse_qs
+from utils import json_codec
+from utils.fee_config import FeeConfigWatcher, pricing_profiles_from_config
+from utils.pricing_context import (
+    BREAKDOWN_QUERY_VALUES, MAX_CONTENT_LENGTH, UNKNOWN_PROFILE_RESPONSE, PricingContextHolder
+)
+
+
+class DeliveryAsgiApi:
+    '''
+    Serves the delivery fee end points as an ASGI application.
+
+    ...
+
+    Attributes
+    ----------
+    pricing_context_holder: PricingContextHolder
+        Holds the pricing contexts that validate the request data
+        and calculate the delivery fees for each pricing profile
+    max_batch_size: int
+        The maximum number of orders accepted by /delivery-fee/batch
+    fee_config_watcher: FeeConfigWatcher | None
+        Reloads the fee configuration file, None when the default fees are used
+
+    Methods
+    -------
+    __call__(scope: dict, receive, send)
+        Handles one ASGI connection.
+    handle_request(
+        method: str, path: str, headers: list, body: bytes | None, query_string: bytes
+    )
+        Routes a request and returns the response body, HTTP status and extra headers.
+    '''
+
+    def __init__(self, max_batch_size: int = 1000, fee_config_path: str | None = None):
+        self.max_batch_size = max_batch_size
+        self.fee_config_watcher = None
+        if fee_config_path is None:
+            self.pricing_context_holder = PricingContextHolder(pricing_profiles_from_config(None))
+        else:
+            self.pricing_context_holder = PricingContextHolder(None)
+            self.fee_config_watcher = FeeConfigWatcher(
+                fee_config_path, self.pricing_context_holder, pricing_profiles_from_config
+            )
+            self.fee_config_watcher.reload(raise_errors=True)
+        # URL: function taking the pricing context, the decoded request JSON
+        # and the query parameters
+        self.routes = {
+            '/delivery-fee': lambda pricing_context, request_json, query: (
+                pricing_context.price_order(
+                    request_json,
+                    breakdown=query.get('breakdown', [''])[0].lower() in BREAKDOWN_QUERY_VALUES
+                )
+            ),
+            '/delivery-fee/batch': lambda pricing_context, request_json, query: (
+                pricing_context.price_orders(request_json, self.max_batch_size)
+            ),
+        }
+
+    async def __call__(self, scope: dict, receive, send):
+        '''Handles one ASGI connection.'''
+
+        if scope['type'] == 'lifespan':
+            await _handle_lifespan(receive, send, self.fee_config_watcher)
+            return
+        if scope['type'] != 'http':
+            return
+
+        response_dict, http_status, extra_headers = self.handle_request(
+            scope['method'], scope['path'], scope['headers'], await _receive_body(receive),
+            scope.get('query_string', b'')
+        )
+        response_body = json_codec.dumps(response_dict) + b'\n'
+        await send({
+            'type': 'http.response.start',
+            'status': http_status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(response_body)).encode()),
+                *extra_headers,
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': response_body})
+
+    def handle_request(
+            self, method: str, path: str, headers: list, body: bytes | None,
+            query_string: bytes = b''
+    ) -> tuple[dict, HTTPStatus, list]:
+        '''Routes a request and returns the response body, HTTP status and extra headers.
+
+        body is None when the request body was longer than MAX_CONTENT_LENGTH.
+        Responds the same way as DeliveryApi, including for unknown URLs,
+        wrong HTTP verbs, unknown pricing profiles and request bodies that
+        are not JSON or are too long, which are checked in the same order.
+        '''
+
+        route = self.routes.get(path)
+        if route is None:
+            return {'message': _NOT_FOUND_MESSAGE}, HTTPStatus.NOT_FOUND, []
+        if method != 'POST':
+            return {
+                'message': 'The method is not allowed for the requested URL.'
+            }, HTTPStatus.METHOD_NOT_ALLOWED, [(b'allow', b'OPTIONS, POST')]
+
+        headers = dict(headers)
+        profile_name = headers.get(b'x-pricing-profile')
+        pricing_context = self.pricing_context_holder.get(
+            None if profile_name is None else profile_name.decode('latin-1')
+        )
+        if pricing_context is None:
+            return (*UNKNOWN_PROFILE_RESPONSE, [])
+
+        content_type = headers.get(b'content-type', b'')
+        if content_type.split(b';')[0].strip() != b'application/json':
+            return {
+                'message': 'Did not attempt to load JSON data because the request '
+                           'Content-Type was not \'application/json\'.'
+            }, HTTPStatus.UNSUPPORTED_MEDIA_TYPE, []
+        if body is None:
+            return {
+                'message': 'The data value transmitted exceeds the capacity limit.'
+            }, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, []
+        try:
+            request_json = json_codec.loads(body)
+        except ValueError:
+            return {
+                'message': 'The browser (or proxy) sent a request that this server '
+                           'could not understand.'
+            }, HTTPStatus.BAD_REQUEST, []
+
+        response_dict, http_status = route(
+            pricing_context, request_json, parse_qs(query_string.decode('latin-1'))
+        )
+        return response_dict, http_status, [
+            (name.lower().encode(), value.encode())
+            for name, value in pricing_context.response_headers().items()
+        ]
+
+
+_NOT_FOUND_MESSAGE = (
+    'The requested URL was not found on the server. If you entered the URL manually '
+    'please check your spelling and try again.'
+)
+
+async def _receive_body(receive) -> bytes | None:
+    '''Receives the body of a request, or None if it is longer than MAX_CONTENT_LENGTH.
+
+    Stops receiving once the body is too long, so that a client can't make
+    the server buffer more than MAX_CONTENT_LENGTH bytes.
+    '''
+    chunks = []
+    body_length = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunk = message.get('body', b'')
+        body_length += len(chunk)
+        if body_length > MAX_CONTENT_LENGTH:
+            return None
+        chunks.append(chunk)
+        more_body = message.get('more_body', False)
+    return b''.join(chunks)
+
+async def _handle_lifespan(receive, send, fee_config_watcher: FeeConfigWatcher | None):
+    '''Handles the ASGI lifespan startup and shutdown events.
+
+    Starts and stops watching the fee configuration file, if there is one.
+    '''
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if fee_config_watcher is not None:
+                fee_config_watcher.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if fee_config_watcher is not None:
+                fee_config_watcher.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+app = DeliveryAsgiApi(fee_config_path=os.environ.get('DELIVERY_API_FEE_CONFIG'))
@@ -0,0 +1,47 @@
+'''Benchmark for the delivery fee calculation.
+
+Compares the per-call cost of applying the add_* methods one after
+another with the precomputed pricing plan of calculate_delivery_fee.
+
+Run from the root folder of the project:
+python3 -m benchmarks.bench_calculator
+'''
+from datetime import datetime, timezone
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.delivery_order import DeliveryOrder
+from benchmarks.harness import measure, print_results
+
+ORDERS = {
+    'small order': DeliveryOrder(
+        cart_value=790, delivery_distance=2235, number_of_items=4,
+        time=datetime(2024, 1, 15, 13, tzinfo=timezone.utc),
+    ),
+    'bulk order in Friday rush': DeliveryOrder(
+        cart_value=19999, delivery_distance=3000, number_of_items=13,
+        time=datetime(2024, 1, 19, 15, 10, tzinfo=timezone.utc),
+    ),
+}
+
+
+def main():
+    '''Runs the benchmarks and prints the results.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    for name, order in ORDERS.items():
+        print_results(name, {
+            'stepwise (before)': measure(
+                lambda order=order: delivery_fee_calculator.calculate_delivery_fee_stepwise(order),
+                number=100000
+            ),
+            'pricing plan (after)': measure(
+                lambda order=order: delivery_fee_calculator.calculate_delivery_fee(order),
+                number=100000
+            ),
+            'pricing plan with breakdown': measure(
+                lambda order=order: delivery_fee_calculator.calculate_delivery_fee_breakdown(order),
+                number=100000
+            ),
+        })
+
+
+if __name__ == '__main__':
+    main()
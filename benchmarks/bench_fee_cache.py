@@ -0,0 +1,74 @@
+'''Benchmark for the delivery fee cache.
+
+Compares calculating the fees of a stream of orders with the calculator
+and through a DeliveryFeeCache, when every order is a repeat of one of
+a few hundred baskets priced earlier in the same hour, when half of them
+are, and when none of them are.
+
+Run from the root folder of the project:
+python3 -m benchmarks.bench_fee_cache
+'''
+import random
+from datetime import datetime, timedelta, timezone
+from utils.delivery_fee_cache import DeliveryFeeCache
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.delivery_order import DeliveryOrder
+from benchmarks.harness import measure, print_results
+
+NUMBER_OF_ORDERS = 100000
+NUMBER_OF_BASKETS = 300
+
+
+def _orders(repeat_share: float, seed: int = 0) -> tuple[list, list]:
+    '''Returns orders of a few baskets priced first in an hour on a Monday afternoon,
+    and a stream of later orders in the hour of which repeat_share repeat one of the baskets.'''
+    randomizer = random.Random(seed)
+    hour_start = datetime(2024, 1, 15, 13, tzinfo=timezone.utc)
+
+    def random_basket() -> tuple:
+        return (
+            randomizer.randint(100, 25000), randomizer.randint(100, 8000),
+            randomizer.randint(1, 20)
+        )
+    baskets = [random_basket() for _ in range(NUMBER_OF_BASKETS)]
+    basket_orders = [DeliveryOrder(*basket, hour_start) for basket in baskets]
+    orders = [
+        DeliveryOrder(
+            *(randomizer.choice(baskets) if randomizer.random() < repeat_share else random_basket()),
+            hour_start + timedelta(seconds=randomizer.randrange(1, 3600))
+        )
+        for _ in range(NUMBER_OF_ORDERS)
+    ]
+    return basket_orders, orders
+
+def main():
+    '''Runs the benchmarks and prints the results.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    delivery_fee_calculator.compile_pricing_plan()
+
+    for repeat_share in (1.0, 0.5, 0.0):
+        basket_orders, orders = _orders(repeat_share)
+
+        def calculate(basket_orders=basket_orders, orders=orders):
+            delivery_fee_calculator.calculate_delivery_fees(basket_orders)
+            delivery_fee_calculator.calculate_delivery_fees(orders)
+
+        def calculate_with_cache(basket_orders=basket_orders, orders=orders):
+            # a new cache each time, so that only the baskets are cached before the stream
+            delivery_fee_cache = DeliveryFeeCache(delivery_fee_calculator)
+            delivery_fee_cache.calculate_delivery_fees(basket_orders)
+            delivery_fee_cache.calculate_delivery_fees(orders)
+
+        results = {
+            'calculator': measure(calculate, number=1),
+            'cache': measure(calculate_with_cache, number=1),
+        }
+        # per order rather than per stream of orders
+        for result in results.values():
+            result['best_us'] /= NUMBER_OF_BASKETS + NUMBER_OF_ORDERS
+            result['mean_us'] /= NUMBER_OF_BASKETS + NUMBER_OF_ORDERS
+        print_results(f'{repeat_share:.0%} repeated baskets, per order', results)
+
+
+if __name__ == '__main__':
+    main()
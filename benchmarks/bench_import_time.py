@@ -0,0 +1,82 @@
+'''Benchmark for the import time of the pricing core and the API.
+
+Measures how long a new Python process takes to import the pricing
+package, to import it and calculate its first delivery fee, and to
+import main and create a DeliveryApi, which is what a short-lived job
+or a new server worker pays before its first order.
+Each measurement runs in a fresh interpreter, so nothing is cached in
+memory, but the compiled bytecode on disk is, as in production.
+
+Run from the root folder of the project:
+python3 -m benchmarks.bench_import_time
+'''
+import json
+import subprocess
+import sys
+
+# modules that the pricing core must not import
+FRAMEWORK_MODULES = ('flask', 'flask_restful', 'werkzeug', 'marshmallow', 'numpy')
+# code run in a new interpreter to time a cold start, by benchmark name
+COLD_START_STATEMENTS = {
+    'import.pricing_core': 'import pricing',
+    # the first fee also compiles the pricing plan and the rush calendar of the year
+    'first_fee.pricing_core': (
+        'from datetime import datetime, timezone\n'
+        'import pricing\n'
+        'pricing.DeliveryFeeCalculator().calculate_delivery_fee(pricing.DeliveryOrder('
+        '790, 2235, 4, datetime.now(timezone.utc)))'
+    ),
+    'import.delivery_api': 'from main import DeliveryApi\nDeliveryApi()',
+}
+_TIMING_TEMPLATE = '''\
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'modules': sorted(sys.modules)}}))
+'''
+
+
+def cold_start(statement: str) -> dict:
+    '''Runs statement in a new interpreter and returns the milliseconds
+    it took and the names of the modules that were loaded.'''
+    completed = subprocess.run(
+        [sys.executable, '-c', _TIMING_TEMPLATE.format(statement=statement)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+def measure_cold_start(statement: str, repeat: int = 10) -> dict:
+    '''Times statement in repeat new interpreters.
+
+    Returns a dict with the best and mean time in milliseconds,
+    after one unmeasured run that writes the compiled bytecode.
+    '''
+    cold_start(statement)
+    timings = [cold_start(statement)['ms'] for _ in range(repeat)]
+    return {
+        'best_ms': min(timings),
+        'mean_ms': sum(timings) / len(timings),
+        'repeat': repeat,
+    }
+
+def bench_import_time(repeat: int = 10) -> dict:
+    '''Measures the cold start of the pricing core and of the full DeliveryApi.'''
+    return {
+        name: measure_cold_start(statement, repeat)
+        for name, statement in COLD_START_STATEMENTS.items()
+    }
+
+def main():
+    '''Runs the benchmarks and prints the results.'''
+    core_modules = cold_start(COLD_START_STATEMENTS['import.pricing_core'])['modules']
+    framework_modules = [
+        module for module in core_modules if module.split('.')[0] in FRAMEWORK_MODULES
+    ]
+    print(f'framework modules imported by the pricing core: {framework_modules or "none"}')
+    for name, result in bench_import_time().items():
+        print(f'  {name:<40} best {result["best_ms"]:10.2f} ms   mean {result["mean_ms"]:10.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
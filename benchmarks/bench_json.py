@@ -0,0 +1,36 @@
+'''Benchmark for JSON parsing and serialization.
+
+Compares the json module of the standard library with utils.json_codec,
+which uses orjson when it is installed, for a single order request and
+for the response of a batch of invalid orders.
+
+Run from the root folder of the project:
+python3 -m benchmarks.bench_json
+'''
+import json
+from utils import json_codec
+from utils.pricing_context import PricingContext
+from benchmarks.generators import generate_mixed_requests
+from benchmarks.harness import measure, print_results
+
+
+def main():
+    '''Runs the benchmarks and prints the results.'''
+    request_body = json.dumps(generate_mixed_requests(1)[0]).encode()
+    invalid_orders = [
+        dict(request, cart_value=0, time='2024-01-15') for request in generate_mixed_requests(1000)
+    ]
+    batch_response, _ = PricingContext.create().price_orders(invalid_orders, 1000)
+    print(f'JSON library: {json_codec.JSON_LIBRARY}')
+    print_results('parse order request', {
+        'json (before)': measure(lambda: json.loads(request_body), number=100000),
+        'json_codec (after)': measure(lambda: json_codec.loads(request_body), number=100000),
+    })
+    print_results('serialize batch of 1000 invalid orders', {
+        'json (before)': measure(lambda: json.dumps(batch_response).encode(), number=100),
+        'json_codec (after)': measure(lambda: json_codec.dumps(batch_response), number=100),
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+'''Benchmark for repricing binary order records.
+
+Compares the throughput of repricing a JSON Lines file, which parses
+and validates every order, with repricing the same orders converted
+to memory-mapped binary order records.
+
+Run from the root folder of the project:
+python3 -m benchmarks.bench_order_records
+'''
+import io
+import json
+import os
+import tempfile
+from time import perf_counter
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.order_records import OrderRecordWriter, price_order_records, read_order_records
+from utils.order_stream import chunked, price_chunks, read_orders
+from utils.pricing_context import PricingContext
+from benchmarks.generators import generate_mixed_requests
+
+NUMBER_OF_ORDERS = 400000
+CHUNK_SIZE = 10000
+
+
+def main():
+    '''Runs the benchmarks and prints the results.'''
+    requests = generate_mixed_requests(NUMBER_OF_ORDERS)
+    jsonl = ''.join(json.dumps(request) + '\n' for request in requests)
+    pricing_context = PricingContext.create()
+
+    start = perf_counter()
+    for _ in price_chunks(pricing_context, chunked(read_orders(io.StringIO(jsonl), 'jsonl'), CHUNK_SIZE)):
+        pass
+    jsonl_seconds = perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        records_path = os.path.join(directory, 'orders.bin')
+        with open(records_path, 'wb') as records_file:
+            writer = OrderRecordWriter(records_file)
+            for chunk in chunked(read_orders(io.StringIO(jsonl), 'jsonl'), CHUNK_SIZE):
+                validated_orders, _ = pricing_context.delivery_fee_schema.load_batch(chunk)
+                writer.write_orders(validated_orders)
+        start = perf_counter()
+        price_order_records(DeliveryFeeCalculator(), read_order_records(records_path))
+        records_seconds = perf_counter() - start
+
+    print(f'{"JSON Lines (before)":<30} {NUMBER_OF_ORDERS / jsonl_seconds:12.0f} orders/s')
+    print(
+        f'{"order records (after)":<30} {NUMBER_OF_ORDERS / records_seconds:12.0f} orders/s'
+        f'   speedup {jsonl_seconds / records_seconds:5.1f}x'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+'''Benchmark for parallel repricing.
+
+Measures the throughput of pricing chunks of orders in one process and
+in pools of worker processes of growing size, up to the number of CPUs.
+
+Run from the root folder of the project:
+python3 -m benchmarks.bench_parallel
+'''
+import os
+from time import perf_counter
+from utils.order_stream import chunked, price_chunks
+from utils.parallel_repricing import price_chunks_in_parallel
+from utils.pricing_context import PricingContext
+from benchmarks.generators import generate_mixed_requests
+
+NUMBER_OF_ORDERS = 400000
+CHUNK_SIZE = 10000
+
+
+def orders_per_second(priced_chunks) -> float:
+    '''Consumes priced_chunks and returns how many orders were priced per second.'''
+    start = perf_counter()
+    number_of_orders = sum(len(chunk) for chunk, _, _ in priced_chunks)
+    return number_of_orders / (perf_counter() - start)
+
+def main():
+    '''Runs the benchmarks and prints the results.'''
+    orders = generate_mixed_requests(NUMBER_OF_ORDERS)
+    single_process = orders_per_second(
+        price_chunks(PricingContext.create(), chunked(orders, CHUNK_SIZE))
+    )
+    print(f'{"single process":<20} {single_process:12.0f} orders/s')
+    workers = 2
+    while workers <= (os.cpu_count() or 1):
+        parallel = orders_per_second(
+            price_chunks_in_parallel(chunked(orders, CHUNK_SIZE), workers)
+        )
+        print(
+            f'{f"{workers} workers":<20} {parallel:12.0f} orders/s'
+            f'   speedup {parallel / single_process:5.2f}x'
+        )
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+'''Benchmark for sharing the pricing context across requests.
+
+Compares building a new schema and calculator for every request
+with reusing one PricingContext, both on their own and through
+the full POST /delivery-fee round trip. Like the code before the
+shared context, the new calculators price the order step by step,
+without compiling a pricing plan for it.
+
+Run from the root folder of the project:
+python3 -m benchmarks.bench_pricing_context
+'''
+from main import DeliveryApi
+from resources.delivery_fee import DeliveryFeeResource
+from schemas.delivery_fee import DeliveryFeeSchema
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.pricing_context import PricingContext, PricingContextHolder, PricingProfiles
+from benchmarks.harness import measure, print_results
+
+ORDER = {
+    'cart_value': 790,
+    'delivery_distance': 2235,
+    'number_of_items': 4,
+    'time': '2024-01-15T13:00:00Z',
+}
+
+
+class StepwiseDeliveryFeeCalculator(DeliveryFeeCalculator):
+    '''DeliveryFeeCalculator that calculates fees step by step like before.'''
+
+    calculate_delivery_fee = DeliveryFeeCalculator.calculate_delivery_fee_stepwise
+
+
+class PerRequestDeliveryFeeResource(DeliveryFeeResource):
+    '''DeliveryFeeResource that builds its own schema and calculator like before.'''
+
+    def __init__(self):
+        super().__init__(PricingContextHolder(PricingProfiles.single(
+            PricingContext(DeliveryFeeSchema(), StepwiseDeliveryFeeCalculator())
+        )))
+
+
+def price_with_new_objects():
+    '''Builds a schema and a calculator, then prices ORDER.'''
+    delivery_fee_schema = DeliveryFeeSchema()
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    return delivery_fee_calculator.calculate_delivery_fee_stepwise(delivery_fee_schema.load(ORDER))
+
+def main():
+    '''Runs the benchmarks and prints the results.'''
+    pricing_context = PricingContext.create()
+
+    def price_with_shared_context():
+        return pricing_context.delivery_fee_calculator.calculate_delivery_fee(
+            pricing_context.delivery_fee_schema.load(ORDER)
+        )
+
+    shared_client = DeliveryApi().app.test_client()
+    per_request_api = DeliveryApi()
+    per_request_api.api.add_resource(PerRequestDeliveryFeeResource, '/delivery-fee-per-request')
+    per_request_client = per_request_api.app.test_client()
+
+    print_results('Pricing one order', {
+        'new schema and calculator per order': measure(price_with_new_objects),
+        'shared pricing context': measure(price_with_shared_context),
+    })
+    print_results('POST round trip', {
+        'new schema and calculator per request': measure(
+            lambda: per_request_client.post('/delivery-fee-per-request', json=ORDER), number=2000
+        ),
+        'shared pricing context': measure(
+            lambda: shared_client.post('/delivery-fee', json=ORDER), number=2000
+        ),
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+'''Benchmark for what-if pricing scenarios.
+
+Compares evaluating several fee scenarios over the same order records
+one scenario at a time, with a calculator and a full pass over the
+records each, with evaluating them in one pass with evaluate_scenarios,
+which shares the fee components that the scenarios have in common.
+
+Run from the root folder of the project:
+python3 -m benchmarks.bench_what_if
+'''
+import io
+from time import perf_counter
+import numpy as np
+from utils.order_records import FILE_HEADER, RECORD_DTYPE, OrderRecordWriter, price_order_records
+from utils.scenarios import evaluate_scenarios, scenario_calculators
+from benchmarks.generators import BRANCHES, generate_orders
+
+ORDERS_PER_BRANCH = 300000
+SCENARIO_CONFIGS = {
+    'current': {},
+    'rush 1.1': {'time_rush_multiplier': 1.1},
+    'rush 1.3': {'time_rush_multiplier': 1.3},
+    'rush 1.5': {'time_rush_multiplier': 1.5},
+    'cap 10 euros': {'max_delivery_fee': 1000},
+    'cap 12 euros': {'max_delivery_fee': 1200},
+    'cap 20 euros': {'max_delivery_fee': 2000},
+    'free from 150 euros': {'cart_value_free_delivery_limit_cents': 15000},
+}
+
+
+def evaluate_one_by_one(records: np.ndarray, calculators: dict) -> dict:
+    '''Prices all records with each calculator in turn and aggregates the fees.'''
+    results = {}
+    for name, calculator in calculators.items():
+        delivery_fees = price_order_records(calculator, records)
+        rounded_fees = np.rint(delivery_fees).astype(np.int64)
+        results[name] = (
+            int(rounded_fees.sum()), np.bincount(rounded_fees),
+            # fees at the cap, an upper bound of the fees the cap was applied to
+            int(np.count_nonzero(delivery_fees == calculator.max_delivery_fee)),
+        )
+    return results
+
+
+def main():
+    '''Runs the benchmarks and prints the results.'''
+    records_file = io.BytesIO()
+    writer = OrderRecordWriter(records_file)
+    for branch in BRANCHES:
+        writer.write_orders(generate_orders(branch, ORDERS_PER_BRANCH))
+    records = np.frombuffer(records_file.getbuffer(), dtype=RECORD_DTYPE, offset=len(FILE_HEADER))
+    calculators = scenario_calculators(SCENARIO_CONFIGS)
+
+    start = perf_counter()
+    evaluate_one_by_one(records, calculators)
+    one_by_one_seconds = perf_counter() - start
+    start = perf_counter()
+    evaluate_scenarios(records, calculators)
+    one_pass_seconds = perf_counter() - start
+
+    print(f'{len(records)} orders, {len(calculators)} scenarios')
+    print(f'{"one scenario at a time (before)":<35} {one_by_one_seconds:8.3f} s')
+    print(
+        f'{"one pass (after)":<35} {one_pass_seconds:8.3f} s'
+        f'   speedup {one_by_one_seconds / one_pass_seconds:5.1f}x'
+    )
+
+
+if __name__ == '__main__':
+    main()
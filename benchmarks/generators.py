@@ -0,0 +1,121 @@
+'''Input generators for benchmarks.
+
+Contains functions that generate delivery fee requests which hit
+a chosen rule of the delivery fee calculation, so that every rule
+branch can be measured separately.
+'''
+from datetime import datetime, timedelta, timezone
+import random
+from utils.delivery_order import DeliveryOrder
+
+# Monday 2024-01-15 at midnight UTC, the start of the week the generated times fall in
+_WEEK_START = datetime(2024, 1, 15, tzinfo=timezone.utc)
+_FRIDAY_RUSH_START = _WEEK_START + timedelta(days=4, hours=15)
+
+
+def _random_time(randomizer: random.Random, rush: bool) -> datetime:
+    '''Returns a random time in the Friday rush, or a random time outside of it.'''
+    if rush:
+        return _FRIDAY_RUSH_START + timedelta(seconds=randomizer.randrange(4 * 3600))
+    # Monday to Thursday are never in the rush
+    return _WEEK_START + timedelta(seconds=randomizer.randrange(4 * 24 * 3600))
+
+def _plain_order(randomizer: random.Random) -> dict:
+    '''An order that only pays the distance base fee.'''
+    return {
+        'cart_value': randomizer.randint(1000, 19999),
+        'delivery_distance': randomizer.randint(1, 1000),
+        'number_of_items': randomizer.randint(1, 4),
+        'time': _random_time(randomizer, rush=False),
+    }
+
+def _small_order(randomizer: random.Random) -> dict:
+    return dict(_plain_order(randomizer), cart_value=randomizer.randint(1, 999))
+
+def _bulk_items(randomizer: random.Random) -> dict:
+    return dict(_plain_order(randomizer), number_of_items=randomizer.randint(13, 40))
+
+def _long_distance(randomizer: random.Random) -> dict:
+    return dict(_plain_order(randomizer), delivery_distance=randomizer.randint(1001, 5000))
+
+def _friday_rush(randomizer: random.Random) -> dict:
+    return dict(_plain_order(randomizer), time=_random_time(randomizer, rush=True))
+
+def _max_fee_cap(randomizer: random.Random) -> dict:
+    return {
+        'cart_value': randomizer.randint(1, 999),
+        'delivery_distance': randomizer.randint(6000, 20000),
+        'number_of_items': randomizer.randint(13, 40),
+        'time': _random_time(randomizer, rush=randomizer.random() < 0.5),
+    }
+
+def _free_delivery(randomizer: random.Random) -> dict:
+    return dict(_long_distance(randomizer), cart_value=randomizer.randint(20000, 100000))
+
+# branch name: function generating an order that hits the branch
+BRANCHES = {
+    'plain': _plain_order,
+    'small_order_surcharge': _small_order,
+    'bulk_items': _bulk_items,
+    'long_distance': _long_distance,
+    'friday_rush': _friday_rush,
+    'max_fee_cap': _max_fee_cap,
+    'free_delivery': _free_delivery,
+}
+
+
+def _generate_order_dicts(branch: str, number_of_orders: int, seed: int) -> list:
+    '''Generates order dicts, with time as a datetime, that hit branch.'''
+    randomizer = random.Random(seed)
+    generate_order = BRANCHES[branch]
+    return [generate_order(randomizer) for _ in range(number_of_orders)]
+
+def generate_orders(branch: str, number_of_orders: int, seed: int = 0) -> list:
+    '''Generates validated orders, like DeliveryFeeSchema.load returns, that hit branch.'''
+    return [
+        DeliveryOrder(**order)
+        for order in _generate_order_dicts(branch, number_of_orders, seed)
+    ]
+
+def generate_requests(branch: str, number_of_requests: int, seed: int = 0) -> list:
+    '''Generates request JSON dicts, with time as an ISO string, that hit branch.'''
+    return [
+        dict(order, time=order['time'].strftime('%Y-%m-%dT%H:%M:%SZ'))
+        for order in _generate_order_dicts(branch, number_of_requests, seed)
+    ]
+
+# functions turning a valid request JSON into an invalid one,
+# with the same kinds of validation errors as the test cases
+INVALID_CHANGES = {
+    'empty': lambda request: {},
+    'wrong_datatype': lambda request: dict(request, delivery_distance='invalid datatype'),
+    'zero_value': lambda request: dict(request, cart_value=0),
+    'negative_value': lambda request: dict(request, number_of_items=-1),
+    'missing_field': lambda request: {
+        key: value for key, value in request.items() if key != 'number_of_items'
+    },
+    'unknown_field': lambda request: dict(request, coupon='FREE'),
+    'naive_time': lambda request: dict(request, time=request['time'][:-1]),
+    'malformed_time': lambda request: dict(request, time=request['time'][:10]),
+}
+
+
+def generate_invalid_requests(number_of_requests: int, seed: int = 0) -> list:
+    '''Generates request JSON dicts that fail validation in each of the INVALID_CHANGES.'''
+    randomizer = random.Random(seed)
+    changes = list(INVALID_CHANGES.values())
+    return [
+        randomizer.choice(changes)(request)
+        for request in generate_requests('plain', number_of_requests, seed)
+    ]
+
+def generate_mixed_requests(number_of_requests: int, seed: int = 0) -> list:
+    '''Generates request JSON dicts that hit every branch in turn.'''
+    requests_by_branch = [
+        generate_requests(branch, number_of_requests // len(BRANCHES) + 1, seed)
+        for branch in BRANCHES
+    ]
+    mixed_requests = [
+        request for requests in zip(*requests_by_branch) for request in requests
+    ]
+    return mixed_requests[:number_of_requests]
@@ -0,0 +1,31 @@
+'''Helpers for running microbenchmarks.
+
+Contains functions for timing a callable and printing the results
+of a benchmark in a consistent format.
+'''
+from timeit import Timer
+
+
+def measure(function, number: int = 10000, repeat: int = 5) -> dict:
+    '''Times calling function number times, repeat times over.
+
+    Returns a dict with the best and mean time of one call in microseconds.
+    The best time is the least disturbed by other processes,
+    so it is the one to compare between runs.
+    '''
+
+    timings = Timer(function).repeat(repeat=repeat, number=number)
+    per_call_timings = [timing / number * 1_000_000 for timing in timings]
+    return {
+        'best_us': min(per_call_timings),
+        'mean_us': sum(per_call_timings) / len(per_call_timings),
+        'number': number,
+        'repeat': repeat,
+    }
+
+def print_results(title: str, results: dict):
+    '''Prints the results of measure() calls, one line per benchmark name.'''
+
+    print(title)
+    for name, result in results.items():
+        print(f'  {name:<40} best {result["best_us"]:10.2f} us   mean {result["mean_us"]:10.2f} us')
@@ -0,0 +1,246 @@
+'''Load test for the delivery fee API.
+
+Starts DeliveryApi in a separate process and sends it a reproducible
+mix of requests from concurrent keep-alive connections: valid orders,
+orders in the Friday rush, orders that fail validation and batches
+that are larger than the maximum batch size. Reports the throughput,
+the p50, p95 and p99 latencies of each kind of request and the
+number of responses with an unexpected status. The exit status is 1
+if there were any, so the load test can also catch regressions.
+
+Run from the root folder of the project:
+python3 -m benchmarks.load_test --concurrency 16 --requests 20000
+
+To load test another server, like one started with serve.py, give its URL:
+python3 -m benchmarks.load_test --url http://127.0.0.1:5000
+'''
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import threading
+from http import HTTPStatus
+from http.client import HTTPConnection
+from time import perf_counter
+from urllib.parse import urlsplit
+from benchmarks.generators import generate_invalid_requests, generate_requests
+
+MAX_BATCH_SIZE = 1000
+DEFAULT_MIX = 'valid=70,rush=15,invalid=10,oversized=5'
+
+
+def _generate_valid(number_of_requests: int, seed: int) -> list:
+    return [
+        ('/delivery-fee', request, HTTPStatus.OK)
+        for request in generate_requests('plain', number_of_requests, seed)
+    ]
+
+def _generate_rush(number_of_requests: int, seed: int) -> list:
+    return [
+        ('/delivery-fee', request, HTTPStatus.OK)
+        for request in generate_requests('friday_rush', number_of_requests, seed)
+    ]
+
+def _generate_invalid(number_of_requests: int, seed: int) -> list:
+    return [
+        ('/delivery-fee', request, HTTPStatus.BAD_REQUEST)
+        for request in generate_invalid_requests(number_of_requests, seed)
+    ]
+
+def _generate_oversized(number_of_requests: int, seed: int) -> list:
+    # one oversized batch is reused, because its content doesn't matter
+    batch = generate_requests('plain', MAX_BATCH_SIZE + 1, seed)
+    return [
+        ('/delivery-fee/batch', batch, HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    ] * number_of_requests
+
+# kind of request: function generating (path, request JSON, expected status) tuples
+REQUEST_KINDS = {
+    'valid': _generate_valid,
+    'rush': _generate_rush,
+    'invalid': _generate_invalid,
+    'oversized': _generate_oversized,
+}
+
+
+def parse_mix(mix: str) -> dict:
+    '''Parses a mix like valid=70,rush=30 into a dict of weights by kind of request.'''
+    weights = {}
+    for item in mix.split(','):
+        kind, _, weight = item.partition('=')
+        if kind not in REQUEST_KINDS:
+            raise ValueError(
+                f'Unknown kind of request {kind}, use one of {", ".join(REQUEST_KINDS)}'
+            )
+        weights[kind] = float(weight)
+    return weights
+
+def generate_load(weights: dict, number_of_requests: int, seed: int = 0) -> list:
+    '''Generates a shuffled list of (kind, path, body, expected status) requests.
+
+    The number of requests of each kind is proportional to its weight,
+    and the same arguments always give the same requests in the same order.
+    '''
+    total_weight = sum(weights.values())
+    load = []
+    for kind, weight in weights.items():
+        number_of_kind = round(number_of_requests * weight / total_weight)
+        load.extend(
+            (kind, path, json.dumps(request_json).encode(), expected_status)
+            for path, request_json, expected_status
+            in REQUEST_KINDS[kind](number_of_kind, seed)
+        )
+    random.Random(seed).shuffle(load)
+    return load
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    '''Returns the value below which fraction of sorted_values fall, by the nearest rank.'''
+    if not sorted_values:
+        return float('nan')
+    rank = max(round(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def _send_requests(host: str, port: int, load: list, results: list):
+    '''Sends the requests of load one after another over one keep-alive connection.'''
+    connection = HTTPConnection(host, port, timeout=60)
+    headers = {'Content-Type': 'application/json'}
+    try:
+        for kind, path, body, expected_status in load:
+            start = perf_counter()
+            connection.request('POST', path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            results.append((kind, perf_counter() - start, response.status, expected_status))
+    finally:
+        connection.close()
+
+def run_load(host: str, port: int, load: list, concurrency: int) -> dict:
+    '''Sends load from concurrency connections and returns the measured results.'''
+    results = [[] for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=_send_requests, args=(host, port, load[index::concurrency], results[index])
+        )
+        for index in range(concurrency)
+    ]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = perf_counter() - start
+    return summarize([result for thread_results in results for result in thread_results], duration)
+
+def summarize(results: list, duration: float) -> dict:
+    '''Computes the throughput and latency percentiles of (kind, seconds, status, expected) results.'''
+    latencies_by_kind = {'all': []}
+    status_counts = {}
+    unexpected_statuses = 0
+    for kind, seconds, status, expected_status in results:
+        latencies_by_kind['all'].append(seconds)
+        latencies_by_kind.setdefault(kind, []).append(seconds)
+        status_counts[status] = status_counts.get(status, 0) + 1
+        unexpected_statuses += status != expected_status
+    latencies = {}
+    for kind, seconds in latencies_by_kind.items():
+        seconds.sort()
+        latencies[kind] = {
+            'count': len(seconds),
+            'p50_ms': percentile(seconds, 0.50) * 1000,
+            'p95_ms': percentile(seconds, 0.95) * 1000,
+            'p99_ms': percentile(seconds, 0.99) * 1000,
+        }
+    return {
+        'requests': len(results),
+        'duration_s': duration,
+        'throughput_rps': len(results) / duration if duration > 0 else 0.0,
+        'latencies': latencies,
+        'status_counts': {str(status): count for status, count in sorted(status_counts.items())},
+        'unexpected_statuses': unexpected_statuses,
+    }
+
+def print_summary(summary: dict):
+    '''Prints the results of a load test.'''
+    print(
+        f'{summary["requests"]} requests in {summary["duration_s"]:.2f} s, '
+        f'{summary["throughput_rps"]:.0f} requests/s'
+    )
+    print(f'{"kind":<12} {"count":>8} {"p50 ms":>10} {"p95 ms":>10} {"p99 ms":>10}')
+    for kind, latency in summary['latencies'].items():
+        print(
+            f'{kind:<12} {latency["count"]:>8} {latency["p50_ms"]:10.2f} '
+            f'{latency["p95_ms"]:10.2f} {latency["p99_ms"]:10.2f}'
+        )
+    print(f'statuses: {summary["status_counts"]}, unexpected: {summary["unexpected_statuses"]}')
+
+def _serve(port_queue):
+    '''Serves a DeliveryApi on a free local port and reports the port through port_queue.'''
+    # imported here, so that only the server process loads the API
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from main import DeliveryApi
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        '''Does not log every request, which would slow the server down.'''
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server(
+        '127.0.0.1', 0, DeliveryApi(max_batch_size=MAX_BATCH_SIZE).app,
+        threaded=True, request_handler=QuietRequestHandler
+    )
+    port_queue.put(server.socket.getsockname()[1])
+    server.serve_forever()
+
+def start_server() -> tuple[multiprocessing.Process, int]:
+    '''Starts a DeliveryApi in a separate process and returns the process and its port.
+
+    The server runs in its own process, so that it does not compete
+    with the load generator for the global interpreter lock.
+    '''
+    port_queue = multiprocessing.Queue()
+    server_process = multiprocessing.Process(target=_serve, args=(port_queue,), daemon=True)
+    server_process.start()
+    return server_process, port_queue.get(timeout=30)
+
+def main() -> int:
+    '''Runs the load test from the command line and returns the exit status.'''
+    parser = argparse.ArgumentParser(description='Load tests the delivery fee API.')
+    parser.add_argument('--url', help='URL of a running server, by default one is started')
+    parser.add_argument('--concurrency', type=int, default=8, help='number of connections')
+    parser.add_argument('--requests', type=int, default=10000, help='number of requests')
+    parser.add_argument(
+        '--mix', default=DEFAULT_MIX,
+        help=f'weights of the kinds of requests, by default {DEFAULT_MIX}'
+    )
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated requests')
+    parser.add_argument('--output', help='file to write the results to as JSON')
+    args = parser.parse_args()
+
+    load = generate_load(parse_mix(args.mix), args.requests, args.seed)
+    server_process = None
+    if args.url is None:
+        server_process, port = start_server()
+        host = '127.0.0.1'
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    try:
+        # warm up, so that one-time costs are not measured
+        run_load(host, port, load[:args.concurrency * 10], args.concurrency)
+        summary = run_load(host, port, load, args.concurrency)
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.join()
+    summary.update(concurrency=args.concurrency, mix=args.mix, seed=args.seed)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(summary, output_file, indent=2)
+    return 1 if summary['unexpected_statuses'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+'''Benchmark suite for the pricing service.
+
+Measures the delivery fee calculation, the request validation, the full
+POST /delivery-fee round trip, the memory allocated per request and
+the cold start of the pricing core and of the API, and writes the
+results as JSON so that runs on different commits can be compared.
+
+Run from the root folder of the project:
+python3 -m benchmarks.run --output results.json
+python3 -m benchmarks.run --output new.json --compare results.json
+'''
+import argparse
+import json
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from main import DeliveryApi
+from schemas.delivery_fee import DeliveryFeeSchema
+from utils import json_codec
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from benchmarks.bench_import_time import bench_import_time
+from benchmarks.generators import BRANCHES, generate_orders, generate_requests, generate_mixed_requests
+from benchmarks.harness import measure
+
+NUMBER_OF_INPUTS = 1000
+
+
+def _cycle(items: list):
+    '''Returns a function that returns the items one after another, forever.'''
+    state = {'index': -1}
+
+    def next_item():
+        state['index'] = (state['index'] + 1) % len(items)
+        return items[state['index']]
+    return next_item
+
+def bench_calculator(number: int) -> dict:
+    '''Measures calculate_delivery_fee for each rule branch.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    results = {}
+    for branch in BRANCHES:
+        next_order = _cycle(generate_orders(branch, NUMBER_OF_INPUTS))
+        results[f'calculator.{branch}'] = measure(
+            lambda next_order=next_order: delivery_fee_calculator.calculate_delivery_fee(next_order()),
+            number=number
+        )
+    return results
+
+def bench_schema(number: int) -> dict:
+    '''Measures DeliveryFeeSchema.load and fast_load.'''
+    delivery_fee_schema = DeliveryFeeSchema()
+    next_request = _cycle(generate_mixed_requests(NUMBER_OF_INPUTS))
+    return {
+        'schema.load': measure(
+            lambda: delivery_fee_schema.load(next_request()), number=number // 10
+        ),
+        'schema.fast_load': measure(
+            lambda: delivery_fee_schema.fast_load(next_request()), number=number
+        ),
+    }
+
+def bench_endpoint(number: int) -> dict:
+    '''Measures the POST /delivery-fee round trip through the Flask test client.'''
+    client = DeliveryApi().app.test_client()
+    next_request = _cycle(generate_mixed_requests(NUMBER_OF_INPUTS))
+    invalid_request = dict(generate_requests('plain', 1)[0], cart_value=0)
+    return {
+        'endpoint.post_valid': measure(
+            lambda: client.post('/delivery-fee', json=next_request()), number=number // 50
+        ),
+        'endpoint.post_invalid': measure(
+            lambda: client.post('/delivery-fee', json=invalid_request), number=number // 50
+        ),
+    }
+
+def bench_memory(number_of_requests: int) -> dict:
+    '''Measures the memory allocated per POST /delivery-fee request
+    and the memory held by a batch of validated orders.'''
+    client = DeliveryApi().app.test_client()
+    requests = generate_mixed_requests(number_of_requests)
+    # warm up, so that one-time allocations are not counted
+    client.post('/delivery-fee', json=requests[0])
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start_size, _ = tracemalloc.get_traced_memory()
+    for request in requests:
+        client.post('/delivery-fee', json=request)
+    end_size, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    batch_start_size, _ = tracemalloc.get_traced_memory()
+    validated_orders, _ = DeliveryFeeSchema().load_batch(requests)
+    batch_end_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del validated_orders
+    return {
+        'memory.post_valid': {
+            'retained_bytes_per_request': (end_size - start_size) / number_of_requests,
+            'peak_bytes': peak_size - start_size,
+            'number': number_of_requests,
+        },
+        'memory.validated_batch': {
+            'bytes_per_order': (batch_end_size - batch_start_size) / number_of_requests,
+            'number': number_of_requests,
+        },
+    }
+
+def _git_commit() -> str | None:
+    '''Returns the current git commit hash, or None outside of a git repository.'''
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(number: int) -> dict:
+    '''Runs all benchmarks and returns the results with information about the run.'''
+    benchmarks = {}
+    benchmarks.update(bench_calculator(number))
+    benchmarks.update(bench_schema(number))
+    benchmarks.update(bench_endpoint(number))
+    benchmarks.update(bench_memory(number // 50))
+    benchmarks.update(bench_import_time())
+    return {
+        'commit': _git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'json_library': json_codec.JSON_LIBRARY,
+        'benchmarks': benchmarks,
+    }
+
+def print_comparison(results: dict, baseline: dict):
+    '''Prints the change of each timed benchmark compared to the baseline results.'''
+    print(f'{"benchmark":<40} {"baseline":>12} {"current":>12} {"change":>8}')
+    for name, result in results['benchmarks'].items():
+        baseline_result = baseline['benchmarks'].get(name)
+        if baseline_result is None:
+            continue
+        for key, unit in (('best_us', 'us'), ('best_ms', 'ms')):
+            if key in result and key in baseline_result:
+                change = result[key] / baseline_result[key] - 1
+                print(
+                    f'{name:<40} {baseline_result[key]:9.2f} {unit} {result[key]:9.2f} {unit}'
+                    f' {change:+8.1%}'
+                )
+
+def main():
+    '''Runs the benchmark suite from the command line.'''
+    parser = argparse.ArgumentParser(description='Runs the pricing service benchmarks.')
+    parser.add_argument('--output', help='file to write the results to as JSON')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument(
+        '--number', type=int, default=100000,
+        help='number of calls per timed calculator benchmark, the others use fewer'
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.number)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            print_comparison(results, json.load(baseline_file))
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
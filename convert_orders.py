@@ -0,0 +1,74 @@
+'''Conversion of order files to binary order records.
+
+Reads orders from a CSV or JSON Lines file, validates them once and
+writes the valid orders as fixed-width binary records, which can then
+be memory-mapped and repriced many times, see utils.order_records.
+Invalid orders are written to a reject file with their validation error messages.
+
+Usage, from the root folder of the project:
+python3 convert_orders.py orders.csv --output orders.bin --rejects rejects.jsonl
+'''
+import argparse
+import json
+import sys
+from contextlib import nullcontext
+from schemas.delivery_fee import DeliveryFeeSchema
+from utils.order_records import OrderRecordWriter
+from utils.order_stream import FORMATS, chunked, detect_format, read_orders
+
+# error messages of a valid order that doesn't fit in a record
+_TOO_LARGE_ERRORS = {'_schema': ['Values must be less than 2147483648.']}
+
+
+def parse_args(args: list | None = None) -> argparse.Namespace:
+    '''Reads the command line arguments.'''
+    parser = argparse.ArgumentParser(description='Converts a file of orders to binary records.')
+    parser.add_argument('input', help='CSV or JSON Lines file of orders')
+    parser.add_argument('--output', required=True, help='file to write the order records to')
+    parser.add_argument('--rejects', help='JSON Lines file to write the invalid orders to')
+    parser.add_argument(
+        '--format', choices=FORMATS,
+        help='format of the input file, by default detected from its name'
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=10000, help='number of orders validated at a time'
+    )
+    return parser.parse_args(args)
+
+def convert(args: argparse.Namespace) -> tuple[int, int]:
+    '''Converts args.input into args.output and returns the numbers of written and rejected orders.'''
+    file_format = args.format or detect_format(args.input)
+    delivery_fee_schema = DeliveryFeeSchema()
+    rejected_count = 0
+    row = 0
+    with (
+        open(args.input, encoding='utf-8', newline='') as input_file,
+        open(args.output, 'wb') as output_file,
+        open(args.rejects, 'w', encoding='utf-8') if args.rejects else nullcontext() as rejects_file,
+    ):
+        writer = OrderRecordWriter(output_file)
+        for chunk in chunked(read_orders(input_file, file_format), args.chunk_size):
+            validated_orders, errors = delivery_fee_schema.load_batch(chunk)
+            valid_orders = []
+            for index, order in enumerate(validated_orders):
+                if order is not None and not writer.fits_in_record(order):
+                    errors[index] = _TOO_LARGE_ERRORS
+                elif order is not None:
+                    valid_orders.append(order)
+            writer.write_orders(valid_orders)
+            rejected_count += len(errors)
+            if rejects_file is not None:
+                for index in sorted(errors):
+                    rejects_file.write(json.dumps({
+                        'row': row + index + 1, 'order': chunk[index], 'errors': errors[index]
+                    }) + '\n')
+            row += len(chunk)
+    return writer.record_count, rejected_count
+
+
+if __name__ == '__main__':
+    record_count, rejected_order_count = convert(parse_args())
+    print(
+        f'{record_count} orders written, {rejected_order_count} orders rejected',
+        file=sys.stderr
+    )
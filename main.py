@@ -1,32 +1,208 @@
 '''Flask server.
 
 This file contains the class DeliveryApi,
-which starts and runs a Flask server.
+which starts and runs a Flask server,
+and the functions create_delivery_api and create_app, which create
+a configured DeliveryApi and its Flask app for a WSGI server.
 '''
-from flask import Flask
+import os
+from time import perf_counter
+from flask import Flask, g, request
 from flask_restful import Api
-from resources.delivery_fee import DeliveryFeeResource
+from resources.delivery_fee import (
+    CacheableDeliveryFeeResource, DeliveryFeeResource, DeliveryFeeBatchResource,
+    QuoteGridResource
+)
+from resources.metrics import MetricsResource
+from utils.admission_control import AdmissionController
+from utils.fee_config import FeeConfigWatcher, pricing_profiles_from_config
+from utils.json_provider import FastJSONProvider, output_json
+from utils.metrics import MetricsRegistry
+from utils.pricing_context import MAX_CONTENT_LENGTH, PricingContextHolder, PricingProfiles
 
 class DeliveryApi:
     '''Creates a Flask server.'''
 
-    def __init__(self):
-        '''Initializes the Flask server.'''
+    def __init__(
+            self, max_batch_size: int = 1000,
+            fee_cache_size: int = 0, fee_cache_ttl_seconds: float | None = None,
+            metrics_enabled: bool = True,
+            fee_config_path: str | None = None, fee_config_poll_seconds: float = 5.0,
+            delivery_fee_get_enabled: bool = False,
+            max_in_flight_requests: int = 0, max_queued_requests: int = 0,
+            max_queue_wait_seconds: float = 1.0, retry_after_seconds: int = 1
+    ):
+        '''Initializes the Flask server.
 
+        max_batch_size limits the number of orders accepted by /delivery-fee/batch.
+        When fee_cache_size is greater than zero, calculated fees are cached,
+        see DeliveryFeeCache.
+        When metrics_enabled is True, request metrics are collected
+        and exposed at /metrics.
+        When fee_config_path is given, the fees of each pricing profile are
+        loaded from that file, which is reloaded when it changes or on SIGHUP,
+        see FeeConfigWatcher. Otherwise the default fees of DeliveryFeeCalculator
+        are used. Requests choose a profile with the X-Pricing-Profile header.
+        When delivery_fee_get_enabled is True, /delivery-fee also accepts GET
+        requests with the order as query parameters, whose responses can be
+        cached by HTTP caches. Otherwise only POST is allowed.
+        When max_in_flight_requests is greater than zero, at most that many
+        POST requests to /delivery-fee are priced at the same time, at most
+        max_queued_requests wait for their turn for up to max_queue_wait_seconds,
+        and the rest get status 503 with a Retry-After of retry_after_seconds,
+        see AdmissionController.
+        '''
+
+        self.max_batch_size = max_batch_size
+        self.fee_cache_size = fee_cache_size
+        self.fee_cache_ttl_seconds = fee_cache_ttl_seconds
+        self.fee_config_path = fee_config_path
+        self.fee_config_poll_seconds = fee_config_poll_seconds
+        self.delivery_fee_get_enabled = delivery_fee_get_enabled
+        self.metrics = MetricsRegistry() if metrics_enabled else None
+        self.admission_controller = AdmissionController(
+            max_in_flight_requests, max_queued=max_queued_requests,
+            max_queue_wait_seconds=max_queue_wait_seconds, retry_after_seconds=retry_after_seconds
+        ) if max_in_flight_requests > 0 else None
+        self.shutdown_hooks = []
         self.app = Flask(__name__)
+        self.app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
         self.api = Api(self.app)
+        self.register_json_provider()
         self.register_resources()
+        if self.metrics is not None:
+            self.register_metrics()
+        if self.fee_config_path is not None:
+            self.watch_fee_config()
+
+    def register_json_provider(self):
+        '''Parses and serializes JSON with orjson when it is installed.
+
+        See utils.json_codec. The responses are the same JSON either way.
+        '''
+
+        self.app.json = FastJSONProvider(self.app)
+        self.api.representation('application/json')(output_json)
 
     def register_resources(self):
-        '''Adds HTTP endpoints to the API.'''
+        '''Adds HTTP endpoints to the API.
+
+        The pricing contexts of all pricing profiles are built once here
+        and shared by all requests through a PricingContextHolder.
+        '''
+
+        if self.fee_config_path is None:
+            self.pricing_context_holder = PricingContextHolder(self.build_pricing_profiles(None))
+        else:
+            self.pricing_context_holder = PricingContextHolder(None)
+            self.fee_config_watcher = FeeConfigWatcher(
+                self.fee_config_path, self.pricing_context_holder, self.build_pricing_profiles,
+                poll_interval_seconds=self.fee_config_poll_seconds
+            )
+            self.fee_config_watcher.reload(raise_errors=True)
+        self.api.add_resource(
+            CacheableDeliveryFeeResource if self.delivery_fee_get_enabled
+            else DeliveryFeeResource, '/delivery-fee',
+            resource_class_kwargs={
+                'pricing_context_holder': self.pricing_context_holder,
+                'admission_controller': self.admission_controller
+            }
+        )
+        self.api.add_resource(
+            DeliveryFeeBatchResource, '/delivery-fee/batch',
+            resource_class_kwargs={
+                'pricing_context_holder': self.pricing_context_holder,
+                'max_batch_size': self.max_batch_size
+            }
+        )
+        self.api.add_resource(
+            QuoteGridResource, '/delivery-fee/quote-grid',
+            resource_class_kwargs={'pricing_context_holder': self.pricing_context_holder}
+        )
+
+    def build_pricing_profiles(self, fee_config: dict | None) -> PricingProfiles:
+        '''Builds pricing profiles from a validated fee configuration with the API settings.'''
+
+        return pricing_profiles_from_config(
+            fee_config, fee_cache_size=self.fee_cache_size,
+            fee_cache_ttl_seconds=self.fee_cache_ttl_seconds, metrics=self.metrics
+        )
+
+    def watch_fee_config(self):
+        '''Reloads the fee configuration file when it changes or on SIGHUP.'''
+
+        self.fee_config_watcher.install_signal_handler()
+        self.fee_config_watcher.start()
+        self.add_shutdown_hook(self.fee_config_watcher.stop)
+
+    def register_metrics(self):
+        '''Adds the /metrics endpoint and times the requests and their serialization.'''
+
+        self.api.add_resource(
+            MetricsResource, '/metrics', resource_class_kwargs={'metrics': self.metrics}
+        )
+        if self.admission_controller is not None:
+            self.admission_controller.register_gauges(self.metrics)
 
-        self.api.add_resource(DeliveryFeeResource, '/delivery-fee')
+        @self.app.before_request
+        def start_request_timer():
+            g.request_start = perf_counter()
+
+        @self.api.representation('application/json')
+        def output_timed_json(data, code, headers=None):
+            serialization_start = perf_counter()
+            response = output_json(data, code, headers)
+            serialization_end = perf_counter()
+            self.metrics.observe_stage('serialization', serialization_end - serialization_start)
+            if 'request_start' in g:
+                self.metrics.observe_stage('request', serialization_end - g.request_start)
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            self.metrics.count_request(endpoint, code)
+            return response
+
+    def add_shutdown_hook(self, hook):
+        '''Registers a function without arguments to be called by shutdown().'''
+
+        self.shutdown_hooks.append(hook)
+
+    def shutdown(self):
+        '''Calls the shutdown hooks in reverse order of registration.
+
+        Called by the WSGI server when a worker stops gracefully.
+        '''
+
+        while self.shutdown_hooks:
+            self.shutdown_hooks.pop()()
 
     def run(self):
-        '''Runs the Flask server.'''
+        '''Runs the Flask development server.
+
+        Not for production use, see serve.py for that.
+        '''
 
         self.app.run(debug=True)
 
+def create_delivery_api() -> DeliveryApi:
+    '''Creates a DeliveryApi configured by environment variables.
+
+    DELIVERY_API_FEE_CONFIG is the path of the fee configuration file,
+    DELIVERY_API_DELIVERY_FEE_GET=1 allows GET requests to /delivery-fee,
+    and DELIVERY_API_MAX_IN_FLIGHT and DELIVERY_API_MAX_QUEUED turn on
+    admission control for POST requests to /delivery-fee.
+    '''
+
+    return DeliveryApi(
+        fee_config_path=os.environ.get('DELIVERY_API_FEE_CONFIG'),
+        delivery_fee_get_enabled=os.environ.get('DELIVERY_API_DELIVERY_FEE_GET') == '1',
+        max_in_flight_requests=int(os.environ.get('DELIVERY_API_MAX_IN_FLIGHT', '0')),
+        max_queued_requests=int(os.environ.get('DELIVERY_API_MAX_QUEUED', '0'))
+    )
+
+def create_app() -> Flask:
+    '''Creates the Flask app of a new DeliveryApi for a WSGI server.'''
+
+    return create_delivery_api().app
+
 if __name__ == '__main__':
     delivery_api = DeliveryApi()
     delivery_api.run()
@@ -0,0 +1,51 @@
+'''Pricing core.
+
+This package contains the delivery fee calculator without the web server,
+for batch jobs and services that price orders in their own process.
+Importing it loads only the calculator and the standard library modules
+it needs, not Flask, flask_restful, marshmallow or NumPy, so that short-lived
+processes start fast.
+
+The classes that validate requests, load fee configurations or serve the
+API are available from this package too, but their modules and the
+frameworks they need are only imported when one of them is first used,
+for example pricing.PricingContext or pricing.DeliveryApi.
+
+`python3 -m benchmarks.bench_import_time` measures the import times.
+'''
+from utils.delivery_fee_cache import DeliveryFeeCache
+from utils.delivery_fee_calculator import DeliveryFeeCalculator, FeeBreakdown
+from utils.delivery_order import DeliveryOrder
+from utils.rush_calendar import RushCalendar
+
+# the modules of the names that are imported on first use
+_LAZY_MODULES = {
+    'DeliveryFeeSchema': 'schemas.delivery_fee',
+    'FeeConfigSchema': 'schemas.fee_config',
+    'PricingContext': 'utils.pricing_context',
+    'PricingProfiles': 'utils.pricing_context',
+    'load_fee_config': 'utils.fee_config',
+    'pricing_profiles_from_config': 'utils.fee_config',
+    'DeliveryApi': 'main',
+    'create_app': 'main',
+}
+
+__all__ = [
+    'DeliveryFeeCache', 'DeliveryFeeCalculator', 'DeliveryOrder', 'FeeBreakdown',
+    'RushCalendar', *_LAZY_MODULES
+]
+
+
+def __getattr__(name: str):
+    '''Imports a name that needs a web framework or marshmallow when it is first used.'''
+
+    module_name = _LAZY_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    from importlib import import_module
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
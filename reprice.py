@@ -0,0 +1,64 @@
+'''Offline bulk repricing.
+
+Reads orders from a CSV or JSON Lines file, calculates the delivery fee
+of each order with the current pricing rules and writes the orders with
+their fees to another file as it goes. Invalid orders are written to a
+reject file with their validation error messages.
+
+Usage, from the root folder of the project:
+python3 reprice.py orders.csv --output priced.csv --rejects rejects.jsonl
+To use several CPU cores, add for example --workers 8.
+'''
+import argparse
+import sys
+from contextlib import nullcontext
+from utils.order_stream import FORMATS, PricedOrderWriter, chunked, detect_format, price_chunks, read_orders
+from utils.parallel_repricing import price_chunks_in_parallel
+from utils.pricing_context import PricingContext
+
+
+def parse_args(args: list | None = None) -> argparse.Namespace:
+    '''Reads the command line arguments.'''
+    parser = argparse.ArgumentParser(description='Reprices a file of orders.')
+    parser.add_argument('input', help='CSV or JSON Lines file of orders')
+    parser.add_argument('--output', required=True, help='file to write the priced orders to')
+    parser.add_argument('--rejects', help='JSON Lines file to write the invalid orders to')
+    parser.add_argument(
+        '--format', choices=FORMATS,
+        help='format of the input and output files, by default detected from the input file name'
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, default=10000, help='number of orders validated at a time'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='number of worker processes, 1 prices in the current process'
+    )
+    return parser.parse_args(args)
+
+def reprice(args: argparse.Namespace) -> PricedOrderWriter:
+    '''Reprices args.input into args.output and returns the writer with its counts.'''
+    file_format = args.format or detect_format(args.input)
+    with (
+        open(args.input, encoding='utf-8', newline='') as input_file,
+        open(args.output, 'w', encoding='utf-8', newline='') as output_file,
+        open(args.rejects, 'w', encoding='utf-8') if args.rejects else nullcontext() as rejects_file,
+    ):
+        writer = PricedOrderWriter(output_file, file_format, rejects_file)
+        chunks = chunked(read_orders(input_file, file_format), args.chunk_size)
+        if args.workers > 1:
+            priced_chunks = price_chunks_in_parallel(chunks, args.workers)
+        else:
+            priced_chunks = price_chunks(PricingContext.create(), chunks)
+        for chunk, delivery_fees, errors in priced_chunks:
+            writer.write_chunk(chunk, delivery_fees, errors)
+    return writer
+
+
+if __name__ == '__main__':
+    repricing_writer = reprice(parse_args())
+    print(
+        f'{repricing_writer.priced_count} orders priced, '
+        f'{repricing_writer.rejected_count} orders rejected',
+        file=sys.stderr
+    )
@@ -3,12 +3,15 @@
 Contains classes that inherit from flask_restful.Resource
 and define HTTP endpoints for URLs.
 '''
+from datetime import datetime, timezone
 from http import HTTPStatus
+from time import perf_counter
 from flask import request
 from flask_restful import Resource
-from marshmallow import ValidationError
-from schemas.delivery_fee import DeliveryFeeSchema
-from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.admission_control import QUEUE_DEADLINE_HEADER, AdmissionController
+from utils.pricing_context import (
+    BREAKDOWN_QUERY_VALUES, UNKNOWN_PROFILE_RESPONSE, PricingContext, PricingContextHolder
+)
 
 
 class DeliveryFeeResource(Resource):
@@ -19,10 +22,12 @@ class DeliveryFeeResource(Resource):
 
     Attributes
     ----------
-    delivery_fee_schema: DeliveryFeeSchema
-        A marshmallow schema for validating request data
-    delivery_fee_calculator: DeliveryFeeCalculator
-        Used to calculate the delivery fee based on the request
+    pricing_context_holder: PricingContextHolder
+        Holds the pricing contexts that validate the request data
+        and calculate the delivery fee for each pricing profile
+    admission_controller: AdmissionController | None
+        Limits the POST requests being priced at the same time,
+        or None to admit every request
 
     Methods
     -------
@@ -30,28 +35,206 @@ class DeliveryFeeResource(Resource):
         HTTP POST endpoint
     '''
 
-    def __init__(self):
-        self.delivery_fee_schema = DeliveryFeeSchema()
-        self.delivery_fee_calculator = DeliveryFeeCalculator()
+    def __init__(
+            self, pricing_context_holder: PricingContextHolder,
+            admission_controller: AdmissionController | None = None
+    ):
+        self.pricing_context_holder = pricing_context_holder
+        self.admission_controller = admission_controller
 
     def post(self):
         '''Calculates delivery fee based on parameters in the request.
 
         Returns a JSON with the calculated delivery_fee or a JSON with 
-        a message containing error data.
+        a message containing error data. With the query parameter
+        breakdown=true, the JSON also has the components of the fee.
+        The X-Pricing-Profile header of the request chooses the pricing
+        profile. The headers of the response tell which profile and fee
+        configuration were used.
+        With an admission controller, a request that can't be admitted
+        before its queue deadline gets status 503 with a Retry-After header.
         POST endpoint to URL /delivery-fee.
         '''
 
-        request_dict = request.get_json()
+        if self.admission_controller is None:
+            return self._price_order()
+        admission_controller = self.admission_controller
+        if not admission_controller.acquire(
+                admission_controller.queue_deadline_seconds(request.headers.get(QUEUE_DEADLINE_HEADER))
+        ):
+            return admission_controller.overloaded_response()
         try:
-            # Validate the request data with marshmallow
-            validated_request_dict = self.delivery_fee_schema.load(data=request_dict)
-        except ValidationError as error:
-            return {
-                'message': 'Validation errors', 'errors': error.messages_dict
-            }, HTTPStatus.BAD_REQUEST
+            return self._price_order()
+        finally:
+            admission_controller.release()
 
-        delivery_fee = self.delivery_fee_calculator.calculate_delivery_fee(validated_request_dict)
+    def _price_order(self):
+        '''Prices the order in the request JSON, see post().'''
 
-        return {'delivery_fee': round(delivery_fee)}, HTTPStatus.OK
-    
\ No newline at end of file
+        pricing_context = self.pricing_context_holder.get(request.headers.get('X-Pricing-Profile'))
+        if pricing_context is None:
+            return UNKNOWN_PROFILE_RESPONSE
+        response_dict, http_status = pricing_context.price_order(
+            _get_request_json(pricing_context),
+            breakdown=request.args.get('breakdown', '').lower() in BREAKDOWN_QUERY_VALUES
+        )
+        return response_dict, http_status, pricing_context.response_headers()
+
+
+class CacheableDeliveryFeeResource(DeliveryFeeResource):
+    '''
+    HTTP endpoints for the URL /delivery-fee, including GET.
+
+    The GET endpoint takes the order as query parameters, and its
+    responses can be cached by HTTP caches.
+
+    ...
+
+    Methods
+    -------
+    get()
+        HTTP GET endpoint
+    post()
+        HTTP POST endpoint
+    '''
+
+    def get(self):
+        '''Calculates delivery fee based on the query parameters of the request.
+
+        Takes the same parameters as the POST endpoint, and the time
+        defaults to the current time. Returns the same JSON as the POST
+        endpoint. A successful response has an ETag and a Cache-Control
+        header that expires when the rush next starts or ends, and a request
+        with a matching If-None-Match header gets an empty response
+        with status 304.
+        GET endpoint to URL /delivery-fee.
+        '''
+
+        pricing_context = self.pricing_context_holder.get(request.headers.get('X-Pricing-Profile'))
+        if pricing_context is None:
+            return UNKNOWN_PROFILE_RESPONSE
+        now = datetime.now(timezone.utc)
+        # digits are converted to int, so that well-formed orders take the fast path
+        query = {
+            key: int(value) if value.isascii() and value.isdigit() else value
+            for key, value in request.args.items()
+        }
+        breakdown = str(query.pop('breakdown', '')).lower() in BREAKDOWN_QUERY_VALUES
+        query.setdefault('time', now.strftime('%Y-%m-%dT%H:%M:%SZ'))
+        response_dict, http_status = pricing_context.price_order(query, breakdown=breakdown)
+        return _cacheable_response(pricing_context, response_dict, http_status, now)
+
+
+class DeliveryFeeBatchResource(Resource):
+    '''
+    HTTP endpoints for the URL /delivery-fee/batch.
+
+    ...
+
+    Attributes
+    ----------
+    pricing_context_holder: PricingContextHolder
+        Holds the pricing contexts that validate the request data
+        and calculate the delivery fees for each pricing profile
+    max_batch_size: int
+        The maximum number of orders accepted in one request
+
+    Methods
+    -------
+    post()
+        HTTP POST endpoint
+    '''
+
+    def __init__(self, pricing_context_holder: PricingContextHolder, max_batch_size: int):
+        self.pricing_context_holder = pricing_context_holder
+        self.max_batch_size = max_batch_size
+
+    def post(self):
+        '''Calculates delivery fees for a list of orders in the request.
+
+        Returns a JSON with a list of results that is index-aligned
+        with the orders in the request. Each result contains either the
+        calculated delivery_fee or a message containing error data.
+        The X-Pricing-Profile header of the request chooses the pricing
+        profile. The headers of the response tell which profile and fee
+        configuration were used.
+        POST endpoint to URL /delivery-fee/batch.
+        '''
+
+        pricing_context = self.pricing_context_holder.get(request.headers.get('X-Pricing-Profile'))
+        if pricing_context is None:
+            return UNKNOWN_PROFILE_RESPONSE
+        response_dict, http_status = pricing_context.price_orders(
+            _get_request_json(pricing_context), self.max_batch_size
+        )
+        return response_dict, http_status, pricing_context.response_headers()
+
+
+class QuoteGridResource(Resource):
+    '''
+    HTTP endpoints for the URL /delivery-fee/quote-grid.
+
+    ...
+
+    Attributes
+    ----------
+    pricing_context_holder: PricingContextHolder
+        Holds the pricing contexts with the precomputed quote grids
+        of each pricing profile
+
+    Methods
+    -------
+    get()
+        HTTP GET endpoint
+    '''
+
+    def __init__(self, pricing_context_holder: PricingContextHolder):
+        self.pricing_context_holder = pricing_context_holder
+
+    def get(self):
+        '''Returns the quote grid for the time in the query parameter time.
+
+        Returns a JSON with the table of fees that applies at the given
+        time, or at the current time without the parameter, or a JSON
+        with a message containing error data. The response has an ETag,
+        and a request with a matching If-None-Match header gets an empty
+        response with status 304. The response can be cached until the
+        rush next starts or ends. The X-Pricing-Profile header of the
+        request chooses the pricing profile.
+        GET endpoint to URL /delivery-fee/quote-grid.
+        '''
+
+        pricing_context = self.pricing_context_holder.get(request.headers.get('X-Pricing-Profile'))
+        if pricing_context is None:
+            return UNKNOWN_PROFILE_RESPONSE
+        now = datetime.now(timezone.utc)
+        response_dict, http_status, etag = pricing_context.quote_grid(request.args, now)
+        return _cacheable_response(pricing_context, response_dict, http_status, now, etag)
+
+
+def _cacheable_response(
+        pricing_context: PricingContext, response_dict: dict, http_status: HTTPStatus,
+        now: datetime, etag: str | None = None
+) -> tuple:
+    '''Adds caching headers to a successful response, see PricingContext.cache_headers.
+
+    Returns status 304 without a body when the If-None-Match header
+    of the request matches the ETag of the response.
+    '''
+    headers = pricing_context.response_headers()
+    if http_status != HTTPStatus.OK:
+        return response_dict, http_status, headers
+    headers.update(pricing_context.cache_headers(response_dict, now, etag))
+    if request.if_none_match.contains(headers['ETag'].strip('"')):
+        return '', HTTPStatus.NOT_MODIFIED, headers
+    return response_dict, http_status, headers
+
+
+def _get_request_json(pricing_context: PricingContext):
+    '''Parses the request JSON, recording how long it took if metrics are enabled.'''
+    if pricing_context.metrics is None:
+        return request.get_json()
+    parsing_start = perf_counter()
+    request_json = request.get_json()
+    pricing_context.metrics.observe_stage('json_parsing', perf_counter() - parsing_start)
+    return request_json
@@ -0,0 +1,39 @@
+'''HTTP endpoints related to metrics.
+
+Contains classes that inherit from flask_restful.Resource
+and define HTTP endpoints for URLs.
+'''
+from flask import Response
+from flask_restful import Resource
+from utils.metrics import MetricsRegistry
+
+
+class MetricsResource(Resource):
+    '''
+    HTTP endpoints for the URL /metrics.
+
+    ...
+
+    Attributes
+    ----------
+    metrics: MetricsRegistry
+        The metrics to expose
+
+    Methods
+    -------
+    get()
+        HTTP GET endpoint
+    '''
+
+    def __init__(self, metrics: MetricsRegistry):
+        self.metrics = metrics
+
+    def get(self):
+        '''Returns the metrics in the Prometheus text exposition format.
+
+        GET endpoint to URL /metrics.
+        '''
+
+        return Response(
+            self.metrics.render_prometheus(), mimetype='text/plain; version=0.0.4'
+        )
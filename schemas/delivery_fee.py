@@ -1,10 +1,13 @@
 '''Schemas for data validation.
 
 This module contains the class DeliveryFeeSchema 
-for validating JSON data.
+for validating JSON data, and the class QuoteGridSchema
+for validating the query parameters of a quote grid request.
 '''
+import re
 from datetime import timezone, datetime
-from marshmallow import Schema, fields, validate, validates, ValidationError
+from marshmallow import Schema, fields, post_load, validate, ValidationError
+from utils.delivery_order import DeliveryOrder
 
 class DeliveryFeeSchema(Schema):
     '''
@@ -25,12 +28,17 @@ class DeliveryFeeSchema(Schema):
         and that the number is greater than zero.
     time: fields.AwareDateTime
         Validates that the field is given, and that it can be converted to 
-        a timezone aware datetime object. time is returned as a datetime object.
+        a timezone aware datetime object. time is returned as a datetime
+        object in UTC, whatever the UTC offset it was given with.
     
     Methods
     -------
-    validates_time(time_as_datetime: datetime)
-        Provides extra validation for time to make sure it's in UTC time zone.
+    make_delivery_order(data: dict)
+        Returns the validated data as a DeliveryOrder.
+    fast_load(data: dict)
+        Validates well-formed data without marshmallow, falling back to load().
+    load_batch(data: list)
+        Validates a list of orders and collects errors per order.
     '''
 
     cart_value = fields.Integer(required=True, validate=[
@@ -41,9 +49,124 @@ class DeliveryFeeSchema(Schema):
         validate.Range(min=1, error="Value must be greater than 0.")])
     time = fields.AwareDateTime(required=True)
 
-    @validates("time")
-    def validates_time(self, time_as_datetime: datetime) -> datetime:
-        '''Validates that time is in UTZ timezone.'''
-        if time_as_datetime.tzinfo != timezone.utc:
-            raise ValidationError('Not a valid datetime.')
-        return time_as_datetime
+    @post_load
+    def make_delivery_order(self, data: dict, **kwargs) -> DeliveryOrder:
+        '''Returns the validated data as a DeliveryOrder with the time in UTC.'''
+        return _make_delivery_order(data)
+
+    def fast_load(self, data: dict) -> DeliveryOrder:
+        '''Validates data, skipping marshmallow when data is well-formed.
+
+        Well-formed data has exactly the four fields, positive integers and
+        a time in the form YYYY-MM-DDTHH:MM:SSZ or YYYY-MM-DDTHH:MM:SS+HH:MM.
+        Anything else is validated with load(), so error messages are the
+        same as before.
+        '''
+        validated_data = _fast_validate(data)
+        if validated_data is None:
+            return self.load(data=data)
+        return validated_data
+
+    def load_batch(self, data: list) -> tuple[list, dict]:
+        '''Validates a list of orders in one pass.
+
+        Well-formed orders are validated like in fast_load(), and the rest
+        are validated together with load(many=True).
+        Returns a list of validated orders that is index-aligned with data,
+        with None in place of each invalid order, and a dict of
+        validation errors keyed by the index of the invalid order.
+        '''
+        if not isinstance(data, list):
+            raise ValidationError({'_schema': [self.error_messages['type']]})
+        validated_orders = [_fast_validate(order) for order in data]
+        slow_indexes = [
+            index for index, order in enumerate(validated_orders) if order is None
+        ]
+        if not slow_indexes:
+            return validated_orders, {}
+        slow_orders = [data[index] for index in slow_indexes]
+        errors = {}
+        try:
+            slow_validated_orders = self.load(data=slow_orders, many=True)
+        except ValidationError as error:
+            # post_load is skipped when any of the orders is invalid,
+            # so the valid orders are still dicts
+            slow_validated_orders = [
+                _make_delivery_order(order) if slow_index not in error.messages else None
+                for slow_index, order in enumerate(error.valid_data)
+            ]
+            errors = {
+                slow_indexes[slow_index]: messages
+                for slow_index, messages in error.messages.items()
+            }
+        for slow_index, index in enumerate(slow_indexes):
+            if index not in errors:
+                validated_orders[index] = slow_validated_orders[slow_index]
+        return validated_orders, errors
+
+
+class QuoteGridSchema(Schema):
+    '''
+    Validates the query parameters of a quote grid request with marshmallow.
+
+    ...
+
+    Attributes
+    ----------
+    time: fields.AwareDateTime
+        Validates that the field, if given, can be converted to a timezone
+        aware datetime object. time is None when it's not given.
+    '''
+
+    time = fields.AwareDateTime(load_default=None)
+
+
+_INTEGER_FIELD_NAMES = ('cart_value', 'delivery_distance', 'number_of_items')
+_match_timestamp = re.compile(
+    r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(Z|[+-]\d{2}:\d{2})', re.ASCII
+).fullmatch
+
+def _make_delivery_order(data: dict) -> DeliveryOrder:
+    '''Returns validated order data as a DeliveryOrder with the time in UTC.'''
+    time_as_datetime = data['time']
+    if time_as_datetime.tzinfo is not timezone.utc:
+        time_as_datetime = time_as_datetime.astimezone(timezone.utc)
+    return DeliveryOrder(
+        data['cart_value'], data['delivery_distance'], data['number_of_items'], time_as_datetime
+    )
+
+def _fast_validate(data) -> DeliveryOrder | None:
+    '''Validates well-formed order data without marshmallow.
+
+    Returns the validated data in the same form as DeliveryFeeSchema.load,
+    or None when data is not well-formed and needs the full schema.
+    '''
+    if type(data) is not dict or len(data) != 4:
+        return None
+    try:
+        for field_name in _INTEGER_FIELD_NAMES:
+            value = data[field_name]
+            if type(value) is not int or value < 1:
+                return None
+        time_as_string = data['time']
+    except KeyError:
+        return None
+    if type(time_as_string) is not str or _match_timestamp(time_as_string) is None:
+        return None
+    if time_as_string[19] == 'Z':
+        # Z is only understood by fromisoformat in Python 3.11 and newer, and
+        # an offset of +00:00 gives timezone.utc, which is faster than replace()
+        time_as_string = time_as_string[:19] + '+00:00'
+    try:
+        # fromisoformat checks the date, time and offset
+        time_as_datetime = datetime.fromisoformat(time_as_string)
+    except ValueError:
+        return None
+    if time_as_datetime.tzinfo is not timezone.utc:
+        time_as_datetime = time_as_datetime.astimezone(timezone.utc)
+    return DeliveryOrder(
+        data['cart_value'],
+        data['delivery_distance'],
+        data['number_of_items'],
+        time_as_datetime,
+    )
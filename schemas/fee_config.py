@@ -0,0 +1,150 @@
+'''Schemas for fee configuration validation.
+
+This module contains the classes FeeProfileSchema and FeeConfigSchema
+for validating fee configuration files.
+'''
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from marshmallow import Schema, fields, validate, validates, validates_schema, ValidationError
+
+_NON_NEGATIVE = validate.Range(min=0, error="Value must be 0 or greater.")
+_POSITIVE = validate.Range(min=1, error="Value must be greater than 0.")
+_RUSH_ENDS_BEFORE_START = 'Rush cannot end before it starts.'
+
+
+class FeeProfileSchema(Schema):
+    '''
+    Validates the fees of a pricing profile with marshmallow.
+
+    Every field is optional and, except currency, has the name of the
+    DeliveryFeeCalculator attribute it sets. Fields that are not given
+    keep the default value of the calculator.
+
+    ...
+
+    Attributes
+    ----------
+    currency: fields.String
+        The currency of the fees, for example "EUR", returned with each fee.
+    time_zone: fields.String
+        The IANA name of the time zone of the rush, for example "Europe/Helsinki".
+    time_rush_start_hour: fields.Time
+        Returned as a datetime.time, given as for example "15:00".
+    time_rush_end_hour: fields.Time
+        Returned as a datetime.time, given as for example "19:00".
+    The other attributes are non-negative integers, except time_rush_weekday,
+    which is 0... 6 for Monday... Sunday, time_rush_multiplier, which is
+    a non-negative number, and delivery_distance_additional_length_meters,
+    which is greater than zero.
+
+    Methods
+    -------
+    validates_time_zone(time_zone: str)
+        Validates that the time zone is known.
+    validates_rush_hours(data: dict)
+        Validates that the rush does not end before it starts.
+    '''
+
+    currency = fields.String(validate=[validate.Length(min=1)])
+    cart_value_free_delivery_limit_cents = fields.Integer(validate=[_NON_NEGATIVE])
+    cart_value_surcharge_limit_cents = fields.Integer(validate=[_NON_NEGATIVE])
+    number_of_items_surcharge_limit = fields.Integer(validate=[_NON_NEGATIVE])
+    number_of_items_surcharge_fee_cents = fields.Integer(validate=[_NON_NEGATIVE])
+    number_of_items_bulk_limit = fields.Integer(validate=[_NON_NEGATIVE])
+    number_of_items_bulk_fee_cents = fields.Integer(validate=[_NON_NEGATIVE])
+    delivery_distance_start_meters = fields.Integer(validate=[_NON_NEGATIVE])
+    delivery_distance_start_fee_cents = fields.Integer(validate=[_NON_NEGATIVE])
+    delivery_distance_additional_length_meters = fields.Integer(validate=[_POSITIVE])
+    delivery_distance_additional_length_fee_cents = fields.Integer(validate=[_NON_NEGATIVE])
+    time_zone = fields.String()
+    time_rush_weekday = fields.Integer(validate=[
+        validate.Range(min=0, max=6, error="Value must be between 0 and 6.")])
+    time_rush_start_hour = fields.Time()
+    time_rush_end_hour = fields.Time()
+    time_rush_multiplier = fields.Float(validate=[_NON_NEGATIVE])
+    max_delivery_fee = fields.Integer(validate=[_NON_NEGATIVE])
+
+    @validates('time_zone')
+    def validates_time_zone(self, time_zone: str):
+        '''Validates that the time zone is known.'''
+        try:
+            ZoneInfo(time_zone)
+        except (ZoneInfoNotFoundError, ValueError) as error:
+            raise ValidationError('Not a valid time zone.') from error
+
+    @validates_schema
+    def validates_rush_hours(self, data: dict, **kwargs):
+        '''Validates that the rush does not end before it starts.'''
+        if _rush_ends_before_start(data):
+            raise ValidationError(_RUSH_ENDS_BEFORE_START, 'time_rush_end_hour')
+
+
+class FeeConfigSchema(FeeProfileSchema):
+    '''
+    Validates a fee configuration file with marshmallow.
+
+    The fee fields of FeeProfileSchema at the top level are shared by all
+    pricing profiles, and each profile in profiles can override them.
+    Without profiles, the configuration has one profile called default.
+
+    ...
+
+    Attributes
+    ----------
+    version: fields.String
+        A tag identifying the configuration, returned with each fee.
+    profiles: fields.Dict
+        The fees of each pricing profile by profile name.
+    default_profile: fields.String
+        The profile used when a request does not choose one. Required
+        when there are several profiles.
+
+    Methods
+    -------
+    validates_default_profile(data: dict)
+        Validates that the default profile is one of the profiles.
+    validates_profile_rush_hours(data: dict)
+        Validates that the rush of no profile ends before it starts.
+    '''
+
+    version = fields.String(required=True, validate=[validate.Length(min=1)])
+    profiles = fields.Dict(
+        keys=fields.String(validate=[validate.Length(min=1)]),
+        values=fields.Nested(FeeProfileSchema), validate=[validate.Length(min=1)]
+    )
+    default_profile = fields.String()
+
+    @validates_schema
+    def validates_default_profile(self, data: dict, **kwargs):
+        '''Validates that the default profile is one of the profiles.'''
+        profiles = data.get('profiles', {})
+        if 'default_profile' in data:
+            if data['default_profile'] not in profiles:
+                raise ValidationError('Not one of the profiles.', 'default_profile')
+        elif len(profiles) > 1:
+            raise ValidationError(
+                'Missing data for field required with several profiles.', 'default_profile'
+            )
+
+    @validates_schema
+    def validates_profile_rush_hours(self, data: dict, **kwargs):
+        '''Validates that the rush of no profile ends before it starts.
+
+        A profile can override only one of the rush hours, so the hours are
+        checked after the profile is merged with the shared fields, as in
+        utils.fee_config.profile_calculator_configs.
+        '''
+        errors = {
+            profile_name: {'time_rush_end_hour': [_RUSH_ENDS_BEFORE_START]}
+            for profile_name, profile_config in data.get('profiles', {}).items()
+            if _rush_ends_before_start({**data, **profile_config})
+        }
+        if errors:
+            raise ValidationError(errors, 'profiles')
+
+
+def _rush_ends_before_start(data: dict) -> bool:
+    '''Tells whether data sets a rush end hour that is before its rush start hour.'''
+    return (
+        'time_rush_start_hour' in data and 'time_rush_end_hour' in data
+        and data['time_rush_end_hour'] < data['time_rush_start_hour']
+    )
@@ -0,0 +1,107 @@
+'''Production server.
+
+This file contains the class DeliveryApiServer, which serves
+DeliveryApi with gunicorn using several worker processes and threads.
+Settings are read from command line arguments, or from environment
+variables when an argument is not given.
+'''
+import argparse
+import os
+from gunicorn.app.base import BaseApplication
+from main import create_delivery_api
+
+
+class DeliveryApiServer(BaseApplication):
+    '''
+    Serves DeliveryApi with gunicorn.
+
+    Each worker process creates its own DeliveryApi after it has been forked.
+
+    ...
+
+    Attributes
+    ----------
+    options: dict
+        gunicorn settings, for example workers, threads and keepalive
+    delivery_api: DeliveryApi
+        The DeliveryApi of the current worker process, see create_delivery_api
+        for the environment variables configuring it
+
+    Methods
+    -------
+    load_config()
+        Passes the options to gunicorn.
+    load()
+        Creates the DeliveryApi of a worker and returns its Flask app.
+    worker_exit(server, worker)
+        Shuts down the DeliveryApi of a worker when the worker stops.
+    '''
+
+    def __init__(self, options: dict):
+        self.options = options
+        self.delivery_api = None
+        super().__init__()
+
+    def load_config(self):
+        '''Passes the options to gunicorn.'''
+
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('worker_exit', self.worker_exit)
+
+    def load(self):
+        '''Creates the DeliveryApi of a worker and returns its Flask app.'''
+
+        self.delivery_api = create_delivery_api()
+        return self.delivery_api.app
+
+    def worker_exit(self, server, worker):
+        '''Shuts down the DeliveryApi of a worker when the worker stops.
+
+        gunicorn calls this after the worker has finished its in-flight requests,
+        or after graceful_timeout has passed.
+        '''
+
+        if self.delivery_api is not None:
+            self.delivery_api.shutdown()
+
+def parse_options(args: list | None = None) -> dict:
+    '''Reads the gunicorn options from command line arguments and environment variables.'''
+
+    parser = argparse.ArgumentParser(description='Serves the delivery API with gunicorn.')
+    parser.add_argument(
+        '--bind', default=os.environ.get('DELIVERY_API_BIND', '0.0.0.0:5000'),
+        help='address to listen on (DELIVERY_API_BIND, default 0.0.0.0:5000)'
+    )
+    parser.add_argument(
+        '--workers', type=int,
+        default=int(os.environ.get('DELIVERY_API_WORKERS', os.cpu_count() or 1)),
+        help='number of worker processes (DELIVERY_API_WORKERS, default number of CPUs)'
+    )
+    parser.add_argument(
+        '--threads', type=int, default=int(os.environ.get('DELIVERY_API_THREADS', 4)),
+        help='number of threads per worker (DELIVERY_API_THREADS, default 4)'
+    )
+    parser.add_argument(
+        '--keepalive', type=int, default=int(os.environ.get('DELIVERY_API_KEEPALIVE', 5)),
+        help='seconds to keep idle connections open (DELIVERY_API_KEEPALIVE, default 5)'
+    )
+    parser.add_argument(
+        '--graceful-timeout', type=int,
+        default=int(os.environ.get('DELIVERY_API_GRACEFUL_TIMEOUT', 30)),
+        help='seconds to finish in-flight requests on shutdown '
+             '(DELIVERY_API_GRACEFUL_TIMEOUT, default 30)'
+    )
+    parsed_args = parser.parse_args(args)
+    return {
+        'bind': parsed_args.bind,
+        'workers': parsed_args.workers,
+        'threads': parsed_args.threads,
+        'worker_class': 'gthread',
+        'keepalive': parsed_args.keepalive,
+        'graceful_timeout': parsed_args.graceful_timeout,
+    }
+
+
+if __name__ == '__main__':
+    DeliveryApiServer(parse_options()).run()
@@ -0,0 +1,53 @@
+'''Unit tests for the admission control.
+
+Contains unit test cases that test the functionality of the AdmissionController class.
+'''
+from threading import Thread
+from time import sleep
+import pytest
+from utils.admission_control import AdmissionController
+
+
+def test_admission_controller_queue():
+    '''Tests that a waiting request is admitted when a slot is released before its deadline.'''
+    admission_controller = AdmissionController(1, max_queued=1, max_queue_wait_seconds=5)
+    assert admission_controller.acquire(0)
+    results = []
+    waiting_thread = Thread(target=lambda: results.append(admission_controller.acquire(5)))
+    waiting_thread.start()
+    while admission_controller.queued == 0:
+        sleep(0.001)
+    # the queue is full, so another request is rejected at once
+    assert not admission_controller.acquire(5)
+    admission_controller.release()
+    waiting_thread.join()
+    assert results == [True]
+    assert admission_controller.in_flight == 1
+    assert admission_controller.queued == 0
+    assert admission_controller.rejected == 1
+
+def test_admission_controller_deadline():
+    '''Tests that a waiting request is rejected when its deadline passes.'''
+    admission_controller = AdmissionController(2, max_queued=10)
+    assert admission_controller.acquire(0)
+    assert admission_controller.acquire(0)
+    assert not admission_controller.acquire(0.01)
+    assert (admission_controller.in_flight, admission_controller.queued) == (2, 0)
+    admission_controller.release()
+    assert admission_controller.acquire(0)
+
+@pytest.mark.parametrize(
+    "header_value, expected_seconds",
+    [(None, 1.0), ('250', 0.25), ('5000', 1.0), ('-1', 1.0), ('soon', 1.0), ('0', 0.0)]
+)
+def test_admission_controller_queue_deadline_seconds(
+        header_value: str | None, expected_seconds: float
+):
+    '''Tests that the queue deadline is read from the header and limited.'''
+    admission_controller = AdmissionController(1, max_queue_wait_seconds=1.0)
+    assert admission_controller.queue_deadline_seconds(header_value) == expected_seconds
+
+def test_admission_controller_invalid_limit():
+    '''Tests that at least one request must be allowed in flight.'''
+    with pytest.raises(ValueError):
+        AdmissionController(0)
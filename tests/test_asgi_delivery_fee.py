@@ -0,0 +1,134 @@
+'''Unit tests for the ASGI API.
+
+Contains the same test cases as test_delivery_fee.py,
+sent to DeliveryAsgiApi through an async test client.
+'''
+import asyncio
+from http import HTTPStatus
+from json import dumps, loads
+import pytest
+from parameters import delivery_fee_post_test_parameters
+from asgi import DeliveryAsgiApi
+from main import DeliveryApi
+from utils.pricing_context import MAX_CONTENT_LENGTH
+
+
+async def asgi_request(
+        app, method: str, path: str, request_json=None, query_string: bytes = b''
+) -> tuple[int, dict]:
+    '''Sends one HTTP request to an ASGI app and returns the status and the response JSON.'''
+    body = b'' if request_json is None else dumps(request_json).encode()
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query_string,
+        'headers': [(b'content-type', b'application/json')],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]['status'], loads(messages[1]['body'])
+
+
+@pytest.mark.parametrize(
+    "request_json, expected_response, expected_http_status", delivery_fee_post_test_parameters
+)
+def test_delivery_fee_post(request_json: dict, expected_response: dict, expected_http_status: int):
+    '''Tests the POST endpoint at URL /delivery-fee with multiple test cases.'''
+    status, response = asyncio.run(
+        asgi_request(DeliveryAsgiApi(), 'POST', '/delivery-fee', request_json)
+    )
+    assert status == expected_http_status
+    assert response == expected_response
+
+def test_delivery_fee_concurrent_posts():
+    '''Tests many concurrent requests to the POST endpoint at URL /delivery-fee.'''
+    app = DeliveryAsgiApi()
+
+    async def send_all():
+        return await asyncio.gather(*(
+            asgi_request(app, 'POST', '/delivery-fee', request_json)
+            for request_json, _, _ in delivery_fee_post_test_parameters * 10
+        ))
+
+    responses = asyncio.run(send_all())
+    expected_responses = [
+        (expected_http_status, expected_response)
+        for _, expected_response, expected_http_status in delivery_fee_post_test_parameters * 10
+    ]
+    assert responses == expected_responses
+
+def test_delivery_fee_post_breakdown():
+    '''Tests the POST endpoint at URL /delivery-fee with the fee breakdown turned on.'''
+    request_json = {
+        "cart_value": 790, "delivery_distance": 2235, "number_of_items": 4,
+        "time": "2024-01-15T13:00:00Z"
+    }
+    status, response = asyncio.run(asgi_request(
+        DeliveryAsgiApi(), 'POST', '/delivery-fee', request_json, query_string=b'breakdown=1'
+    ))
+    assert status == HTTPStatus.OK
+    assert response == {
+        'delivery_fee': 710,
+        'breakdown': {
+            'distance_fee': 500, 'items_fee': 0, 'bulk_fee': 0,
+            'small_order_surcharge': 210, 'free_delivery': False,
+            'rush_multiplier': 1, 'max_fee_cap_applied': False,
+        },
+    }
+
+def test_delivery_fee_nonexisting_endpoint():
+    '''Tests the API with a non-existing end points and methods.'''
+    app = DeliveryAsgiApi()
+    status, _ = asyncio.run(asgi_request(app, 'POST', '/bad-endpoint', {}))
+    assert status == HTTPStatus.NOT_FOUND
+    status, _ = asyncio.run(asgi_request(app, 'GET', '/bad-endpoint', {}))
+    assert status == HTTPStatus.NOT_FOUND
+    status, _ = asyncio.run(asgi_request(app, 'GET', '/delivery-fee', {}))
+    assert status == HTTPStatus.METHOD_NOT_ALLOWED
+
+def test_delivery_fee_post_checks_like_flask():
+    '''Tests that bad request bodies and unknown profiles get the responses of DeliveryApi.'''
+    asgi_app = DeliveryAsgiApi()
+    flask_client = DeliveryApi(metrics_enabled=False).app.test_client()
+    long_body = b'[' + b' ' * MAX_CONTENT_LENGTH + b']'
+    json_headers = {'content-type': 'application/json'}
+    requests = [
+        ('/delivery-fee', json_headers, long_body),
+        ('/delivery-fee/batch', json_headers, long_body),
+        ('/delivery-fee', {'content-type': 'text/plain'}, long_body),
+        ('/delivery-fee', {**json_headers, 'x-pricing-profile': 'no'}, long_body),
+        ('/delivery-fee', {'content-type': 'text/plain', 'x-pricing-profile': 'no'}, b'{'),
+        ('/delivery-fee', json_headers, b'{'),
+    ]
+
+    async def asgi_post(path: str, headers: dict, body: bytes) -> tuple[int, dict]:
+        # the body arrives in chunks, like from a client streaming it
+        chunks = [body[start:start + 65536] for start in range(0, len(body), 65536)]
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': path, 'query_string': b'',
+            'headers': [(name.encode(), value.encode()) for name, value in headers.items()],
+        }
+        messages = []
+
+        async def receive():
+            chunk = chunks.pop(0)
+            return {'type': 'http.request', 'body': chunk, 'more_body': bool(chunks)}
+
+        async def send(message):
+            messages.append(message)
+
+        await asgi_app(scope, receive, send)
+        return messages[0]['status'], loads(messages[1]['body'])
+
+    for path, headers, body in requests:
+        flask_response = flask_client.post(path, data=body, headers=headers)
+        assert asyncio.run(asgi_post(path, headers, body)) == (
+            flask_response.status_code, loads(flask_response.data)
+        )
+    status, _ = asyncio.run(asgi_post(*requests[0]))
+    assert status == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
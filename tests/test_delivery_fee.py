@@ -21,6 +21,119 @@ def test_delivery_fee_post(request_json: dict, expected_response: dict, expected
         assert response.status_code == expected_http_status
         assert loads(response.data) == expected_response
 
+def test_delivery_fee_post_breakdown():
+    '''Tests the POST endpoint at URL /delivery-fee with the fee breakdown turned on.'''
+    delivery_api = DeliveryApi()
+    request_json = {
+        "cart_value": 790, "delivery_distance": 2235, "number_of_items": 13,
+        "time": "2024-01-19T16:00:00Z"
+    }
+    with delivery_api.app.test_client() as client:
+        response = client.post('/delivery-fee?breakdown=true', json=request_json)
+        assert response.status_code == HTTPStatus.OK
+        assert loads(response.data) == {
+            'delivery_fee': 1500,
+            'breakdown': {
+                'distance_fee': 500, 'items_fee': 450, 'bulk_fee': 120,
+                'small_order_surcharge': 210, 'free_delivery': False,
+                'rush_multiplier': 1.2, 'max_fee_cap_applied': True,
+            },
+        }
+        response = client.post('/delivery-fee?breakdown=false', json=request_json)
+        assert loads(response.data) == {'delivery_fee': 1500}
+        response = client.post('/delivery-fee?breakdown=true', json={})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        # the uncapped distance fee doesn't fit in 64 bits
+        response = client.post(
+            '/delivery-fee?breakdown=true', json=dict(request_json, delivery_distance=10**25)
+        )
+        assert response.status_code == HTTPStatus.OK
+        response_json = loads(response.data)
+        assert response_json['delivery_fee'] == 1500
+        assert response_json['breakdown']['distance_fee'] == 2 * 10**24
+        assert response_json['breakdown']['max_fee_cap_applied'] is True
+
+def test_quote_grid_get():
+    '''Tests the GET endpoint at URL /delivery-fee/quote-grid with and without ETags.'''
+    delivery_api = DeliveryApi()
+    with delivery_api.app.test_client() as client:
+        response = client.get('/delivery-fee/quote-grid?time=2024-01-19T16:00:00Z')
+        assert response.status_code == HTTPStatus.OK
+        rush_quote_grid = loads(response.data)
+        assert rush_quote_grid['rush'] is True
+        assert rush_quote_grid['distance_limits'][:2] == [1000, 1500]
+        assert rush_quote_grid['subtotals'][2][12] == 400 + 450 + 120
+        rush_etag = response.headers['ETag']
+        response = client.get(
+            '/delivery-fee/quote-grid?time=2024-01-19T18:59:00Z',
+            headers={'If-None-Match': rush_etag}
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.data == b''
+        response = client.get(
+            '/delivery-fee/quote-grid?time=2024-01-15T13:00:00Z',
+            headers={'If-None-Match': rush_etag}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert loads(response.data)['rush'] is False
+        assert response.headers['ETag'] != rush_etag
+        response = client.get(
+            '/delivery-fee/quote-grid', query_string={'time': '2024-01-19T17:00:00+02:00'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert loads(response.data)['rush'] is True
+        response = client.get('/delivery-fee/quote-grid?time=2024-13-15T13:00:00Z')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert loads(response.data) == {
+            'message': 'Validation errors', 'errors': {'time': ['Not a valid datetime.']}
+        }
+        assert client.get('/delivery-fee/quote-grid').status_code == HTTPStatus.OK
+
+@pytest.mark.parametrize(
+    "request_json, expected_response, expected_http_status", delivery_fee_post_test_parameters
+)
+def test_delivery_fee_get(request_json: dict, expected_response: dict, expected_http_status: int):
+    '''Tests the GET endpoint at URL /delivery-fee with the POST test cases as query parameters.'''
+    delivery_api = DeliveryApi(delivery_fee_get_enabled=True)
+    if 'time' not in request_json:
+        pytest.skip('the time of a GET request defaults to the current time')
+    with delivery_api.app.test_client() as client:
+        response = client.get('/delivery-fee', query_string=request_json)
+        assert response.status_code == expected_http_status
+        assert loads(response.data) == expected_response
+
+def test_delivery_fee_get_caching():
+    '''Tests the caching headers of the GET endpoint at URL /delivery-fee.'''
+    delivery_api = DeliveryApi(delivery_fee_get_enabled=True)
+    query_string = {
+        'cart_value': 790, 'delivery_distance': 2235, 'number_of_items': 4,
+        'time': '2024-01-15T13:00:00Z'
+    }
+    with delivery_api.app.test_client() as client:
+        response = client.get('/delivery-fee', query_string=query_string)
+        assert response.status_code == HTTPStatus.OK
+        assert loads(response.data) == {'delivery_fee': 710}
+        etag = response.headers['ETag']
+        assert etag.startswith('"') and etag.endswith('"')
+        assert response.cache_control.public
+        assert 0 <= response.cache_control.max_age <= 7 * 24 * 3600
+        response = client.get(
+            '/delivery-fee', query_string=query_string, headers={'If-None-Match': etag}
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.data == b''
+        response = client.get(
+            '/delivery-fee', query_string=dict(query_string, number_of_items=5),
+            headers={'If-None-Match': etag}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert loads(response.data) == {'delivery_fee': 760}
+        response = client.get('/delivery-fee', query_string=dict(query_string, cart_value=0))
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'ETag' not in response.headers
+        del query_string['time']
+        assert client.get('/delivery-fee', query_string=query_string).status_code == HTTPStatus.OK
+
 def test_delivery_fee_nonexisting_endpoint():
     '''Tests the API with a non-existing end points and methods.'''
     delivery_api = DeliveryApi()
@@ -31,3 +144,116 @@ def test_delivery_fee_nonexisting_endpoint():
         assert get_response_bad_endpoint.status_code == HTTPStatus.NOT_FOUND
         get_response_right_endpoint_bad_method = client.get('/delivery-fee', json={})
         assert get_response_right_endpoint_bad_method.status_code == HTTPStatus.METHOD_NOT_ALLOWED
+
+def test_delivery_fee_batch_post():
+    '''Tests the POST endpoint at URL /delivery-fee/batch with all single order test cases.'''
+    delivery_api = DeliveryApi()
+    request_json = [parameters[0] for parameters in delivery_fee_post_test_parameters]
+    expected_results = [parameters[1] for parameters in delivery_fee_post_test_parameters]
+    with delivery_api.app.test_client() as client:
+        response = client.post('/delivery-fee/batch', json=request_json)
+        assert response.status_code == HTTPStatus.OK
+        assert loads(response.data) == {'delivery_fees': expected_results}
+
+def test_delivery_fee_batch_post_invalid_batch():
+    '''Tests the POST endpoint at URL /delivery-fee/batch with a non-list and a too large batch.'''
+    delivery_api = DeliveryApi(max_batch_size=2)
+    request_json = delivery_fee_post_test_parameters[0][0]
+    with delivery_api.app.test_client() as client:
+        response = client.post('/delivery-fee/batch', json=request_json)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert loads(response.data) == {
+            'message': 'Validation errors', 'errors': {'_schema': ['Invalid input type.']}
+        }
+        response = client.post('/delivery-fee/batch', json=[request_json] * 3)
+        assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+        response = client.post('/delivery-fee/batch', json=[request_json] * 2)
+        assert response.status_code == HTTPStatus.OK
+
+def test_delivery_api_shutdown():
+    '''Tests that shutdown calls the shutdown hooks once in reverse order of registration.'''
+    delivery_api = DeliveryApi()
+    calls = []
+    delivery_api.add_shutdown_hook(lambda: calls.append('first'))
+    delivery_api.add_shutdown_hook(lambda: calls.append('second'))
+    delivery_api.shutdown()
+    delivery_api.shutdown()
+    assert calls == ['second', 'first']
+
+def test_metrics_get():
+    '''Tests that the GET endpoint at URL /metrics counts requests and validation errors.'''
+    delivery_api = DeliveryApi()
+    with delivery_api.app.test_client() as client:
+        for request_json, _, _ in delivery_fee_post_test_parameters:
+            client.post('/delivery-fee', json=request_json)
+        response = client.get('/metrics')
+        assert response.status_code == HTTPStatus.OK
+        metrics = response.data.decode()
+        statuses = [parameters[2] for parameters in delivery_fee_post_test_parameters]
+        ok_count = statuses.count(HTTPStatus.OK)
+        bad_request_count = statuses.count(HTTPStatus.BAD_REQUEST)
+        time_error_count = sum(
+            'time' in parameters[1].get('errors', {})
+            for parameters in delivery_fee_post_test_parameters
+        )
+        assert (
+            f'delivery_api_requests_total{{endpoint="/delivery-fee",status="200"}} {ok_count}'
+            in metrics
+        )
+        assert (
+            f'delivery_api_requests_total{{endpoint="/delivery-fee",status="400"}} {bad_request_count}'
+            in metrics
+        )
+        assert f'delivery_api_validation_errors_total{{field="time"}} {time_error_count}' in metrics
+        assert f'delivery_api_stage_duration_seconds_count{{stage="calculation"}} {ok_count}' in metrics
+        for stage in ('json_parsing', 'validation', 'serialization', 'request'):
+            assert (
+                f'delivery_api_stage_duration_seconds_count{{stage="{stage}"}} {len(statuses)}'
+                in metrics
+            )
+
+def test_metrics_get_unknown_fields():
+    '''Tests that fields that are not declared are counted under one escaped label.'''
+    delivery_api = DeliveryApi()
+    request_json = dict(delivery_fee_post_test_parameters[0][0])
+    with delivery_api.app.test_client() as client:
+        for field_name in ('bad"}} 1\n# x', 'other\\'):
+            response = client.post('/delivery-fee', json={**request_json, field_name: 1})
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+        delivery_api.metrics.register_gauge(
+            'test_gauge', 'A gauge.', lambda: 1, {'label': 'a"b\nc\\'}
+        )
+        metrics = client.get('/metrics').data.decode()
+    assert 'delivery_api_validation_errors_total{field="_unknown"} 2' in metrics
+    assert 'test_gauge{label="a\\"b\\nc\\\\"} 1' in metrics
+    assert not any(line.startswith('# x') for line in metrics.splitlines())
+
+def test_metrics_disabled():
+    '''Tests that the URL /metrics does not exist when metrics are disabled.'''
+    delivery_api = DeliveryApi(metrics_enabled=False)
+    with delivery_api.app.test_client() as client:
+        assert client.get('/metrics').status_code == HTTPStatus.NOT_FOUND
+
+def test_delivery_fee_post_admission_control():
+    '''Tests that POST requests to /delivery-fee get status 503 while the API is saturated.'''
+    delivery_api = DeliveryApi(
+        max_in_flight_requests=1, max_queued_requests=1, max_queue_wait_seconds=0.05,
+        retry_after_seconds=2
+    )
+    request_json = delivery_fee_post_test_parameters[0][0]
+    with delivery_api.app.test_client() as client:
+        assert client.post('/delivery-fee', json=request_json).status_code == HTTPStatus.OK
+        assert delivery_api.admission_controller.acquire(0)
+        response = client.post('/delivery-fee', json=request_json)
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert response.headers['Retry-After'] == '2'
+        response = client.post(
+            '/delivery-fee', json=request_json, headers={'X-Request-Timeout-Ms': '0'}
+        )
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert client.post('/delivery-fee/batch', json=[request_json]).status_code == HTTPStatus.OK
+        delivery_api.admission_controller.release()
+        assert client.post('/delivery-fee', json=request_json).status_code == HTTPStatus.OK
+        metrics = client.get('/metrics').data.decode()
+        assert 'delivery_api_requests_shed 2' in metrics
+        assert 'delivery_api_requests_in_flight 0' in metrics
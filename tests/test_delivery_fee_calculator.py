@@ -0,0 +1,301 @@
+'''Unit tests for the delivery fee calculator.
+
+Contains unit test cases that compare the different ways
+of calculating delivery fees against each other.
+'''
+from bisect import bisect_left
+from datetime import datetime, time, timedelta, timezone
+import random
+import numpy as np
+import pytest
+from utils.delivery_fee_cache import DeliveryFeeCache
+from utils.delivery_fee_calculator import (
+    MAX_QUOTE_GRID_COLUMNS, MAX_QUOTE_GRID_ROWS, DeliveryFeeCalculator
+)
+from utils.delivery_order import DeliveryOrder
+from utils.rush_calendar import RushCalendar
+
+
+def random_orders(number_of_orders: int, seed: int = 0) -> list:
+    '''Generates random orders that hit every rule and its boundaries.'''
+    randomizer = random.Random(seed)
+    start_time = datetime(2024, 1, 15, tzinfo=timezone.utc)
+    rush_boundaries = [
+        datetime(2024, 1, 19, 15, tzinfo=timezone.utc),
+        datetime(2024, 1, 19, 19, tzinfo=timezone.utc),
+        datetime(2024, 1, 19, 19, 0, 0, 1, tzinfo=timezone.utc),
+        datetime(2024, 1, 19, 14, 59, 59, 999999, tzinfo=timezone.utc),
+    ]
+    orders = []
+    for _ in range(number_of_orders):
+        if randomizer.random() < 0.2:
+            time_as_datetime = randomizer.choice(rush_boundaries)
+        else:
+            time_as_datetime = start_time + timedelta(
+                seconds=randomizer.randrange(14 * 24 * 3600),
+                microseconds=randomizer.randrange(1_000_000)
+            )
+        orders.append(DeliveryOrder(
+            cart_value=randomizer.randint(1, 25000),
+            delivery_distance=randomizer.randint(1, 10000),
+            number_of_items=randomizer.randint(1, 30),
+            time=time_as_datetime,
+        ))
+    return orders
+
+def test_calculate_delivery_fees_columnar_matches_scalar():
+    '''Tests that the columnar calculation gives the same fees as the scalar calculation.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    orders = random_orders(20000)
+    scalar_fees = delivery_fee_calculator.calculate_delivery_fees(orders)
+    columnar_fees = delivery_fee_calculator.calculate_delivery_fees_columnar(
+        [order.cart_value for order in orders],
+        [order.delivery_distance for order in orders],
+        [order.number_of_items for order in orders],
+        [order.time for order in orders],
+    )
+    assert columnar_fees.tolist() == scalar_fees
+    assert np.rint(columnar_fees).astype(np.int64).tolist() == [round(fee) for fee in scalar_fees]
+    utc_times = np.array(
+        [order.time.replace(tzinfo=None) for order in orders], dtype='datetime64[us]'
+    )
+    columnar_fees_from_datetime64 = delivery_fee_calculator.calculate_delivery_fees_columnar(
+        [order.cart_value for order in orders],
+        [order.delivery_distance for order in orders],
+        [order.number_of_items for order in orders],
+        utc_times,
+    )
+    assert columnar_fees_from_datetime64.tolist() == scalar_fees
+
+def test_calculate_delivery_fee_matches_stepwise():
+    '''Tests that the pricing plan gives the same fees as applying the add_* methods.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    orders = random_orders(20000, seed=1)
+    for order in orders:
+        assert (
+            delivery_fee_calculator.calculate_delivery_fee(order)
+            == delivery_fee_calculator.calculate_delivery_fee_stepwise(order)
+        )
+
+def test_calculate_delivery_fee_breakdown_adds_up():
+    '''Tests that the breakdown gives the same fee as the pricing plan and adds up to it.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    orders = random_orders(20000, seed=4)
+    for order in orders:
+        fee_breakdown = delivery_fee_calculator.calculate_delivery_fee_breakdown(order)
+        assert fee_breakdown.delivery_fee == delivery_fee_calculator.calculate_delivery_fee(order)
+        delivery_fee = 0 if fee_breakdown.free_delivery else (
+            fee_breakdown.distance_fee + fee_breakdown.items_fee
+            + fee_breakdown.bulk_fee + fee_breakdown.small_order_surcharge
+        )
+        delivery_fee *= fee_breakdown.rush_multiplier
+        assert fee_breakdown.max_fee_cap_applied == (
+            delivery_fee > delivery_fee_calculator.max_delivery_fee
+        )
+        if not fee_breakdown.max_fee_cap_applied:
+            assert fee_breakdown.delivery_fee == delivery_fee
+
+def look_up_delivery_fee(quote_grid: dict, order: DeliveryOrder) -> int:
+    '''Looks up the fee of an order from a quote grid like a client would.'''
+    if order.cart_value >= max(
+            quote_grid['cart_value_surcharge_limit'], quote_grid['cart_value_free_delivery_limit']
+    ):
+        return 0
+    row = bisect_left(quote_grid['distance_limits'], order.delivery_distance)
+    row = min(row, len(quote_grid['subtotals']) - 1)
+    column = min(order.number_of_items, len(quote_grid['subtotals'][row])) - 1
+    small_order_surcharge = max(quote_grid['cart_value_surcharge_limit'] - order.cart_value, 0)
+    return min(
+        round((quote_grid['subtotals'][row][column] + small_order_surcharge)
+              * quote_grid['rush_multiplier']),
+        quote_grid['max_delivery_fee']
+    )
+
+@pytest.mark.parametrize(
+    "rush_multiplier, max_delivery_fee", [(1.2, 1500), (0.5, 1500), (2, 0), (0, 1500), (1.2, 10**7)]
+)
+def test_quote_grid_matches_calculator(rush_multiplier, max_delivery_fee):
+    '''Tests that fees looked up from the quote grids equal the calculated fees.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    delivery_fee_calculator.time_rush_multiplier = rush_multiplier
+    delivery_fee_calculator.max_delivery_fee = max_delivery_fee
+    quote_grids = {rush: delivery_fee_calculator.quote_grid(rush) for rush in (False, True)}
+    for quote_grid in quote_grids.values():
+        assert len(quote_grid['subtotals']) <= MAX_QUOTE_GRID_ROWS
+        assert len(quote_grid['subtotals'][0]) <= MAX_QUOTE_GRID_COLUMNS
+    assert quote_grids[True]['complete'] == (max_delivery_fee < 10**7)
+    for order in random_orders(20000, seed=5):
+        quote_grid = quote_grids[delivery_fee_calculator.is_rush(order.time)]
+        assert look_up_delivery_fee(quote_grid, order) == round(
+            delivery_fee_calculator.calculate_delivery_fee(order)
+        )
+
+def test_surcharge_limit_above_free_delivery_limit():
+    '''Tests that the fees agree when the surcharge limit is above the free delivery limit.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    delivery_fee_calculator.cart_value_surcharge_limit_cents = 15000
+    delivery_fee_calculator.cart_value_free_delivery_limit_cents = 5000
+    orders = random_orders(5000, seed=6)
+    scalar_fees = delivery_fee_calculator.calculate_delivery_fees(orders)
+    assert delivery_fee_calculator.calculate_delivery_fees_columnar(
+        [order.cart_value for order in orders],
+        [order.delivery_distance for order in orders],
+        [order.number_of_items for order in orders],
+        [order.time for order in orders],
+    ).tolist() == scalar_fees
+    quote_grids = {rush: delivery_fee_calculator.quote_grid(rush) for rush in (False, True)}
+    for order, scalar_fee in zip(orders, scalar_fees):
+        fee_breakdown = delivery_fee_calculator.calculate_delivery_fee_breakdown(order)
+        assert fee_breakdown.delivery_fee == scalar_fee
+        assert fee_breakdown.free_delivery == (order.cart_value >= 15000)
+        assert delivery_fee_calculator.calculate_delivery_fee_stepwise(order) == scalar_fee
+        quote_grid = quote_grids[delivery_fee_calculator.is_rush(order.time)]
+        assert look_up_delivery_fee(quote_grid, order) == round(scalar_fee)
+
+def test_next_rush_boundary():
+    '''Tests that the rush state stays the same until the next rush boundary and changes there.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    one_microsecond = timedelta(microseconds=1)
+    for order in random_orders(5000, seed=6):
+        rush = delivery_fee_calculator.is_rush(order.time)
+        boundary = delivery_fee_calculator.next_rush_boundary(order.time)
+        assert order.time < boundary <= order.time + timedelta(days=7)
+        assert delivery_fee_calculator.is_rush(boundary - one_microsecond) == rush
+        assert delivery_fee_calculator.is_rush(boundary) != rush
+
+@pytest.mark.parametrize("time_rush_weekday, time_rush_start_hour, time_rush_end_hour", [
+    (4, time(15), time(19)),
+    # Sundays over the daylight saving time changes, including the hour that is repeated
+    (6, time(2), time(5)),
+    (6, time(1), time(3, 30)),
+])
+def test_rush_in_time_zone(time_rush_weekday, time_rush_start_hour, time_rush_end_hour):
+    '''Tests that the rush calendar follows the local time of the time zone over a year.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    delivery_fee_calculator.time_zone = 'Europe/Helsinki'
+    delivery_fee_calculator.time_rush_weekday = time_rush_weekday
+    delivery_fee_calculator.time_rush_start_hour = time_rush_start_hour
+    delivery_fee_calculator.time_rush_end_hour = time_rush_end_hour
+    randomizer = random.Random(8)
+    # every 17 minutes of 2024, 1990 and 2150, the last two outside of the rush calendar
+    orders = [
+        DeliveryOrder(
+            cart_value=randomizer.randint(1, 25000),
+            delivery_distance=randomizer.randint(1, 10000),
+            number_of_items=randomizer.randint(1, 30),
+            time=datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(
+                minutes=17 * step, microseconds=randomizer.choice([0, 1, 999999])
+            ),
+        )
+        for year, steps in ((2024, 366 * 24 * 60 // 17), (1990, 2000), (2150, 2000))
+        for step in range(steps)
+    ]
+    assert any(delivery_fee_calculator.is_rush(order.time) for order in orders)
+    stepwise_fees = [
+        delivery_fee_calculator.calculate_delivery_fee_stepwise(order) for order in orders
+    ]
+    assert delivery_fee_calculator.calculate_delivery_fees(orders) == stepwise_fees
+    assert [
+        delivery_fee_calculator.calculate_delivery_fee_breakdown(order).delivery_fee
+        for order in orders
+    ] == stepwise_fees
+    assert delivery_fee_calculator.calculate_delivery_fees_columnar(
+        [order.cart_value for order in orders],
+        [order.delivery_distance for order in orders],
+        [order.number_of_items for order in orders],
+        [order.time for order in orders],
+    ).tolist() == stepwise_fees
+
+    one_microsecond = timedelta(microseconds=1)
+    for order in orders[::50]:
+        rush = delivery_fee_calculator.is_rush(order.time)
+        boundary = delivery_fee_calculator.next_rush_boundary(order.time)
+        assert order.time < boundary <= order.time + timedelta(days=7, hours=1)
+        assert delivery_fee_calculator.is_rush(boundary - one_microsecond) == rush
+        assert delivery_fee_calculator.is_rush(boundary) != rush
+
+@pytest.mark.parametrize("time_zone", ['America/New_York', 'Asia/Tokyo', 'UTC'])
+def test_rush_calendar_grows_by_year(time_zone):
+    '''Tests that the rush calendar covers only the years looked up and is right across new year.'''
+    # Wednesday night, so that the rush of 31 December 2025 crosses new year in UTC
+    rush_calendar = RushCalendar(time_zone, 2, time(20), time(23, 59, 59, 999999))
+    assert rush_calendar.years == (0, 0)
+    randomizer = random.Random(10)
+    times = [
+        datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=randomizer.randint(-4000, 4000))
+        for year in (2026, 2024, 2028, 2026) for _ in range(500)
+    ]
+    for time_as_datetime in times:
+        assert rush_calendar.is_rush(time_as_datetime) == (
+            rush_calendar._is_rush_outside_calendar(time_as_datetime)
+        )
+    assert rush_calendar.years == (2023, 2029)
+    boundaries = rush_calendar.boundaries
+    assert boundaries == sorted(boundaries) and len(set(boundaries)) == len(boundaries)
+
+def test_rush_with_utc_offset():
+    '''Tests that a time with any UTC offset is in the rush when the same UTC time is.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    helsinki_time = timezone(timedelta(hours=2))
+    for order in random_orders(2000, seed=9):
+        assert delivery_fee_calculator.is_rush(order.time.astimezone(helsinki_time)) == (
+            delivery_fee_calculator.is_rush(order.time)
+        )
+
+def test_calculate_delivery_fee_after_changing_attributes():
+    '''Tests that the pricing plan is rebuilt when the attributes of the calculator change.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    orders = random_orders(5000, seed=2)
+    delivery_fee_calculator.calculate_delivery_fee(orders[0])
+    delivery_fee_calculator.time_rush_weekday = 2
+    delivery_fee_calculator.time_rush_start_hour = time(hour=15, minute=30)
+    delivery_fee_calculator.time_rush_end_hour = time(hour=18, minute=45, second=30)
+    delivery_fee_calculator.number_of_items_bulk_limit = 20
+    delivery_fee_calculator.max_delivery_fee = 2000
+    for order in orders:
+        assert (
+            delivery_fee_calculator.calculate_delivery_fee(order)
+            == delivery_fee_calculator.calculate_delivery_fee_stepwise(order)
+        )
+
+def test_delivery_fee_cache_matches_calculator():
+    '''Tests that the cache gives the same fees as the calculator and counts hits and misses.'''
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    delivery_fee_cache = DeliveryFeeCache(DeliveryFeeCalculator())
+    randomizer = random.Random(11)
+    orders = random_orders(5000, seed=3)
+    # the same orders again later in the same hour
+    orders += [
+        DeliveryOrder(
+            order.cart_value, order.delivery_distance, order.number_of_items,
+            order.time.replace(minute=randomizer.randrange(60), second=randomizer.randrange(60))
+        )
+        for order in orders
+    ]
+    for order in orders:
+        assert (
+            delivery_fee_cache.calculate_delivery_fee(order)
+            == delivery_fee_calculator.calculate_delivery_fee(order)
+        )
+    cache_info = delivery_fee_cache.cache_info()
+    assert cache_info['hits'] + cache_info['misses'] == len(orders)
+    # the hours when the rush starts or ends are not cached
+    assert cache_info['hits'] == cache_info['size'] == sum(
+        not delivery_fee_calculator.rush_changes_within_hour(order.time)
+        for order in orders[:5000]
+    )
+    delivery_fee_cache = DeliveryFeeCache(DeliveryFeeCalculator(), max_size=100)
+    for order in orders:
+        delivery_fee_cache.calculate_delivery_fee(order)
+    assert delivery_fee_cache.cache_info()['size'] == 100
+
+def test_delivery_fee_cache_ttl_and_switch():
+    '''Tests that cached fees expire and that a disabled cache is bypassed.'''
+    order = random_orders(1)[0]
+    delivery_fee_cache = DeliveryFeeCache(DeliveryFeeCalculator(), ttl_seconds=0)
+    delivery_fee_cache.calculate_delivery_fee(order)
+    delivery_fee_cache.calculate_delivery_fee(order)
+    assert delivery_fee_cache.cache_info()['misses'] == 2
+    delivery_fee_cache = DeliveryFeeCache(DeliveryFeeCalculator(), enabled=False)
+    delivery_fee_cache.calculate_delivery_fee(order)
+    assert delivery_fee_cache.cache_info() == {'hits': 0, 'misses': 0, 'size': 0, 'max_size': 10000}
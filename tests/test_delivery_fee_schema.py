@@ -0,0 +1,81 @@
+'''Unit tests for the delivery fee schema.
+
+Contains unit test cases that check that the fast validation
+gives the same results as the full marshmallow validation.
+'''
+from datetime import datetime, timezone
+import pytest
+from marshmallow import ValidationError
+from parameters import delivery_fee_post_test_parameters
+from schemas.delivery_fee import DeliveryFeeSchema
+
+tricky_requests = [
+    {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4,
+     "time": "2024-W03-1T13:00:00Z"},
+    {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4,
+     "time": "2024-02-30T13:00:00Z"},
+    {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4,
+     "time": "2024-01-15 13:00:00Z"},
+    {"cart_value": True, "delivery_distance": 2235, "number_of_items": 4,
+     "time": "2024-01-15T13:00:00Z"},
+    {"cart_value": 790.0, "delivery_distance": "2235", "number_of_items": 4,
+     "time": "2024-01-15T13:00:00+00:00"},
+    {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4,
+     "time": "2024-01-15T13:00:00Z", "extra": 1},
+    {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4, "extra": 1},
+    [790, 2235, 4, "2024-01-15T13:00:00Z"],
+    {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4,
+     "time": "2024-01-19T17:00:00+02:00"},
+    {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4,
+     "time": "2024-01-19T09:30:00-05:30"},
+    {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4,
+     "time": "2024-01-19T17:00:00+24:00"},
+    {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4,
+     "time": "2024-01-19T17:00:00"},
+]
+
+
+def load_result(load, request_json):
+    '''Returns the validated data, or the error messages if validation fails.'''
+    try:
+        return load(data=request_json)
+    except ValidationError as error:
+        return error.messages
+
+@pytest.mark.parametrize(
+    "request_json",
+    [parameters[0] for parameters in delivery_fee_post_test_parameters] + tricky_requests
+)
+def test_fast_load_matches_load(request_json):
+    '''Tests that fast_load gives the same validated data and errors as load.'''
+    delivery_fee_schema = DeliveryFeeSchema()
+    assert (
+        load_result(delivery_fee_schema.fast_load, request_json)
+        == load_result(delivery_fee_schema.load, request_json)
+    )
+
+def test_load_batch_matches_load():
+    '''Tests that load_batch gives index-aligned results equal to load.'''
+    delivery_fee_schema = DeliveryFeeSchema()
+    requests = [parameters[0] for parameters in delivery_fee_post_test_parameters] + tricky_requests
+    validated_orders, errors = delivery_fee_schema.load_batch(requests)
+    for index, request_json in enumerate(requests):
+        expected_result = load_result(delivery_fee_schema.load, request_json)
+        if index in errors:
+            assert errors[index] == expected_result
+            assert validated_orders[index] is None
+        else:
+            assert validated_orders[index] == expected_result
+
+def test_times_are_converted_to_utc():
+    '''Tests that times with any UTC offset are validated into the same UTC time.'''
+    delivery_fee_schema = DeliveryFeeSchema()
+    requests = [
+        {"cart_value": 790, "delivery_distance": 2235, "number_of_items": 4, "time": time}
+        for time in ("2024-01-19T15:00:00Z", "2024-01-19T17:00:00+02:00", "2024-01-19T09:30:00-05:30")
+    ]
+    for load in (delivery_fee_schema.fast_load, delivery_fee_schema.load):
+        for request_json in requests:
+            time_as_datetime = load(data=request_json).time
+            assert time_as_datetime == datetime(2024, 1, 19, 15, tzinfo=timezone.utc)
+            assert time_as_datetime.tzinfo is timezone.utc
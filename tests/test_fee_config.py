@@ -0,0 +1,179 @@
+'''Unit tests for fee configuration files.
+
+Contains unit test cases that load fee configuration files
+into the API and reload them while it is running.
+'''
+import json
+from http import HTTPStatus
+from json import loads
+import pytest
+from marshmallow import ValidationError
+from parameters import delivery_fee_post_test_parameters
+from main import DeliveryApi
+from utils.fee_config import load_fee_config
+
+DEFAULT_FEE_CONFIG_PATH = 'config/delivery_fee.json'
+REQUEST_JSON = {
+    "cart_value": 1000, "delivery_distance": 1000, "number_of_items": 4,
+    "time": "2024-01-15T13:00:00Z"
+}
+
+
+@pytest.mark.parametrize(
+    "request_json, expected_response, expected_http_status", delivery_fee_post_test_parameters
+)
+def test_default_fee_config_file(
+        request_json: dict, expected_response: dict, expected_http_status: int
+):
+    '''Tests that the fee configuration file in the repository gives the default fees.'''
+    delivery_api = DeliveryApi(fee_config_path=DEFAULT_FEE_CONFIG_PATH)
+    with delivery_api.app.test_client() as client:
+        response = client.post('/delivery-fee', json=request_json)
+        assert response.status_code == expected_http_status
+        assert loads(response.data) == expected_response
+        assert response.headers['X-Fee-Version'] == '2024-01'
+    delivery_api.shutdown()
+
+def test_fee_config_reload(tmp_path):
+    '''Tests that a changed fee configuration file is swapped in, and an invalid one is not.'''
+    fee_config_path = tmp_path / 'delivery_fee.json'
+    fee_config_path.write_text(json.dumps({'version': 'v1'}))
+    delivery_api = DeliveryApi(fee_config_path=str(fee_config_path), fee_config_poll_seconds=60)
+    with delivery_api.app.test_client() as client:
+        response = client.post('/delivery-fee', json=REQUEST_JSON)
+        assert loads(response.data) == {'delivery_fee': 200}
+        assert response.headers['X-Fee-Version'] == 'v1'
+
+        fee_config_path.write_text(json.dumps(
+            {'version': 'v2', 'delivery_distance_start_fee_cents': 300}
+        ))
+        assert delivery_api.fee_config_watcher.check_for_changes()
+        response = client.post('/delivery-fee', json=REQUEST_JSON)
+        assert loads(response.data) == {'delivery_fee': 300}
+        assert response.headers['X-Fee-Version'] == 'v2'
+
+        fee_config_path.write_text(json.dumps({'version': 'v3', 'max_delivery_fee': -1}))
+        assert not delivery_api.fee_config_watcher.check_for_changes()
+        response = client.post('/delivery-fee', json=REQUEST_JSON)
+        assert loads(response.data) == {'delivery_fee': 300}
+        assert response.headers['X-Fee-Version'] == 'v2'
+    delivery_api.shutdown()
+
+def test_fee_config_reload_cache_gauges(tmp_path):
+    '''Tests that the fee cache gauges of profiles removed by a reload disappear.'''
+    fee_config_path = tmp_path / 'delivery_fee.json'
+    fee_config_path.write_text(json.dumps(
+        {'version': 'v1', 'default_profile': 'a', 'profiles': {'a': {}, 'b': {}}}
+    ))
+    delivery_api = DeliveryApi(
+        fee_config_path=str(fee_config_path), fee_config_poll_seconds=60, fee_cache_size=10
+    )
+    with delivery_api.app.test_client() as client:
+        metrics = client.get('/metrics').data.decode()
+        assert 'delivery_api_fee_cache_hits{profile="b"} 0' in metrics
+
+        fee_config_path.write_text(json.dumps({'version': 'v2', 'profiles': {'c': {}}}))
+        assert delivery_api.fee_config_watcher.check_for_changes()
+        client.post('/delivery-fee', json=REQUEST_JSON)
+        metrics = client.get('/metrics').data.decode()
+        assert 'delivery_api_fee_cache_misses{profile="c"} 1' in metrics
+        assert 'profile="a"' not in metrics and 'profile="b"' not in metrics
+        assert metrics.count('# TYPE delivery_api_fee_cache_hits gauge') == 1
+    delivery_api.shutdown()
+
+def test_invalid_fee_config(tmp_path):
+    '''Tests that invalid fee configuration files are rejected with validation errors.'''
+    fee_config_path = tmp_path / 'delivery_fee.json'
+    fee_config_path.write_text(json.dumps({
+        'time_rush_start_hour': '19:00', 'time_rush_end_hour': '15:00', 'time_rush_weekday': 7
+    }))
+    with pytest.raises(ValidationError) as error:
+        load_fee_config(str(fee_config_path))
+    assert error.value.messages == {
+        'version': ['Missing data for required field.'],
+        'time_rush_weekday': ['Value must be between 0 and 6.'],
+    }
+    with pytest.raises(ValidationError):
+        DeliveryApi(fee_config_path=str(fee_config_path))
+
+def test_invalid_profile_rush_hours(tmp_path):
+    '''Tests that a profile overriding one rush hour can't end the rush before it starts.'''
+    fee_config_path = tmp_path / 'delivery_fee.json'
+    fee_config_path.write_text(json.dumps({
+        'version': 'v1', 'time_rush_start_hour': '15:00', 'default_profile': 'a',
+        'profiles': {
+            'a': {}, 'b': {'time_rush_end_hour': '14:00'}, 'c': {'time_rush_end_hour': '19:00'},
+        }
+    }))
+    with pytest.raises(ValidationError) as error:
+        load_fee_config(str(fee_config_path))
+    assert error.value.messages == {'profiles': {
+        'b': {'time_rush_end_hour': ['Rush cannot end before it starts.']},
+    }}
+    fee_config_path.write_text(json.dumps({
+        'version': 'v1', 'time_rush_end_hour': '19:00',
+        'profiles': {'a': {'time_rush_start_hour': '20:00'}}
+    }))
+    with pytest.raises(ValidationError) as error:
+        load_fee_config(str(fee_config_path))
+    assert error.value.messages == {'profiles': {
+        'a': {'time_rush_end_hour': ['Rush cannot end before it starts.']},
+    }}
+
+def test_invalid_time_zone(tmp_path):
+    '''Tests that fee configuration files with an unknown time zone are rejected.'''
+    fee_config_path = tmp_path / 'delivery_fee.json'
+    fee_config_path.write_text(json.dumps({'version': 'v1', 'time_zone': 'Europe/Atlantis'}))
+    with pytest.raises(ValidationError) as error:
+        load_fee_config(str(fee_config_path))
+    assert error.value.messages == {'time_zone': ['Not a valid time zone.']}
+
+def test_default_fees_version():
+    '''Tests the version of the default fees.'''
+    delivery_api = DeliveryApi()
+    with delivery_api.app.test_client() as client:
+        response = client.post('/delivery-fee', json=REQUEST_JSON)
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers['X-Fee-Version'] == 'default'
+
+def test_pricing_profiles():
+    '''Tests choosing a pricing profile with the X-Pricing-Profile header.'''
+    delivery_api = DeliveryApi(fee_config_path='config/markets.json')
+    with delivery_api.app.test_client() as client:
+        response = client.post('/delivery-fee', json=REQUEST_JSON)
+        assert loads(response.data) == {'delivery_fee': 200}
+        assert response.headers['X-Pricing-Profile'] == 'fi'
+        assert response.headers['X-Fee-Currency'] == 'EUR'
+
+        response = client.post(
+            '/delivery-fee', json=REQUEST_JSON, headers={'X-Pricing-Profile': 'se'}
+        )
+        # 100 SEK - 10 SEK surcharge + 20 SEK distance fee
+        assert loads(response.data) == {'delivery_fee': 11000}
+        assert response.headers['X-Pricing-Profile'] == 'se'
+        assert response.headers['X-Fee-Currency'] == 'SEK'
+
+        response = client.post(
+            '/delivery-fee/batch', json=[REQUEST_JSON], headers={'X-Pricing-Profile': 'se'}
+        )
+        assert loads(response.data) == {'delivery_fees': [{'delivery_fee': 11000}]}
+
+        response = client.post(
+            '/delivery-fee', json=REQUEST_JSON, headers={'X-Pricing-Profile': 'no'}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert loads(response.data) == {
+            'message': 'Validation errors',
+            'errors': {'X-Pricing-Profile': ['Unknown pricing profile.']}
+        }
+    delivery_api.shutdown()
+
+def test_pricing_profiles_require_default(tmp_path):
+    '''Tests that a configuration with several profiles must name the default profile.'''
+    fee_config_path = tmp_path / 'delivery_fee.json'
+    fee_config_path.write_text(json.dumps({'version': 'v1', 'profiles': {'a': {}, 'b': {}}}))
+    with pytest.raises(ValidationError) as error:
+        load_fee_config(str(fee_config_path))
+    assert error.value.messages == {
+        'default_profile': ['Missing data for field required with several profiles.']
+    }
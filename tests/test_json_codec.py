@@ -0,0 +1,42 @@
+'''Unit tests for the JSON codec.
+
+Contains unit test cases that check that utils.json_codec gives
+the same data as the json module of the standard library.
+'''
+import json
+import pytest
+from parameters import delivery_fee_post_test_parameters
+from utils import json_codec
+
+request_bodies = [
+    json.dumps(parameters[0]).encode() for parameters in delivery_fee_post_test_parameters
+] + [
+    b'{"cart_value": 100000000000000000000000, "delivery_distance": 1}',
+    '{"cart_value": -9223372036854775809, "delivery_distance": 18446744073709551615}',
+    b'{"cart_value": 1e400}',
+    b'{"cart_value": NaN, "delivery_distance": Infinity}',
+    '{"cart_value": 790, "time": "2024-01-15T13:00:00Z"}'.encode('utf-16'),
+    '{"message": "käyttäjä"}',
+]
+
+
+@pytest.mark.parametrize("request_body", request_bodies)
+def test_loads_matches_json(request_body):
+    '''Tests that loads accepts the same input as json.loads and gives the same data.'''
+    assert repr(json_codec.loads(request_body)) == repr(json.loads(request_body))
+
+@pytest.mark.parametrize("request_body", [b'', b'{"cart_value": }', b'[1, 2', b'\xff'])
+def test_loads_rejects_invalid_json(request_body):
+    '''Tests that loads raises ValueError for input that is not JSON.'''
+    with pytest.raises(ValueError):
+        json_codec.loads(request_body)
+
+def test_dumps_matches_json():
+    '''Tests that dumps gives the same data as json.dumps, also for errors keyed by index.'''
+    responses = [parameters[1] for parameters in delivery_fee_post_test_parameters] + [
+        {'errors': {0: {'cart_value': ['Missing data for required field.']}}},
+        {'delivery_fee': 1140.0, 'message': 'käyttäjä'},
+        {'delivery_fee': 1500, 'breakdown': {'distance_fee': 2 * 10**22}},
+    ]
+    for response in responses:
+        assert json.loads(json_codec.dumps(response)) == json.loads(json.dumps(response))
@@ -0,0 +1,78 @@
+'''Unit tests for binary order records.
+
+Contains unit test cases that convert the test cases of the delivery
+fee resource to order records and price the memory-mapped records.
+'''
+import json
+from http import HTTPStatus
+import numpy as np
+import pytest
+from parameters import delivery_fee_post_test_parameters
+from convert_orders import convert, parse_args
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.order_records import (
+    FILE_HEADER, OrderRecordWriter, price_order_records, read_order_records
+)
+from test_delivery_fee_calculator import random_orders
+
+
+def test_convert_and_price_order_records(tmp_path):
+    '''Tests converting a JSON Lines file to order records and pricing them.'''
+    input_path = tmp_path / 'orders.jsonl'
+    output_path = tmp_path / 'orders.bin'
+    rejects_path = tmp_path / 'rejects.jsonl'
+    too_large_order = dict(delivery_fee_post_test_parameters[0][0], cart_value=2 ** 31)
+    input_path.write_text(''.join(
+        json.dumps(request_json) + '\n'
+        for request_json in [parameters[0] for parameters in delivery_fee_post_test_parameters]
+        + [too_large_order]
+    ))
+
+    record_count, rejected_count = convert(parse_args([
+        str(input_path), '--output', str(output_path), '--rejects', str(rejects_path),
+        '--chunk-size', '4'
+    ]))
+
+    expected_fees = [
+        expected_response['delivery_fee']
+        for _, expected_response, expected_http_status in delivery_fee_post_test_parameters
+        if expected_http_status == HTTPStatus.OK
+    ]
+    rejected_orders = [json.loads(line) for line in rejects_path.read_text().splitlines()]
+    assert record_count == len(expected_fees)
+    assert rejected_count == len(delivery_fee_post_test_parameters) - len(expected_fees) + 1
+    assert [order['row'] for order in rejected_orders] == [
+        row for row, parameters in enumerate(delivery_fee_post_test_parameters, start=1)
+        if parameters[2] != HTTPStatus.OK
+    ] + [len(delivery_fee_post_test_parameters) + 1]
+    records = read_order_records(str(output_path))
+    delivery_fees = price_order_records(DeliveryFeeCalculator(), records, chunk_size=3)
+    assert np.rint(delivery_fees).astype(np.int64).tolist() == expected_fees
+
+def test_order_records_match_calculator(tmp_path):
+    '''Tests that priced order records give the same fees as the calculator.'''
+    records_path = tmp_path / 'orders.bin'
+    orders = random_orders(5000, seed=7)
+    with open(records_path, 'wb') as records_file:
+        OrderRecordWriter(records_file).write_orders(orders)
+
+    records = read_order_records(str(records_path))
+    delivery_fee_calculator = DeliveryFeeCalculator()
+    assert len(records) == len(orders)
+    assert price_order_records(delivery_fee_calculator, records, chunk_size=1000).tolist() == (
+        delivery_fee_calculator.calculate_delivery_fees(orders)
+    )
+
+def test_read_order_records_rejects_other_files(tmp_path):
+    '''Tests that files that are not complete order records are rejected.'''
+    other_path = tmp_path / 'orders.jsonl'
+    other_path.write_text('{}\n')
+    with pytest.raises(ValueError):
+        read_order_records(str(other_path))
+    partial_path = tmp_path / 'orders.bin'
+    partial_path.write_bytes(FILE_HEADER + b'\x00' * 19)
+    with pytest.raises(ValueError):
+        read_order_records(str(partial_path))
+    empty_path = tmp_path / 'empty.bin'
+    empty_path.write_bytes(FILE_HEADER)
+    assert len(read_order_records(str(empty_path))) == 0
@@ -0,0 +1,63 @@
+'''Unit tests for the pricing core.
+
+Contains unit test cases that test that the pricing package can be imported
+without the web frameworks and that it loads the rest of the API on first use.
+'''
+import json
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+import pytest
+import pricing
+
+PROJECT_FOLDER = Path(__file__).resolve().parent.parent
+
+
+def test_pricing_core_imports_no_frameworks():
+    '''Tests that importing the pricing package and pricing an order loads no framework modules.'''
+    code = (
+        'import json, sys\n'
+        'from datetime import datetime, timezone\n'
+        'import pricing\n'
+        'order = pricing.DeliveryOrder(790, 2235, 4, datetime(2024, 1, 15, 13, tzinfo=timezone.utc))\n'
+        'fee = pricing.DeliveryFeeCalculator().calculate_delivery_fee(order)\n'
+        'print(json.dumps({"fee": fee, "modules": sorted(sys.modules)}))\n'
+    )
+    completed = subprocess.run(
+        [sys.executable, '-c', code], cwd=PROJECT_FOLDER, capture_output=True, text=True, check=True
+    )
+    result = json.loads(completed.stdout)
+    assert result['fee'] == 710
+    loaded_frameworks = {module.split('.')[0] for module in result['modules']} & {
+        'flask', 'flask_restful', 'werkzeug', 'marshmallow', 'numpy', 'main', 'schemas'
+    }
+    assert loaded_frameworks == set()
+
+def test_pricing_core_lazy_names():
+    '''Tests that the names that need the frameworks are loaded on first use.'''
+    from main import DeliveryApi
+    from utils.pricing_context import PricingContext
+    assert pricing.DeliveryApi is DeliveryApi
+    assert pricing.PricingContext is PricingContext
+    assert 'DeliveryApi' in dir(pricing)
+    response_dict, _ = pricing.PricingContext.create().price_order({
+        'cart_value': 790, 'delivery_distance': 2235, 'number_of_items': 4,
+        'time': '2024-01-15T13:00:00Z'
+    })
+    assert response_dict == {'delivery_fee': 710}
+    with pytest.raises(AttributeError):
+        pricing.DeliveryFeeResource
+
+def test_delivery_order_value_semantics():
+    '''Tests that orders compare by value and are not hashable, like the dataclass they replace.'''
+    time = datetime(2024, 1, 15, 13, tzinfo=timezone.utc)
+    order = pricing.DeliveryOrder(790, 2235, 4, time)
+    assert order == pricing.DeliveryOrder(790, 2235, 4, time)
+    assert order != pricing.DeliveryOrder(790, 2235, 5, time)
+    assert repr(order) == (
+        'DeliveryOrder(cart_value=790, delivery_distance=2235, number_of_items=4, '
+        f'time={time!r})'
+    )
+    assert not hasattr(order, '__dict__')
+    assert pricing.DeliveryOrder.__hash__ is None
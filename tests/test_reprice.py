@@ -0,0 +1,95 @@
+'''Unit tests for offline bulk repricing.
+
+Contains unit test cases that reprice CSV and JSON Lines files
+built from the test cases of the delivery fee resource.
+'''
+import csv
+import json
+from http import HTTPStatus
+from parameters import delivery_fee_post_test_parameters
+from reprice import parse_args, reprice
+
+
+def test_reprice_jsonl(tmp_path):
+    '''Tests repricing a JSON Lines file with valid and invalid orders.'''
+    input_path = tmp_path / 'orders.jsonl'
+    output_path = tmp_path / 'priced.jsonl'
+    rejects_path = tmp_path / 'rejects.jsonl'
+    input_path.write_text(''.join(
+        json.dumps(request_json) + '\n' for request_json, _, _ in delivery_fee_post_test_parameters
+    ))
+
+    writer = reprice(parse_args([
+        str(input_path), '--output', str(output_path), '--rejects', str(rejects_path),
+        '--chunk-size', '4'
+    ]))
+
+    priced_orders = [json.loads(line) for line in output_path.read_text().splitlines()]
+    rejected_orders = [json.loads(line) for line in rejects_path.read_text().splitlines()]
+    expected_fees = [
+        expected_response['delivery_fee']
+        for _, expected_response, expected_http_status in delivery_fee_post_test_parameters
+        if expected_http_status == HTTPStatus.OK
+    ]
+    expected_rejects = [
+        {'row': row, 'order': request_json, 'errors': expected_response['errors']}
+        for row, (request_json, expected_response, expected_http_status)
+        in enumerate(delivery_fee_post_test_parameters, start=1)
+        if expected_http_status != HTTPStatus.OK
+    ]
+    assert [order['delivery_fee'] for order in priced_orders] == expected_fees
+    assert rejected_orders == expected_rejects
+    assert (writer.priced_count, writer.rejected_count) == (len(expected_fees), len(expected_rejects))
+
+def test_reprice_csv(tmp_path):
+    '''Tests repricing a CSV file.'''
+    input_path = tmp_path / 'orders.csv'
+    output_path = tmp_path / 'priced.csv'
+    valid_parameters = [
+        parameters for parameters in delivery_fee_post_test_parameters
+        if parameters[2] == HTTPStatus.OK
+    ]
+    with open(input_path, 'w', newline='', encoding='utf-8') as input_file:
+        csv_writer = csv.DictWriter(input_file, fieldnames=list(valid_parameters[0][0]))
+        csv_writer.writeheader()
+        for request_json, _, _ in valid_parameters:
+            csv_writer.writerow(request_json)
+
+        # a short row and a long row
+        input_file.write('790,2235\n790,2235,4,2024-01-15T13:00:00Z,extra\n')
+    rejects_path = tmp_path / 'rejects.jsonl'
+
+    writer = reprice(parse_args([
+        str(input_path), '--output', str(output_path), '--rejects', str(rejects_path)
+    ]))
+
+    with open(output_path, newline='', encoding='utf-8') as output_file:
+        priced_orders = list(csv.DictReader(output_file))
+    assert [int(order['delivery_fee']) for order in priced_orders] == [
+        expected_response['delivery_fee'] for _, expected_response, _ in valid_parameters
+    ]
+    rejected_orders = [json.loads(line) for line in rejects_path.read_text().splitlines()]
+    assert [rejected_order['row'] for rejected_order in rejected_orders] == [
+        len(valid_parameters) + 1, len(valid_parameters) + 2
+    ]
+    assert rejected_orders[0]['errors'] == {
+        'number_of_items': ['Field may not be null.'], 'time': ['Field may not be null.']
+    }
+    assert list(rejected_orders[1]['errors']) == ['null']
+    assert writer.rejected_count == 2
+
+def test_reprice_jsonl_in_parallel(tmp_path):
+    '''Tests that repricing with worker processes gives the same output as one process.'''
+    input_path = tmp_path / 'orders.jsonl'
+    input_path.write_text(''.join(
+        json.dumps(request_json) + '\n'
+        for request_json, _, _ in delivery_fee_post_test_parameters * 3
+    ))
+    for workers in ('1', '2'):
+        reprice(parse_args([
+            str(input_path), '--output', str(tmp_path / f'priced{workers}.jsonl'),
+            '--rejects', str(tmp_path / f'rejects{workers}.jsonl'),
+            '--chunk-size', '5', '--workers', workers
+        ]))
+    assert (tmp_path / 'priced1.jsonl').read_text() == (tmp_path / 'priced2.jsonl').read_text()
+    assert (tmp_path / 'rejects1.jsonl').read_text() == (tmp_path / 'rejects2.jsonl').read_text()
@@ -0,0 +1,111 @@
+'''Unit tests for what-if pricing scenarios.
+
+Contains unit test cases that compare the aggregated fees of each
+scenario with pricing every order with a calculator of its own.
+'''
+import json
+from datetime import time
+import numpy as np
+import pytest
+from marshmallow import ValidationError
+from what_if import load_scenarios, parse_args
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.order_records import RECORD_DTYPE, OrderRecordWriter, read_order_records
+from utils.scenarios import evaluate_scenarios, scenario_calculators
+from test_delivery_fee_calculator import random_orders
+
+SCENARIO_CONFIGS = {
+    'current': {},
+    'rush 1.3': {'time_rush_multiplier': 1.3},
+    'cap 12 euros': {'max_delivery_fee': 1200},
+    'longer rush': {'time_rush_start_hour': time(14), 'time_rush_end_hour': time(20)},
+    'cheaper distance': {'delivery_distance_additional_length_fee_cents': 80},
+    'no bulk fee': {'number_of_items_bulk_fee_cents': 0, 'time_rush_multiplier': 1.3},
+    'surcharge above free limit': {
+        'cart_value_surcharge_limit_cents': 15000, 'cart_value_free_delivery_limit_cents': 5000
+    },
+}
+
+
+@pytest.fixture(name='orders_and_records')
+def fixture_orders_and_records(tmp_path):
+    '''Writes random orders to a file of order records.'''
+    records_path = tmp_path / 'orders.bin'
+    orders = random_orders(5000, seed=3)
+    with open(records_path, 'wb') as records_file:
+        OrderRecordWriter(records_file).write_orders(orders)
+    return orders, read_order_records(str(records_path))
+
+
+def test_scenarios_match_calculator(orders_and_records):
+    '''Tests that the results of each scenario match pricing the orders one by one.'''
+    orders, records = orders_and_records
+    calculators = scenario_calculators(SCENARIO_CONFIGS)
+    results = evaluate_scenarios(records, calculators, chunk_size=1500)
+
+    assert list(results) == list(SCENARIO_CONFIGS)
+    for name, delivery_fee_calculator in calculators.items():
+        breakdowns = [
+            delivery_fee_calculator.calculate_delivery_fee_breakdown(order) for order in orders
+        ]
+        delivery_fees = [round(breakdown.delivery_fee) for breakdown in breakdowns]
+        result = results[name]
+        assert result.order_count == len(orders)
+        assert result.total_revenue == sum(delivery_fees)
+        assert result.cap_hit_count == sum(breakdown.max_fee_cap_applied for breakdown in breakdowns)
+        fees, fee_counts = np.unique(delivery_fees, return_counts=True)
+        assert result.fees.tolist() == fees.tolist()
+        assert result.fee_counts.tolist() == fee_counts.tolist()
+        assert result.fee_histogram(100) == {
+            int(bucket): int(count) for bucket, count in zip(*np.unique(
+                np.array(delivery_fees) // 100 * 100, return_counts=True
+            ))
+        }
+        assert result.fee_percentile(0.5) == sorted(delivery_fees)[len(delivery_fees) // 2 - 1]
+        assert sum(result.fee_histogram(100).values()) == len(orders)
+    assert results['rush 1.3'].total_revenue > results['current'].total_revenue
+    assert results['cap 12 euros'].cap_hit_share() > results['current'].cap_hit_share()
+
+def test_scenarios_with_huge_fees(orders_and_records):
+    '''Tests that the fee counts don't grow with the highest fee.'''
+    orders, records = orders_and_records
+    calculators = scenario_calculators(
+        {'huge': {'max_delivery_fee': 10**15, 'time_rush_multiplier': 10**9}}
+    )
+    result = evaluate_scenarios(records, calculators, chunk_size=1500)['huge']
+    delivery_fees = [round(calculators['huge'].calculate_delivery_fee(order)) for order in orders]
+    assert result.fees[-1] == max(delivery_fees) > 10**11
+    assert len(result.fees) == len(set(delivery_fees))
+    assert result.fee_percentile(1) == max(delivery_fees)
+    assert sum(result.fee_histogram(100).values()) == len(orders)
+
+def test_scenarios_of_no_orders():
+    '''Tests that scenarios can be evaluated without orders.'''
+    results = evaluate_scenarios(
+        np.empty(0, dtype=RECORD_DTYPE), scenario_calculators({'current': {}})
+    )
+    assert results['current'].as_dict() == {
+        'order_count': 0, 'total_revenue': 0, 'mean_fee': 0.0,
+        'fee_percentiles': {'p10': None, 'p50': None, 'p90': None, 'p99': None},
+        'fee_histogram': {}, 'cap_hit_count': 0, 'cap_hit_share': 0.0,
+    }
+
+def test_load_scenarios(tmp_path):
+    '''Tests that scenario files change the fees of the chosen pricing profile.'''
+    scenarios_path = tmp_path / 'scenarios.json'
+    scenarios_path.write_text(json.dumps({
+        'current': {}, 'late rush': {'time_rush_end_hour': '20:00'}
+    }))
+    calculators = load_scenarios(parse_args([
+        'orders.bin', '--scenarios', str(scenarios_path),
+        '--fee-config', 'config/markets.json', '--profile', 'se'
+    ]))
+    assert calculators['current'].max_delivery_fee == 15000
+    assert calculators['late rush'].max_delivery_fee == 15000
+    assert calculators['late rush'].time_rush_end_hour == time(20)
+    assert isinstance(calculators['current'], DeliveryFeeCalculator)
+
+    scenarios_path.write_text(json.dumps({'wrong': {'time_rush_weekday': 7}}))
+    with pytest.raises(ValidationError) as error:
+        load_scenarios(parse_args(['orders.bin', '--scenarios', str(scenarios_path)]))
+    assert list(error.value.messages) == ['wrong']
@@ -0,0 +1,149 @@
+'''Admission control.
+
+This module contains the class AdmissionController, which limits the
+number of requests being priced at the same time and sheds the requests
+that would wait too long for their turn, so that an overloaded server
+answers quickly with status 503 instead of working on requests whose
+clients have already given up.
+'''
+from http import HTTPStatus
+from threading import Condition
+from time import monotonic
+from utils.metrics import MetricsRegistry
+
+# the request header with the number of milliseconds the client waits for a response
+QUEUE_DEADLINE_HEADER = 'X-Request-Timeout-Ms'
+
+
+class AdmissionController:
+    '''
+    Bounds the requests in flight and how long and how many of them wait.
+
+    A request is admitted at once while fewer than max_in_flight requests
+    are in flight and none are waiting. Otherwise it waits for a slot in
+    a queue of at most max_queued requests, until its queue deadline
+    passes. A request that doesn't fit in the queue or whose deadline
+    passes is rejected.
+    The counts are per process, so with several worker processes the
+    limits apply to each worker.
+
+    ...
+
+    Attributes
+    ----------
+    max_in_flight: int
+        The maximum number of requests admitted at the same time
+    max_queued: int
+        The maximum number of requests waiting for a slot
+    max_queue_wait_seconds: float
+        The longest a request waits for a slot, also when the client
+        would wait longer
+    retry_after_seconds: int
+        The value of the Retry-After header of a rejected request
+    in_flight: int
+        The number of requests admitted and not yet released
+    queued: int
+        The number of requests waiting for a slot
+    rejected: int
+        The number of requests rejected since the controller was created
+
+    Methods
+    -------
+    queue_deadline_seconds(header_value: str | None)
+        Returns how long a request may wait for a slot.
+    acquire(timeout_seconds: float)
+        Admits a request, waiting at most timeout_seconds for a slot.
+    release()
+        Frees the slot of an admitted request.
+    overloaded_response()
+        Returns the response to a rejected request.
+    register_gauges(metrics: MetricsRegistry)
+        Exposes the counts in the metrics.
+    '''
+
+    def __init__(
+            self, max_in_flight: int, max_queued: int = 0,
+            max_queue_wait_seconds: float = 1.0, retry_after_seconds: int = 1
+    ):
+        if max_in_flight < 1:
+            raise ValueError('max_in_flight must be at least 1')
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self._condition = Condition()
+
+    def queue_deadline_seconds(self, header_value: str | None) -> float:
+        '''Returns how long a request may wait for a slot.
+
+        header_value is the value of the QUEUE_DEADLINE_HEADER of the
+        request, the number of milliseconds its client waits for a
+        response. The wait is limited to max_queue_wait_seconds, which
+        is also used without a valid header.
+        '''
+
+        if header_value is None or not header_value.isascii() or not header_value.isdigit():
+            return self.max_queue_wait_seconds
+        return min(int(header_value) / 1000, self.max_queue_wait_seconds)
+
+    def acquire(self, timeout_seconds: float) -> bool:
+        '''Admits a request, waiting at most timeout_seconds for a slot.
+
+        Returns True if the request was admitted, in which case release()
+        must be called once it has been handled, and False if it was rejected.
+        '''
+
+        with self._condition:
+            # waiting requests go first, so that new requests can't starve them
+            if self.in_flight < self.max_in_flight and self.queued == 0:
+                self.in_flight += 1
+                return True
+            if timeout_seconds <= 0 or self.queued >= self.max_queued:
+                self.rejected += 1
+                return False
+            deadline = monotonic() + timeout_seconds
+            self.queued += 1
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining_seconds = deadline - monotonic()
+                    if remaining_seconds <= 0:
+                        self.rejected += 1
+                        return False
+                    self._condition.wait(remaining_seconds)
+                self.in_flight += 1
+                return True
+            finally:
+                self.queued -= 1
+
+    def release(self):
+        '''Frees the slot of an admitted request and wakes up one waiting request.'''
+
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def overloaded_response(self) -> tuple:
+        '''Returns the response body, status and headers of a rejected request.'''
+
+        return (
+            {'message': 'The service is overloaded, please retry later.'},
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            {'Retry-After': str(self.retry_after_seconds)}
+        )
+
+    def register_gauges(self, metrics: MetricsRegistry):
+        '''Exposes the requests in flight, queued and rejected in the metrics.'''
+
+        metrics.register_gauge(
+            'delivery_api_requests_in_flight', 'Requests being priced.', lambda: self.in_flight
+        )
+        metrics.register_gauge(
+            'delivery_api_requests_queued', 'Requests waiting to be priced.', lambda: self.queued
+        )
+        metrics.register_gauge(
+            'delivery_api_requests_shed', 'Requests rejected because of overload.',
+            lambda: self.rejected
+        )
@@ -0,0 +1,163 @@
+'''Delivery fee cache.
+
+This module contains the DeliveryFeeCache class, which memoizes
+the delivery fees calculated by a DeliveryFeeCalculator.
+'''
+from collections import OrderedDict
+from datetime import datetime, timezone
+from threading import Lock
+from time import monotonic
+from utils.delivery_fee_calculator import DeliveryFeeCalculator, FeeBreakdown
+from utils.delivery_order import DeliveryOrder
+
+
+class DeliveryFeeCache:
+    '''
+    A bounded cache in front of a DeliveryFeeCalculator.
+
+    Fees are cached by the cart value, delivery distance and number of
+    items of the order and the UTC hour of its time, so that an order
+    that is priced again within the hour, like a basket on every refresh
+    of a screen, is a hit. Fees of the hours when the rush starts or ends
+    are not cached. The key is cheap to build and a hit takes no lock,
+    because the table-driven calculator only takes about a microsecond,
+    and normalizing the order further, for example to its distance step,
+    would cost as much as calculating the fee. A hit takes about half the
+    time of calculating the fee, but a miss about three times as long, so
+    the cache only pays off when most orders are repeats, and it is off by
+    default. `python3 -m benchmarks.bench_fee_cache` measures both.
+    The cache has the same calculate_* methods as the calculator,
+    so it can be used in place of one.
+
+    ...
+
+    Attributes
+    ----------
+    delivery_fee_calculator: DeliveryFeeCalculator
+        Calculates the fees that are not in the cache.
+    max_size: int
+        The maximum number of cached fees. The oldest fee is evicted
+        when the cache is full.
+    ttl_seconds: float | None
+        Cached fees expire after this many seconds. None means never.
+    enabled: bool
+        When False, every fee is calculated and nothing is cached.
+    hits: int
+        The number of fees found in the cache. The counters are updated
+        without a lock, so they can miss a few counts under concurrent use.
+    misses: int
+        The number of fees that had to be calculated.
+
+    Methods
+    -------
+    calculate_delivery_fee(order: DeliveryOrder)
+        Returns the cached delivery fee, or calculates and caches it.
+    calculate_delivery_fees(orders: list)
+        Calculates the delivery fee for each of the given orders.
+    calculate_delivery_fee_breakdown(order: DeliveryOrder)
+        Calculates the delivery fee and its components without the cache.
+    is_rush(time_as_datetime: datetime)
+        Tells whether the rush fee applies at the given time.
+    next_rush_boundary(time_as_datetime: datetime)
+        Returns the first time after the given time when the rush starts or ends.
+    clear()
+        Removes all cached fees and resets the counters.
+    cache_info()
+        Returns the counters and the size of the cache.
+    '''
+
+    def __init__(
+            self, delivery_fee_calculator: DeliveryFeeCalculator, max_size: int = 10000,
+            ttl_seconds: float | None = None, enabled: bool = True
+    ):
+        self.delivery_fee_calculator = delivery_fee_calculator
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def calculate_delivery_fee(self, order: DeliveryOrder) -> int | float:
+        '''Returns the cached delivery fee, or calculates and caches it.'''
+
+        time_as_datetime = order.time
+        if not self.enabled or time_as_datetime.tzinfo is not timezone.utc:
+            return self.delivery_fee_calculator.calculate_delivery_fee(order)
+
+        key = (
+            order.cart_value, order.delivery_distance, order.number_of_items,
+            time_as_datetime.toordinal() * 24 + time_as_datetime.hour
+        )
+        # OrderedDict.get is atomic, entries are only added and removed under the lock
+        entry = self._entries.get(key)
+        if entry is not None and (entry[1] is None or entry[1] > monotonic()):
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+
+        delivery_fee_calculator = self.delivery_fee_calculator
+        delivery_fee = delivery_fee_calculator.calculate_delivery_fee(order)
+        if delivery_fee_calculator.rush_changes_within_hour(time_as_datetime):
+            return delivery_fee
+        expires_at = None if self.ttl_seconds is None else monotonic() + self.ttl_seconds
+        with self._lock:
+            entries = self._entries
+            if entry is not None:
+                # an expired fee goes to the end, with the fees cached after it
+                entries.pop(key, None)
+            entries[key] = (delivery_fee, expires_at)
+            if len(entries) > self.max_size:
+                entries.popitem(last=False)
+        return delivery_fee
+
+    def calculate_delivery_fees(self, orders: list) -> list:
+        '''Calculates delivery fees for a list of orders.
+
+        Orders that are None are skipped and their fee is None,
+        so the result stays index-aligned with orders.
+        '''
+
+        calculate_delivery_fee = self.calculate_delivery_fee
+        return [
+            None if order is None else calculate_delivery_fee(order)
+            for order in orders
+        ]
+
+    def calculate_delivery_fee_breakdown(self, order: DeliveryOrder) -> FeeBreakdown:
+        '''Calculates the delivery fee and its components without the cache.
+
+        A breakdown costs about as much as a fee, so it is not worth caching.
+        '''
+
+        return self.delivery_fee_calculator.calculate_delivery_fee_breakdown(order)
+
+    def is_rush(self, time_as_datetime: datetime) -> bool:
+        '''Tells whether the rush fee applies at the given time.'''
+
+        return self.delivery_fee_calculator.is_rush(time_as_datetime)
+
+    def next_rush_boundary(self, time_as_datetime: datetime) -> datetime:
+        '''Returns the first time after time_as_datetime when the rush starts or ends.'''
+
+        return self.delivery_fee_calculator.next_rush_boundary(time_as_datetime)
+
+    def clear(self):
+        '''Removes all cached fees and resets the counters.'''
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self) -> dict:
+        '''Returns the counters and the size of the cache.'''
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }
@@ -3,8 +3,79 @@
 This module contains the DeliveryFeeCalculator class, which
 contains logic to calculate a delivery fee based on delivery parameters.
 '''
-from datetime import datetime, time
+from collections import namedtuple
+from datetime import datetime, time, timezone
 from math import ceil
+from zoneinfo import ZoneInfo
+from utils.delivery_order import DeliveryOrder
+from utils.rush_calendar import rush_calendar
+
+
+# the largest quote grid, so that it stays small enough to send to clients
+MAX_QUOTE_GRID_ROWS = 200
+MAX_QUOTE_GRID_COLUMNS = 200
+
+
+# collections.namedtuple rather than typing.NamedTuple, so that the pricing
+# core can be imported without the cost of importing typing
+class PricingPlan(namedtuple('PricingPlan', (
+    'cart_value_surcharge_limit_cents', 'cart_value_free_delivery_limit_cents',
+    'delivery_distance_start_meters', 'delivery_distance_start_fee_cents',
+    'delivery_distance_additional_length_meters',
+    'delivery_distance_additional_length_fee_cents', 'number_of_items_fees',
+    'number_of_items_surcharge_limit', 'number_of_items_surcharge_fee_cents',
+    'number_of_items_bulk_limit', 'number_of_items_bulk_fee_cents',
+    'rush_calendar', 'time_rush_multiplier', 'max_delivery_fee',
+))):
+    '''
+    The rules of a DeliveryFeeCalculator precomputed for fast pricing.
+
+    ...
+
+    Attributes
+    ----------
+    number_of_items_fees: tuple
+        The fee in cents for each number of items up to one past the bulk limit.
+    rush_calendar: RushCalendar
+        The rushes in the time zone of the calculator.
+    The other attributes are copies of the DeliveryFeeCalculator attributes of the same name.
+    '''
+
+    __slots__ = ()
+
+
+class FeeBreakdown(namedtuple('FeeBreakdown', (
+    'distance_fee', 'items_fee', 'bulk_fee', 'small_order_surcharge', 'free_delivery',
+    'rush_multiplier', 'max_fee_cap_applied', 'delivery_fee',
+))):
+    '''
+    The components of a delivery fee.
+
+    ...
+
+    Attributes
+    ----------
+    distance_fee: int
+        The fee for the delivery distance in cents.
+    items_fee: int
+        The surcharge for the items above the surcharge limit in cents.
+    bulk_fee: int
+        The bulk fee in cents, 0 when the number of items is within the bulk limit.
+    small_order_surcharge: int
+        The small order surcharge in cents.
+    free_delivery: bool
+        True if the cart value is high enough for free delivery, which
+        sets the fee to 0 instead of the sum of the fees above.
+    rush_multiplier: float
+        The multiplier applied to the fee, 1 outside of the rush.
+    max_fee_cap_applied: bool
+        True if the fee was limited to the maximum delivery fee.
+    delivery_fee: int | float
+        The total delivery fee, the same as calculate_delivery_fee gives.
+    '''
+
+    __slots__ = ()
+
 
 class DeliveryFeeCalculator:
     '''
@@ -39,6 +110,9 @@ class DeliveryFeeCalculator:
     delivery_distance_additional_length_fee_cents: int
         This is the fee in cents that is applied to the additional
         lengths of delivery distance
+    time_zone: str
+        The IANA name of the time zone of the rush weekday and hours,
+        for example Europe/Helsinki.
     time_rush_weekday: int
         The weekday number when a rush fee is applied at certain hours.
         It is comparable with the output of datetime.weekday().
@@ -54,9 +128,13 @@ class DeliveryFeeCalculator:
         this multiplier.
     max_delivery_fee: int
         The delivery fee cannot be more than this amount.
+    DEFAULT_FEE_VERSION: str
+        The version tag of the fees set in __init__.
 
     Methods
     -------
+    from_config(fee_config: dict)
+        Creates a calculator with the attributes given in a fee configuration.
     add_delivery_distance_fee(delivery_fee: int | float, delivery_distance: int)
         Calculates the fee of delivery distance and adds it to delivery fee.
     add_number_of_items_fee(delivery_fee: int | float, number_of_items: int)
@@ -67,11 +145,34 @@ class DeliveryFeeCalculator:
         Calculates the rush hour surcharge and adds it to the delivery fee.
     apply_max_delivery_fee(delivery_fee: int | float)
         Limits the delivery fee to a maximum delivery fee.
-    calculate_delivery_fee(parameters_dict: dict)
+    compile_pricing_plan()
+        Precomputes the rules into a PricingPlan used by calculate_delivery_fee.
+    calculate_delivery_fee(order: DeliveryOrder)
+        Calculates the total delivery fee with the precomputed pricing plan.
+    calculate_delivery_fee_stepwise(order: DeliveryOrder)
         Uses the other methods to apply fees to get the total delivery fee.
+    calculate_delivery_fee_breakdown(order: DeliveryOrder)
+        Calculates the total delivery fee and each of its components.
+    is_rush(time_as_datetime: datetime)
+        Tells whether the rush fee applies at the given time.
+    rush_changes_within_hour(time_as_datetime: datetime)
+        Tells whether the rush starts or ends within the UTC hour of the time.
+    next_rush_boundary(time_as_datetime: datetime)
+        Returns the first time after the given time when the rush starts or ends.
+    quote_grid(rush: bool)
+        Tabulates the fees by delivery distance and number of items.
+    calculate_delivery_fees(orders: list)
+        Calculates the delivery fee for each of the given orders.
+    calculate_delivery_fees_columnar(
+        cart_values, delivery_distances, numbers_of_items, times
+    )
+        Calculates delivery fees for columns of order parameters with NumPy.
     '''
 
+    DEFAULT_FEE_VERSION = 'default'
+
     def __init__(self):
+        self._pricing_plan = None
         self.cart_value_free_delivery_limit_cents = 20000
         self.cart_value_surcharge_limit_cents = 1000
         self.number_of_items_surcharge_limit = 4
@@ -82,12 +183,34 @@ class DeliveryFeeCalculator:
         self.delivery_distance_start_fee_cents = 200
         self.delivery_distance_additional_length_meters = 500
         self.delivery_distance_additional_length_fee_cents = 100
+        self.time_zone = 'UTC'
         self.time_rush_weekday = 4 # Monday... Sunday = 0... 6
         self.time_rush_start_hour = time(hour = 15)
         self.time_rush_end_hour = time(hour = 19)
         self.time_rush_multiplier = 1.2
         self.max_delivery_fee = 1500
 
+    @classmethod
+    def from_config(cls, fee_config: dict) -> 'DeliveryFeeCalculator':
+        '''Creates a calculator with the attributes given in a fee configuration.
+
+        fee_config maps attribute names to values, as validated by FeeConfigSchema.
+        Attributes that are not in fee_config keep their default values.
+        '''
+
+        delivery_fee_calculator = cls()
+        for name, value in fee_config.items():
+            if name not in vars(delivery_fee_calculator) or name.startswith('_'):
+                raise AttributeError(f'Unknown fee configuration attribute {name}')
+            setattr(delivery_fee_calculator, name, value)
+        return delivery_fee_calculator
+
+    def __setattr__(self, name, value):
+        # the pricing plan is built from the attributes, so it has to be rebuilt
+        object.__setattr__(self, name, value)
+        if name != '_pricing_plan':
+            object.__setattr__(self, '_pricing_plan', None)
+
     def add_delivery_distance_fee(
             self, delivery_fee: int | float, delivery_distance: int
     ) -> int | float:
@@ -148,10 +271,11 @@ class DeliveryFeeCalculator:
     def add_time_fee(self, delivery_fee: int | float, time_as_datetime: datetime) -> int | float:
         '''Adds fees related to time to the delivery_fee.
 
-        If the timestamp is within the rush day and hours,
-        the delivery_fee is multiplied with the rush multiplier.
+        If the timestamp is within the rush day and hours in the time zone
+        of the calculator, the delivery_fee is multiplied with the rush multiplier.
         '''
 
+        time_as_datetime = time_as_datetime.astimezone(ZoneInfo(self.time_zone))
         day_of_the_week = datetime.weekday(time_as_datetime)
         if day_of_the_week == self.time_rush_weekday:
             if self.time_rush_start_hour <= time_as_datetime.time() <= self.time_rush_end_hour:
@@ -165,11 +289,97 @@ class DeliveryFeeCalculator:
             delivery_fee = self.max_delivery_fee
         return delivery_fee
 
-    def calculate_delivery_fee(self, parameters_dict: dict) -> int | float:
-        '''Calculates delivery fee based on parameters in the parameters_dict.'''
+    def compile_pricing_plan(self) -> 'PricingPlan':
+        '''Precomputes the pricing rules into a PricingPlan.
+
+        The plan is cached and used by calculate_delivery_fee until
+        one of the attributes of the calculator is changed.
+        '''
+
+        # item fees for every number of items up to the bulk limit and one past it,
+        # larger numbers of items continue from the last fee in steps of the item surcharge
+        number_of_items_fees = tuple(
+            self.add_number_of_items_fee(0, number_of_items)
+            for number_of_items in range(
+                max(self.number_of_items_surcharge_limit, self.number_of_items_bulk_limit) + 2
+            )
+        )
+
+        pricing_plan = PricingPlan(
+            cart_value_surcharge_limit_cents=self.cart_value_surcharge_limit_cents,
+            cart_value_free_delivery_limit_cents=self.cart_value_free_delivery_limit_cents,
+            delivery_distance_start_meters=self.delivery_distance_start_meters,
+            delivery_distance_start_fee_cents=self.delivery_distance_start_fee_cents,
+            delivery_distance_additional_length_meters=(
+                self.delivery_distance_additional_length_meters
+            ),
+            delivery_distance_additional_length_fee_cents=(
+                self.delivery_distance_additional_length_fee_cents
+            ),
+            number_of_items_fees=number_of_items_fees,
+            number_of_items_surcharge_limit=self.number_of_items_surcharge_limit,
+            number_of_items_surcharge_fee_cents=self.number_of_items_surcharge_fee_cents,
+            number_of_items_bulk_limit=self.number_of_items_bulk_limit,
+            number_of_items_bulk_fee_cents=self.number_of_items_bulk_fee_cents,
+            rush_calendar=rush_calendar(
+                self.time_zone, self.time_rush_weekday,
+                self.time_rush_start_hour, self.time_rush_end_hour
+            ),
+            time_rush_multiplier=self.time_rush_multiplier,
+            max_delivery_fee=self.max_delivery_fee,
+        )
+        self._pricing_plan = pricing_plan
+        return pricing_plan
+
+    def calculate_delivery_fee(self, order: DeliveryOrder) -> int | float:
+        '''Calculates delivery fee based on the parameters of the order.
+
+        Uses the precomputed pricing plan, so one fee takes a few integer
+        operations. Gives the same result as calculate_delivery_fee_stepwise.
+        '''
+
+        plan = self._pricing_plan or self.compile_pricing_plan()
+
+        # distance, number of items and cart value fees
+        distance_fee, number_of_items_fee, small_order_surcharge, free_delivery = (
+            _fee_components(plan, order)
+        )
+        if free_delivery:
+            delivery_fee = 0
+        else:
+            delivery_fee = distance_fee + number_of_items_fee + small_order_surcharge
+
+        # time fee
+        # inlined RushCalendar.is_rush
+        time_as_datetime = order.time
+        calendar = plan.rush_calendar
+        ordinal = time_as_datetime.toordinal()
+        if (
+                time_as_datetime.tzinfo is timezone.utc
+                and calendar.first_ordinal <= ordinal < calendar.end_ordinal
+        ):
+            rush = calendar.rush_hours.get(ordinal * 24 + time_as_datetime.hour, False)
+            if rush is None:
+                rush = calendar.is_rush(time_as_datetime)
+        else:
+            rush = calendar.is_rush(time_as_datetime)
+        if rush:
+            delivery_fee *= plan.time_rush_multiplier
+
+        # max delivery fee
+        if delivery_fee > plan.max_delivery_fee:
+            delivery_fee = plan.max_delivery_fee
+        return delivery_fee
+
+    def calculate_delivery_fee_stepwise(self, order: DeliveryOrder) -> int | float:
+        '''Calculates delivery fee based on the parameters of the order.
+
+        Applies the add_* methods one after another. Gives the same result
+        as calculate_delivery_fee, which is faster.
+        '''
 
         # dict key: function for modifying delivery fee
-        # dict value: name of key in parameters_dict whose value to use as argument
+        # dict value: name of attribute of order whose value to use as argument
         delivery_fee_functions = {
             self.add_delivery_distance_fee: 'delivery_distance',
             self.add_number_of_items_fee: 'number_of_items',
@@ -179,10 +389,263 @@ class DeliveryFeeCalculator:
         }
         # calculate delivery fee
         delivery_fee = 0
-        for function, key_name in delivery_fee_functions.items():
-            if key_name is not None:
-                delivery_fee = function(delivery_fee, parameters_dict[key_name])
+        for function, attribute_name in delivery_fee_functions.items():
+            if attribute_name is not None:
+                delivery_fee = function(delivery_fee, getattr(order, attribute_name))
             else:
                 delivery_fee = function(delivery_fee)
         return delivery_fee
-    
\ No newline at end of file
+    
+    def calculate_delivery_fee_breakdown(self, order: DeliveryOrder) -> FeeBreakdown:
+        '''Calculates the delivery fee and each of its components in one pass.
+
+        Uses the precomputed pricing plan like calculate_delivery_fee,
+        and gives the same delivery_fee.
+        '''
+
+        plan = self._pricing_plan or self.compile_pricing_plan()
+
+        distance_fee, number_of_items_fee, small_order_surcharge, free_delivery = (
+            _fee_components(plan, order)
+        )
+        bulk_fee = 0
+        if order.number_of_items > plan.number_of_items_bulk_limit:
+            bulk_fee = plan.number_of_items_bulk_fee_cents
+        items_fee = number_of_items_fee - bulk_fee
+        if free_delivery:
+            delivery_fee = 0
+        else:
+            delivery_fee = number_of_items_fee + distance_fee + small_order_surcharge
+
+        rush = plan.rush_calendar.is_rush(order.time)
+        rush_multiplier = 1
+        if rush:
+            rush_multiplier = plan.time_rush_multiplier
+            delivery_fee *= rush_multiplier
+
+        max_fee_cap_applied = delivery_fee > plan.max_delivery_fee
+        if max_fee_cap_applied:
+            delivery_fee = plan.max_delivery_fee
+        return FeeBreakdown(
+            distance_fee, items_fee, bulk_fee, small_order_surcharge,
+            free_delivery, rush_multiplier, max_fee_cap_applied, delivery_fee
+        )
+
+    def is_rush(self, time_as_datetime: datetime) -> bool:
+        '''Tells whether the rush fee applies at the given time.
+
+        Uses the rush calendar of the pricing plan in the same way as calculate_delivery_fee.
+        '''
+
+        plan = self._pricing_plan or self.compile_pricing_plan()
+        return plan.rush_calendar.is_rush(time_as_datetime)
+
+    def rush_changes_within_hour(self, time_as_datetime: datetime) -> bool:
+        '''Tells whether the rush starts or ends within the UTC hour of the time.
+
+        Outside of such hours, orders with the same other parameters
+        have the same delivery fee for the whole hour, see DeliveryFeeCache.
+        '''
+
+        plan = self._pricing_plan or self.compile_pricing_plan()
+        return plan.rush_calendar.changes_within_hour(time_as_datetime)
+
+    def next_rush_boundary(self, time_as_datetime: datetime) -> datetime:
+        '''Returns the first time after time_as_datetime when the rush starts or ends.
+
+        Until then is_rush gives the same result as at time_as_datetime.
+        The rush ends one microsecond after its end time, which is still in the rush.
+        '''
+
+        plan = self._pricing_plan or self.compile_pricing_plan()
+        return plan.rush_calendar.next_boundary(time_as_datetime)
+
+    def quote_grid(self, rush: bool) -> dict:
+        '''Tabulates the fees by delivery distance and number of items.
+
+        Row i of subtotals is for delivery distances up to distance_limits[i],
+        and column j for j + 1 items. Longer distances and more items use the
+        last row and column, which either don't change any more or are all
+        capped to max_delivery_fee. Fees are looked up from subtotals like
+        calculate_delivery_fee calculates them: 0 when the cart value is
+        at least both the surcharge limit and the free delivery limit, and otherwise
+        min(round((subtotal + small order surcharge) * rush_multiplier), max_delivery_fee).
+        The grid has at most MAX_QUOTE_GRID_ROWS rows and MAX_QUOTE_GRID_COLUMNS
+        columns. complete is False when the fees still change past them, in
+        which case longer distances and more items can't be looked up.
+        '''
+
+        plan = self._pricing_plan or self.compile_pricing_plan()
+        rush_multiplier = plan.time_rush_multiplier if rush else 1
+        max_delivery_fee = plan.max_delivery_fee
+
+        def is_settled(fee: int) -> bool:
+            # higher fees than this one give the same delivery fee
+            return rush_multiplier == 0 or fee * rush_multiplier >= max_delivery_fee
+
+        distance_limits = [plan.delivery_distance_start_meters]
+        distance_fees = [plan.delivery_distance_start_fee_cents]
+        while (
+                plan.delivery_distance_additional_length_fee_cents > 0
+                and not is_settled(distance_fees[-1])
+                and len(distance_fees) < MAX_QUOTE_GRID_ROWS
+        ):
+            distance_limits.append(
+                distance_limits[-1] + plan.delivery_distance_additional_length_meters
+            )
+            distance_fees.append(
+                distance_fees[-1] + plan.delivery_distance_additional_length_fee_cents
+            )
+        complete = (
+            plan.delivery_distance_additional_length_fee_cents == 0
+            or is_settled(distance_fees[-1])
+        )
+
+        # past the surcharge and bulk limits only the per item surcharge changes the fee
+        last_limit = max(self.number_of_items_surcharge_limit, self.number_of_items_bulk_limit)
+        items_fees = [self.add_number_of_items_fee(0, 1)]
+        while (
+                len(items_fees) < MAX_QUOTE_GRID_COLUMNS
+                and not is_settled(distance_fees[0] + items_fees[-1])
+                and (len(items_fees) <= last_limit or plan.number_of_items_surcharge_fee_cents > 0)
+        ):
+            items_fees.append(self.add_number_of_items_fee(0, len(items_fees) + 1))
+        complete = complete and (
+            is_settled(distance_fees[0] + items_fees[-1])
+            or len(items_fees) > last_limit and plan.number_of_items_surcharge_fee_cents == 0
+        )
+
+        return {
+            'rush': rush,
+            'complete': complete,
+            'rush_multiplier': rush_multiplier,
+            'max_delivery_fee': max_delivery_fee,
+            'cart_value_surcharge_limit': plan.cart_value_surcharge_limit_cents,
+            'cart_value_free_delivery_limit': plan.cart_value_free_delivery_limit_cents,
+            'distance_limits': distance_limits,
+            'subtotals': [
+                [distance_fee + items_fee for items_fee in items_fees]
+                for distance_fee in distance_fees
+            ],
+        }
+
+    def calculate_delivery_fees(self, orders: list) -> list:
+        '''Calculates delivery fees for a list of orders.
+
+        Orders that are None are skipped and their fee is None,
+        so the result stays index-aligned with orders.
+        '''
+
+        calculate_delivery_fee = self.calculate_delivery_fee
+        return [
+            None if order is None else calculate_delivery_fee(order)
+            for order in orders
+        ]
+
+    def calculate_delivery_fees_columnar(
+            self, cart_values, delivery_distances, numbers_of_items, times
+    ):
+        '''Calculates delivery fees for columns of order parameters at once.
+
+        Each argument is a one-dimensional array-like with one element per order.
+        times is either a numpy.datetime64 array in UTC, or a sequence of
+        timezone aware datetime objects. Applies the same rules as the add_*
+        methods and returns the unrounded delivery fees as a float64 numpy array,
+        equal element by element to what calculate_delivery_fee returns.
+        '''
+        import numpy as np
+
+        cart_values = np.asarray(cart_values, dtype=np.int64)
+        delivery_distances = np.asarray(delivery_distances, dtype=np.int64)
+        numbers_of_items = np.asarray(numbers_of_items, dtype=np.int64)
+        times = _as_utc_datetime64(times)
+
+        # distance fee, see add_delivery_distance_fee
+        additional_distance = np.maximum(
+            delivery_distances - self.delivery_distance_start_meters, 0
+        )
+        number_of_additional_lengths = -(
+            -additional_distance // self.delivery_distance_additional_length_meters
+        )
+        delivery_fees = (
+            self.delivery_distance_start_fee_cents
+            + number_of_additional_lengths * self.delivery_distance_additional_length_fee_cents
+        )
+
+        # number of items fee, see add_number_of_items_fee
+        number_of_surcharges = np.maximum(
+            numbers_of_items - self.number_of_items_surcharge_limit, 0
+        )
+        delivery_fees = delivery_fees + number_of_surcharges * self.number_of_items_surcharge_fee_cents
+        delivery_fees = delivery_fees + np.where(
+            numbers_of_items > self.number_of_items_bulk_limit,
+            self.number_of_items_bulk_fee_cents, 0
+        )
+
+        # cart value fee, see add_cart_value_fee
+        small_order_surcharges = np.maximum(self.cart_value_surcharge_limit_cents - cart_values, 0)
+        delivery_fees = np.where(
+            (small_order_surcharges == 0)
+            & (cart_values >= self.cart_value_free_delivery_limit_cents),
+            0, delivery_fees + small_order_surcharges
+        )
+
+        # time fee, see add_time_fee
+        plan = self._pricing_plan or self.compile_pricing_plan()
+        is_rush = plan.rush_calendar.is_rush_columnar(times.astype(np.int64))
+        delivery_fees = delivery_fees.astype(np.float64)
+        delivery_fees = np.where(is_rush, delivery_fees * self.time_rush_multiplier, delivery_fees)
+
+        # max delivery fee, see apply_max_delivery_fee
+        return np.minimum(delivery_fees, self.max_delivery_fee)
+
+
+def _as_utc_datetime64(times):
+    '''Converts times to a numpy.datetime64 array with microsecond precision in UTC.'''
+    import numpy as np
+
+    if isinstance(times, np.ndarray) and np.issubdtype(times.dtype, np.datetime64):
+        return times.astype('datetime64[us]')
+    return np.array(
+        [time_as_datetime.astimezone(timezone.utc).replace(tzinfo=None) for time_as_datetime in times],
+        dtype='datetime64[us]'
+    )
+
+
+def _fee_components(plan: PricingPlan, order: DeliveryOrder) -> tuple:
+    '''Returns the fees of an order before the rush and the maximum fee.
+
+    The fees are the distance fee, the number of items fee including the
+    bulk fee and the small order surcharge, followed by whether the delivery
+    is free. Like add_cart_value_fee, a small order surcharge rules out
+    free delivery. Shared by calculate_delivery_fee and
+    calculate_delivery_fee_breakdown, so that they can't disagree.
+    '''
+    additional_distance = order.delivery_distance - plan.delivery_distance_start_meters
+    distance_fee = plan.delivery_distance_start_fee_cents
+    if additional_distance > 0:
+        distance_fee += (
+            -(-additional_distance // plan.delivery_distance_additional_length_meters)
+            * plan.delivery_distance_additional_length_fee_cents
+        )
+
+    number_of_items = order.number_of_items
+    number_of_items_fees = plan.number_of_items_fees
+    if number_of_items < len(number_of_items_fees):
+        number_of_items_fee = number_of_items_fees[number_of_items]
+    else:
+        number_of_items_fee = number_of_items_fees[-1] + (
+            (number_of_items - len(number_of_items_fees) + 1)
+            * plan.number_of_items_surcharge_fee_cents
+        )
+
+    cart_value = order.cart_value
+    if cart_value < plan.cart_value_surcharge_limit_cents:
+        return (
+            distance_fee, number_of_items_fee,
+            plan.cart_value_surcharge_limit_cents - cart_value, False
+        )
+    return (
+        distance_fee, number_of_items_fee, 0,
+        cart_value >= plan.cart_value_free_delivery_limit_cents
+    )
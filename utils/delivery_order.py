@@ -0,0 +1,61 @@
+'''Delivery order.
+
+This module contains the DeliveryOrder class, which holds
+the validated parameters of one order.
+'''
+from datetime import datetime
+
+
+class DeliveryOrder:
+    '''
+    The validated parameters of one order.
+
+    DeliveryFeeSchema creates orders and DeliveryFeeCalculator prices them.
+    The class has slots instead of an instance dict, so an order is small
+    and its attributes are fast to read. Orders are treated as immutable,
+    but their attributes are not read-only, because that makes creating
+    an order several times slower. The methods are written out instead of
+    generated with dataclasses, whose import is slower than the rest of
+    the pricing core together.
+
+    ...
+
+    Attributes
+    ----------
+    cart_value: int
+        Value of the shopping cart in cents.
+    delivery_distance: int
+        The distance between the store and customer’s location in meters.
+    number_of_items: int
+        The number of items in the customer's shopping cart.
+    time: datetime
+        Order time as a timezone aware datetime in UTC.
+    '''
+
+    __slots__ = ('cart_value', 'delivery_distance', 'number_of_items', 'time')
+
+    def __init__(
+            self, cart_value: int, delivery_distance: int, number_of_items: int, time: datetime
+    ):
+        self.cart_value = cart_value
+        self.delivery_distance = delivery_distance
+        self.number_of_items = number_of_items
+        self.time = time
+
+    def __repr__(self) -> str:
+        return (
+            f'DeliveryOrder(cart_value={self.cart_value!r}, '
+            f'delivery_distance={self.delivery_distance!r}, '
+            f'number_of_items={self.number_of_items!r}, time={self.time!r})'
+        )
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            (self.cart_value, self.delivery_distance, self.number_of_items, self.time)
+            == (other.cart_value, other.delivery_distance, other.number_of_items, other.time)
+        )
+
+    # like a dataclass, orders compare by value and are not hashable
+    __hash__ = None
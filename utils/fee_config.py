@@ -0,0 +1,214 @@
+'''Fee configuration files.
+
+This module contains functions for loading fee configuration files
+into pricing profiles, and the FeeConfigWatcher class, which reloads
+a fee configuration file when it changes and swaps the new pricing
+profiles in without restarting the server.
+'''
+import json
+import logging
+import os
+import signal
+import threading
+from schemas.fee_config import FeeConfigSchema
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.pricing_context import (
+    DEFAULT_PROFILE_NAME, PricingContext, PricingContextHolder, PricingProfiles
+)
+
+logger = logging.getLogger(__name__)
+
+
+def load_fee_config(path: str) -> dict:
+    '''Reads and validates a JSON fee configuration file.
+
+    Raises OSError if the file cannot be read, ValueError if it is not JSON
+    and marshmallow.ValidationError if it is not a valid fee configuration.
+    '''
+    with open(path, encoding='utf-8') as fee_config_file:
+        return FeeConfigSchema().load(json.load(fee_config_file))
+
+def profile_calculator_configs(fee_config: dict) -> tuple[dict, str]:
+    '''Splits a validated fee configuration into the configurations of its profiles.
+
+    Returns a dict from profile names to the fees of each profile, with the
+    shared fees filled in and including the currency if there is one, and
+    the name of the default profile.
+    '''
+    shared_profile_config = dict(fee_config)
+    shared_profile_config.pop('version')
+    profile_configs = shared_profile_config.pop('profiles', {DEFAULT_PROFILE_NAME: {}})
+    default_profile_name = shared_profile_config.pop('default_profile', next(iter(profile_configs)))
+    return {
+        profile_name: {**shared_profile_config, **profile_config}
+        for profile_name, profile_config in profile_configs.items()
+    }, default_profile_name
+
+def pricing_profiles_from_config(fee_config: dict | None, **create_kwargs) -> PricingProfiles:
+    '''Builds the pricing contexts of all profiles of a validated fee configuration.
+
+    Uses the default fees when fee_config is None. create_kwargs are
+    passed on to PricingContext.create, for example fee_cache_size.
+    When they include metrics, the fee cache gauges of the new profiles
+    replace those of the previous ones.
+    '''
+    if fee_config is None:
+        pricing_profiles = PricingProfiles.single(PricingContext.create(**create_kwargs))
+    else:
+        calculator_configs, default_profile_name = profile_calculator_configs(fee_config)
+        pricing_contexts = {}
+        for profile_name, calculator_config in calculator_configs.items():
+            currency = calculator_config.pop('currency', None)
+            pricing_contexts[profile_name] = PricingContext.create(
+                delivery_fee_calculator=DeliveryFeeCalculator.from_config(calculator_config),
+                fee_version=fee_config['version'], profile_name=profile_name, currency=currency,
+                **create_kwargs
+            )
+        pricing_profiles = PricingProfiles(pricing_contexts, default_profile_name)
+
+    if create_kwargs.get('metrics') is not None:
+        pricing_profiles.register_cache_gauges(create_kwargs['metrics'])
+    return pricing_profiles
+
+
+class FeeConfigWatcher:
+    '''
+    Reloads a fee configuration file when it changes.
+
+    A background thread checks the modification time of the file.
+    A reload can also be requested with SIGHUP. The new configuration is
+    validated and compiled into new PricingProfiles before they are swapped
+    into the holder, so an invalid file never replaces a working one and
+    requests in flight are never blocked.
+
+    ...
+
+    Attributes
+    ----------
+    path: str
+        The fee configuration file
+    pricing_context_holder: PricingContextHolder
+        Receives the pricing profiles built from each loaded configuration
+    build_pricing_profiles
+        Function building PricingProfiles from a validated fee configuration
+    poll_interval_seconds: float
+        How often the modification time of the file is checked
+
+    Methods
+    -------
+    reload()
+        Loads the file and swaps in new pricing profiles.
+    check_for_changes()
+        Reloads the file if it has changed since it was last loaded.
+    start()
+        Starts the background thread.
+    stop()
+        Stops the background thread.
+    install_signal_handler()
+        Makes SIGHUP request a reload.
+    '''
+
+    def __init__(
+            self, path: str, pricing_context_holder: PricingContextHolder,
+            build_pricing_profiles, poll_interval_seconds: float = 5.0
+    ):
+        self.path = path
+        self.pricing_context_holder = pricing_context_holder
+        self.build_pricing_profiles = build_pricing_profiles
+        self.poll_interval_seconds = poll_interval_seconds
+        self._file_signature = None
+        self._reload_requested = False
+        self._stopping = False
+        self._wake_up = threading.Event()
+        self._thread = None
+
+    def _read_file_signature(self) -> tuple | None:
+        '''Returns the modification time and size of the file, or None if it is missing.'''
+
+        try:
+            file_stat = os.stat(self.path)
+        except OSError:
+            return None
+        return file_stat.st_mtime_ns, file_stat.st_size
+
+    def reload(self, raise_errors: bool = False) -> bool:
+        '''Loads the file and swaps in new pricing profiles.
+
+        Returns True if the pricing profiles were replaced. An invalid file is
+        logged and ignored, unless raise_errors is True.
+        '''
+
+        file_signature = self._read_file_signature()
+        try:
+            fee_config = load_fee_config(self.path)
+            pricing_profiles = self.build_pricing_profiles(fee_config)
+        except Exception:  # pylint: disable=broad-except
+            if raise_errors:
+                raise
+            logger.exception('Fee configuration %s was not reloaded', self.path)
+            return False
+        self._file_signature = file_signature
+        self.pricing_context_holder.swap(pricing_profiles)
+        logger.info('Loaded fee configuration %s version %s', self.path, fee_config['version'])
+        return True
+
+    def check_for_changes(self) -> bool:
+        '''Reloads the file if it has changed since it was last loaded.
+
+        Returns True if the pricing profiles were replaced.
+        '''
+
+        if self._read_file_signature() == self._file_signature:
+            return False
+        return self.reload()
+
+    def _watch(self):
+        '''Checks for changes until stop() is called.'''
+
+        while True:
+            self._wake_up.wait(self.poll_interval_seconds)
+            self._wake_up.clear()
+            if self._stopping:
+                return
+            if self._reload_requested:
+                self._reload_requested = False
+                self.reload()
+            else:
+                self.check_for_changes()
+
+    def start(self):
+        '''Starts the background thread.'''
+
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._watch, name='fee-config-watcher', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        '''Stops the background thread.'''
+
+        self._stopping = True
+        self._wake_up.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def install_signal_handler(self):
+        '''Makes SIGHUP request a reload from the background thread.
+
+        Does nothing outside of the main thread or on platforms without SIGHUP,
+        because signal handlers can only be installed there.
+        '''
+
+        if (
+            not hasattr(signal, 'SIGHUP')
+            or threading.current_thread() is not threading.main_thread()
+        ):
+            return
+
+        def request_reload(signal_number, frame):
+            self._reload_requested = True
+            self._wake_up.set()
+
+        signal.signal(signal.SIGHUP, request_reload)
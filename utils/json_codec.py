@@ -0,0 +1,72 @@
+'''JSON encoding and decoding.
+
+This module contains the functions dumps and loads, which use orjson
+when it is installed and the json module of the standard library otherwise.
+Both give the same data, orjson is just faster, especially for large
+responses like the error messages of a batch.
+'''
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_LIBRARY = 'json' if orjson is None else 'orjson'
+
+
+if orjson is not None:
+    # validation errors of a batch are keyed by the index of the order
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    # orjson turns integers that don't fit in 64 bits into floats,
+    # so input with 19 or more digits in a row is left to json.loads
+    _search_long_digits_bytes = re.compile(rb'\d{19}').search
+    _search_long_digits_str = re.compile(r'\d{19}', re.ASCII).search
+
+    def dumps(obj, default=None) -> bytes:
+        '''Serializes obj as UTF-8 encoded JSON.
+
+        default is called for objects that can't be serialized otherwise,
+        like the default argument of json.dumps. Falls back to json.dumps
+        for the objects orjson rejects but json accepts, like integers of
+        more than 64 bits, so that the same data gives the same JSON either way.
+        '''
+        try:
+            return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+        except TypeError:
+            return json.dumps(obj, default=default).encode()
+
+    def loads(data: str | bytes):
+        '''Deserializes JSON from a string or bytes.
+
+        Falls back to json.loads for the input orjson reads differently
+        or rejects but json accepts, like integers of more than 64 bits,
+        NaN or UTF-16, so that the same input gives the same data either way.
+        Raises ValueError if data is not JSON.
+        '''
+        if isinstance(data, str):
+            if _search_long_digits_str(data) is not None:
+                return json.loads(data)
+        elif _search_long_digits_bytes(data) is not None:
+            return json.loads(data)
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)
+
+else:
+    def dumps(obj, default=None) -> bytes:
+        '''Serializes obj as UTF-8 encoded JSON.
+
+        default is called for objects that can't be serialized otherwise,
+        like the default argument of json.dumps.
+        '''
+        return json.dumps(obj, default=default).encode()
+
+    def loads(data: str | bytes):
+        '''Deserializes JSON from a string or bytes.
+
+        Raises ValueError if data is not JSON.
+        '''
+        return json.loads(data)
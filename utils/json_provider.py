@@ -0,0 +1,60 @@
+'''JSON provider for Flask.
+
+This module contains the class FastJSONProvider, which parses request
+JSON with the functions of utils.json_codec, and the function output_json,
+which serializes the responses of flask_restful resources with them.
+'''
+import json
+from flask import current_app, make_response
+from flask.json.provider import DefaultJSONProvider
+from utils import json_codec
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    '''
+    A Flask JSON provider that uses orjson when it is installed.
+
+    Calls without extra arguments go through utils.json_codec, calls with
+    arguments for json.dumps or json.loads, like indent, are passed to
+    DefaultJSONProvider. Keys are not sorted, like in the responses of
+    flask_restful.
+
+    ...
+
+    Methods
+    -------
+    dumps(obj, **kwargs)
+        Serializes data as JSON to a string.
+    loads(s: str | bytes, **kwargs)
+        Deserializes data as JSON from a string or bytes.
+    '''
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs) -> str:
+        '''Serializes data as JSON to a string.'''
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return json_codec.dumps(obj, default=self.default).decode()
+
+    def loads(self, s: str | bytes, **kwargs):
+        '''Deserializes data as JSON from a string or bytes.'''
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return json_codec.loads(s)
+
+
+def output_json(data, code, headers=None):
+    '''Makes a Flask response with a JSON encoded body.
+
+    Replaces flask_restful.representations.json.output_json, which always
+    uses the json module. The body ends with a new line and is indented
+    in debug mode, like before.
+    '''
+    if current_app.debug:
+        body = json.dumps(data, indent=4) + '\n'
+    else:
+        body = json_codec.dumps(data) + b'\n'
+    response = make_response(body, code)
+    response.headers.extend(headers or {})
+    return response
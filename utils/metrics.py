@@ -0,0 +1,181 @@
+'''Metrics collection.
+
+This module contains the MetricsRegistry class, which counts requests
+and validation errors and records stage latencies, and renders them
+in the Prometheus text exposition format.
+'''
+from bisect import bisect_left
+from threading import Lock
+
+# upper bounds of the latency histogram buckets in seconds, +Inf is implicit
+LATENCY_BUCKETS_SECONDS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+)
+# the field label of validation errors of fields that are not declared
+UNKNOWN_FIELD_LABEL = '_unknown'
+
+
+class MetricsRegistry:
+    '''
+    Collects request metrics in memory for the /metrics end point.
+
+    Recording a value takes one lock and a few dict operations,
+    so the registry can be left on in production.
+
+    ...
+
+    Attributes
+    ----------
+    request_counts: dict
+        The number of responses by (endpoint, HTTP status).
+    validation_error_counts: dict
+        The number of validation errors by field name, with every field
+        that is not declared counted under UNKNOWN_FIELD_LABEL.
+    stage_histograms: dict
+        Latency histograms by stage name. Each histogram is a list of
+        bucket counts, one per bucket and one for +Inf, followed by the
+        sum of the observed values.
+    gauges: dict
+        Functions returning a current value by metric name and labels,
+        and the help text of each metric name.
+
+    Methods
+    -------
+    observe_stage(stage: str, seconds: float)
+        Records the latency of one stage of a request.
+    count_request(endpoint: str, status: int)
+        Counts one response.
+    count_validation_errors(errors: dict, field_names)
+        Counts the fields that failed validation.
+    register_gauge(name: str, help_text: str, function, labels: dict | None)
+        Adds a value that is read when the metrics are rendered.
+    unregister_gauges(name: str)
+        Removes every value of a gauge.
+    render_prometheus()
+        Returns all metrics in the Prometheus text exposition format.
+    '''
+
+    def __init__(self):
+        self.request_counts = {}
+        self.validation_error_counts = {}
+        self.stage_histograms = {}
+        self.gauges = {}
+        self._gauge_help_texts = {}
+        self._lock = Lock()
+
+    def observe_stage(self, stage: str, seconds: float):
+        '''Records the latency of one stage of a request.'''
+
+        bucket_index = bisect_left(LATENCY_BUCKETS_SECONDS, seconds)
+        with self._lock:
+            histogram = self.stage_histograms.get(stage)
+            if histogram is None:
+                histogram = self.stage_histograms[stage] = [0] * (len(LATENCY_BUCKETS_SECONDS) + 2)
+            histogram[bucket_index] += 1
+            histogram[-1] += seconds
+
+    def count_request(self, endpoint: str, status: int):
+        '''Counts one response of endpoint with the HTTP status.'''
+
+        key = (endpoint, int(status))
+        with self._lock:
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+    def count_validation_errors(self, errors: dict, field_names):
+        '''Counts each field in the errors of a marshmallow ValidationError.
+
+        Fields that are not in field_names, the declared fields of the schema,
+        are counted under UNKNOWN_FIELD_LABEL, so that clients can't add
+        new series to the metrics by sending fields with new names.
+        '''
+
+        with self._lock:
+            for field_name in errors:
+                if field_name not in field_names:
+                    field_name = UNKNOWN_FIELD_LABEL
+                self.validation_error_counts[field_name] = (
+                    self.validation_error_counts.get(field_name, 0) + 1
+                )
+
+    def register_gauge(self, name: str, help_text: str, function, labels: dict | None = None):
+        '''Adds a value that is read from function when the metrics are rendered.
+
+        Registering the same name and labels again replaces the function.
+        '''
+
+        label_text = ','.join(
+            f'{key}="{_escape_label_value(value)}"' for key, value in sorted((labels or {}).items())
+        )
+        with self._lock:
+            self._gauge_help_texts[name] = help_text
+            self.gauges[(name, label_text)] = function
+
+    def unregister_gauges(self, name: str):
+        '''Removes the gauge name with every set of labels it was registered with.'''
+
+        with self._lock:
+            self._gauge_help_texts.pop(name, None)
+            for key in [key for key in self.gauges if key[0] == name]:
+                del self.gauges[key]
+
+    def render_prometheus(self) -> str:
+        '''Returns all metrics in the Prometheus text exposition format.'''
+
+        with self._lock:
+            request_counts = dict(self.request_counts)
+            validation_error_counts = dict(self.validation_error_counts)
+            stage_histograms = {
+                stage: list(histogram) for stage, histogram in self.stage_histograms.items()
+            }
+            gauges = dict(self.gauges)
+
+        lines = [
+            '# HELP delivery_api_requests_total Responses by endpoint and HTTP status.',
+            '# TYPE delivery_api_requests_total counter',
+        ]
+        for (endpoint, status), count in sorted(request_counts.items()):
+            lines.append(
+                f'delivery_api_requests_total'
+                f'{{endpoint="{_escape_label_value(endpoint)}",status="{status}"}} {count}'
+            )
+        lines += [
+            '# HELP delivery_api_validation_errors_total Validation errors by field.',
+            '# TYPE delivery_api_validation_errors_total counter',
+        ]
+        for field_name, count in sorted(validation_error_counts.items()):
+            lines.append(
+                f'delivery_api_validation_errors_total'
+                f'{{field="{_escape_label_value(field_name)}"}} {count}'
+            )
+        lines += [
+            '# HELP delivery_api_stage_duration_seconds Latency of each stage of a request.',
+            '# TYPE delivery_api_stage_duration_seconds histogram',
+        ]
+        for stage, histogram in sorted(stage_histograms.items()):
+            stage = _escape_label_value(stage)
+            cumulative_count = 0
+            for upper_bound, count in zip(LATENCY_BUCKETS_SECONDS + ('+Inf',), histogram):
+                cumulative_count += count
+                lines.append(
+                    f'delivery_api_stage_duration_seconds_bucket'
+                    f'{{stage="{stage}",le="{upper_bound}"}} {cumulative_count}'
+                )
+            lines.append(
+                f'delivery_api_stage_duration_seconds_sum{{stage="{stage}"}} {histogram[-1]}'
+            )
+            lines.append(
+                f'delivery_api_stage_duration_seconds_count{{stage="{stage}"}} {cumulative_count}'
+            )
+        previous_name = None
+        for (name, label_text), function in sorted(gauges.items()):
+            if name != previous_name:
+                lines += [f'# HELP {name} {self._gauge_help_texts[name]}', f'# TYPE {name} gauge']
+                previous_name = name
+            lines.append(f'{name}{{{label_text}}} {function()}' if label_text else f'{name} {function()}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label_value(value) -> str:
+    '''Escapes a label value as the Prometheus text exposition format requires.'''
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
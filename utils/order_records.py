@@ -0,0 +1,123 @@
+'''Binary order records.
+
+This module contains the class OrderRecordWriter and the functions
+read_order_records and price_order_records for storing validated orders
+as fixed-width binary records, so that large order archives can be
+repriced many times without parsing JSON or timestamps again.
+
+A file starts with the 8 bytes of FILE_HEADER, followed by one 20-byte
+record per order: the cart value, delivery distance and number of items
+as little-endian 32-bit integers, and the order time as a little-endian
+64-bit integer of microseconds since 1970-01-01T00:00:00Z.
+'''
+import mmap
+import struct
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.delivery_order import DeliveryOrder
+
+FILE_HEADER = b'DFORDER1'
+RECORD_DTYPE = np.dtype([
+    ('cart_value', '<i4'),
+    ('delivery_distance', '<i4'),
+    ('number_of_items', '<i4'),
+    ('time', '<i8'),
+])
+MAX_RECORD_VALUE = 2 ** 31 - 1
+
+_RECORD_STRUCT = struct.Struct('<iiiq')
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+class OrderRecordWriter:
+    '''
+    Writes orders to a binary file of fixed-width records.
+
+    ...
+
+    Attributes
+    ----------
+    output_file: binary file object
+        Receives the header when the writer is created and then the records.
+    record_count: int
+        The number of records written.
+
+    Methods
+    -------
+    fits_in_record(order: DeliveryOrder)
+        Tells whether the integer fields of an order fit in a record.
+    write_orders(orders: list)
+        Writes validated orders as records.
+    '''
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.record_count = 0
+        output_file.write(FILE_HEADER)
+
+    @staticmethod
+    def fits_in_record(order: DeliveryOrder) -> bool:
+        '''Tells whether the integer fields of an order fit in a record.'''
+        return (
+            order.cart_value <= MAX_RECORD_VALUE
+            and order.delivery_distance <= MAX_RECORD_VALUE
+            and order.number_of_items <= MAX_RECORD_VALUE
+        )
+
+    def write_orders(self, orders: list):
+        '''Writes validated orders as records.
+
+        Raises struct.error if an order does not fit in a record, see fits_in_record.
+        '''
+        pack = _RECORD_STRUCT.pack
+        self.output_file.write(b''.join(
+            pack(
+                order.cart_value, order.delivery_distance, order.number_of_items,
+                (order.time - _EPOCH) // _ONE_MICROSECOND
+            )
+            for order in orders
+        ))
+        self.record_count += len(orders)
+
+
+def read_order_records(path: str) -> np.ndarray:
+    '''Memory-maps a file of order records as a NumPy array of RECORD_DTYPE.
+
+    Nothing is copied or parsed: the array reads the pages of the file
+    as they are used, and the operating system caches them between runs.
+    Raises ValueError if the file is not a file of order records.
+    '''
+    with open(path, 'rb') as records_file:
+        header = records_file.read(len(FILE_HEADER))
+        if header != FILE_HEADER:
+            raise ValueError(f'{path} is not a file of order records')
+        records_file.seek(0, 2)
+        if (records_file.tell() - len(FILE_HEADER)) % RECORD_DTYPE.itemsize:
+            raise ValueError(f'{path} ends with a partial order record')
+        if records_file.tell() == len(FILE_HEADER):
+            return np.empty(0, dtype=RECORD_DTYPE)
+        # the map stays open as long as the array refers to it
+        records_map = mmap.mmap(records_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(records_map, dtype=RECORD_DTYPE, offset=len(FILE_HEADER))
+
+def price_order_records(
+        delivery_fee_calculator: DeliveryFeeCalculator, records: np.ndarray,
+        chunk_size: int = 1_000_000
+) -> np.ndarray:
+    '''Calculates the delivery fees of order records with calculate_delivery_fees_columnar.
+
+    The records are priced chunk_size records at a time, so that the
+    temporary arrays stay small. Returns the unrounded fees as a float64 array.
+    '''
+    delivery_fees = np.empty(len(records), dtype=np.float64)
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        delivery_fees[start:start + chunk_size] = (
+            delivery_fee_calculator.calculate_delivery_fees_columnar(
+                chunk['cart_value'], chunk['delivery_distance'], chunk['number_of_items'],
+                chunk['time'].view('datetime64[us]')
+            )
+        )
+    return delivery_fees
@@ -0,0 +1,129 @@
+'''Streaming of order files.
+
+This module contains generators for reading orders from CSV and
+JSON Lines files in fixed-size chunks, pricing the chunks and
+writing the results, so that files of any size can be repriced
+with a flat memory use.
+'''
+import csv
+import json
+from itertools import islice
+from utils.pricing_context import PricingContext
+
+FORMATS = ('csv', 'jsonl')
+
+
+def detect_format(path: str) -> str:
+    '''Returns the format of a file from its extension, jsonl for .jsonl and .ndjson.'''
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return 'csv'
+
+def read_orders(input_file, input_format: str):
+    '''Yields the orders in input_file as dicts, one per CSV row or JSON line.
+
+    CSV values that consist of digits are converted to int, so that
+    well-formed rows can take the fast path of DeliveryFeeSchema. The
+    missing values of a short row are None and the extra values of a long
+    row are a list keyed by None, which are yielded as they are, so that
+    validation rejects the row.
+    Lines that are not valid JSON are yielded as the string they contain,
+    so that they are rejected by validation like any other invalid order.
+    '''
+    if input_format == 'csv':
+        for row in csv.DictReader(input_file):
+            yield {
+                key: int(value)
+                if isinstance(value, str) and value.isascii() and value.isdigit() else value
+                for key, value in row.items()
+            }
+    else:
+        for line in input_file:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield line.rstrip('\n')
+
+def chunked(iterable, chunk_size: int):
+    '''Yields lists of at most chunk_size consecutive items of iterable.'''
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+def price_chunks(pricing_context: PricingContext, chunks):
+    '''Validates and prices each chunk of orders.
+
+    Yields tuples of the chunk, a list of rounded delivery fees that is
+    index-aligned with the chunk, with None for invalid orders, and a dict
+    of marshmallow error messages keyed by the index of the invalid order.
+    '''
+    delivery_fee_schema = pricing_context.delivery_fee_schema
+    delivery_fee_calculator = pricing_context.delivery_fee_calculator
+    for chunk in chunks:
+        validated_orders, errors = delivery_fee_schema.load_batch(chunk)
+        delivery_fees = delivery_fee_calculator.calculate_delivery_fees(validated_orders)
+        yield chunk, [
+            None if delivery_fee is None else round(delivery_fee)
+            for delivery_fee in delivery_fees
+        ], errors
+
+
+class PricedOrderWriter:
+    '''
+    Writes priced orders and rejected orders to files.
+
+    ...
+
+    Attributes
+    ----------
+    output_file
+        Receives each valid order with its delivery_fee added.
+    output_format: str
+        csv or jsonl
+    rejects_file
+        Receives each invalid order with its row number, counting from 1,
+        and error messages as JSON Lines, or None to drop invalid orders.
+    priced_count: int
+        The number of orders written to output_file.
+    rejected_count: int
+        The number of invalid orders.
+
+    Methods
+    -------
+    write_chunk(chunk: list, delivery_fees: list, errors: dict)
+        Writes one priced chunk as yielded by price_chunks.
+    '''
+
+    def __init__(self, output_file, output_format: str, rejects_file=None):
+        self.output_file = output_file
+        self.output_format = output_format
+        self.rejects_file = rejects_file
+        self.priced_count = 0
+        self.rejected_count = 0
+        self._csv_writer = None
+
+    def write_chunk(self, chunk: list, delivery_fees: list, errors: dict):
+        '''Writes one priced chunk as yielded by price_chunks.'''
+
+        first_row_number = self.priced_count + self.rejected_count + 1
+        for index, (order, delivery_fee) in enumerate(zip(chunk, delivery_fees)):
+            if delivery_fee is None:
+                self.rejected_count += 1
+                if self.rejects_file is not None:
+                    self.rejects_file.write(json.dumps({
+                        'row': first_row_number + index,
+                        'order': order,
+                        'errors': errors[index],
+                    }) + '\n')
+                continue
+            self.priced_count += 1
+            priced_order = dict(order, delivery_fee=delivery_fee)
+            if self.output_format == 'jsonl':
+                self.output_file.write(json.dumps(priced_order) + '\n')
+            else:
+                if self._csv_writer is None:
+                    self._csv_writer = csv.DictWriter(self.output_file, fieldnames=list(priced_order))
+                    self._csv_writer.writeheader()
+                self._csv_writer.writerow(priced_order)
@@ -0,0 +1,79 @@
+'''Parallel repricing.
+
+This module contains price_chunks_in_parallel, which prices chunks of
+orders in a pool of worker processes, each with its own pricing context,
+and yields the results in the original order.
+'''
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from utils.pricing_context import PricingContext
+
+_FIELD_NAMES = ('cart_value', 'delivery_distance', 'number_of_items', 'time')
+
+# the pricing context of a worker process, created by _init_worker
+_worker_pricing_context = None
+
+
+def _init_worker():
+    '''Creates the pricing context of a worker process.'''
+    global _worker_pricing_context
+    _worker_pricing_context = PricingContext.create()
+
+def pack_chunk(chunk: list) -> tuple:
+    '''Packs a chunk of orders into columns to send to a worker process.
+
+    Returns one tuple of values per field, and a dict of the orders that
+    don't have exactly the four fields keyed by their index in the chunk.
+    Those orders are sent as they are, so that they get the same
+    validation errors as in a single process.
+    '''
+    columns = ([], [], [], [])
+    irregular_orders = {}
+    for index, order in enumerate(chunk):
+        if type(order) is dict and len(order) == 4 and all(key in order for key in _FIELD_NAMES):
+            for column, field_name in zip(columns, _FIELD_NAMES):
+                column.append(order[field_name])
+        else:
+            irregular_orders[index] = order
+            for column in columns:
+                column.append(None)
+    return tuple(tuple(column) for column in columns), irregular_orders
+
+def _unpack_chunk(packed_chunk: tuple) -> list:
+    '''Rebuilds the orders of a chunk packed by pack_chunk.'''
+    columns, irregular_orders = packed_chunk
+    chunk = [dict(zip(_FIELD_NAMES, values)) for values in zip(*columns)]
+    for index, order in irregular_orders.items():
+        chunk[index] = order
+    return chunk
+
+def _price_packed_chunk(packed_chunk: tuple) -> tuple[list, dict]:
+    '''Validates and prices a packed chunk in a worker process.
+
+    Returns the rounded delivery fees and the validation errors like price_chunks.
+    '''
+    chunk = _unpack_chunk(packed_chunk)
+    validated_orders, errors = _worker_pricing_context.delivery_fee_schema.load_batch(chunk)
+    delivery_fees = _worker_pricing_context.delivery_fee_calculator.calculate_delivery_fees(
+        validated_orders
+    )
+    return [
+        None if delivery_fee is None else round(delivery_fee) for delivery_fee in delivery_fees
+    ], errors
+
+def price_chunks_in_parallel(chunks, workers: int):
+    '''Validates and prices each chunk of orders in a pool of worker processes.
+
+    Yields the same tuples as order_stream.price_chunks, in the order of chunks.
+    At most two chunks per worker are read ahead, so memory use stays flat.
+    '''
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(_price_packed_chunk, pack_chunk(chunk))))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield (chunk, *future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield (chunk, *future.result())
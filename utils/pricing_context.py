@@ -0,0 +1,388 @@
+'''Shared pricing context.
+
+This module contains the class PricingContext, which holds the objects
+needed to validate and price an order, so that they can be built once
+and shared by every request, the class PricingProfiles, which indexes
+the pricing contexts of several markets by name, and the class
+PricingContextHolder, which allows replacing the shared pricing
+profiles while the server is running.
+'''
+from datetime import datetime
+from hashlib import blake2b
+from http import HTTPStatus
+from time import perf_counter
+from typing import NamedTuple
+from marshmallow import ValidationError
+from schemas.delivery_fee import DeliveryFeeSchema, QuoteGridSchema
+from utils import json_codec
+from utils.delivery_fee_cache import DeliveryFeeCache
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+from utils.metrics import MetricsRegistry
+
+DEFAULT_PROFILE_NAME = 'default'
+# the response to a request for a pricing profile that does not exist
+UNKNOWN_PROFILE_RESPONSE = (
+    {'message': 'Validation errors', 'errors': {'X-Pricing-Profile': ['Unknown pricing profile.']}},
+    HTTPStatus.BAD_REQUEST
+)
+# the largest request body in bytes, room for a full batch of orders
+MAX_CONTENT_LENGTH = 1024 * 1024
+# values of the breakdown query parameter that turn the fee breakdown on
+BREAKDOWN_QUERY_VALUES = ('1', 'true')
+# the names of the fee cache metrics, see PricingProfiles.register_cache_gauges
+CACHE_HITS_GAUGE = 'delivery_api_fee_cache_hits'
+CACHE_MISSES_GAUGE = 'delivery_api_fee_cache_misses'
+
+
+class PricingContext(NamedTuple):
+    '''
+    An immutable pair of a schema and a calculator shared across requests.
+
+    Neither object keeps per-request state, so one context can be
+    used by many threads at the same time. The price_* methods
+    return a response body and an HTTP status, so that every
+    server of the API responds the same way.
+
+    ...
+
+    Attributes
+    ----------
+    delivery_fee_schema: DeliveryFeeSchema
+        A marshmallow schema for validating request data
+    delivery_fee_calculator: DeliveryFeeCalculator | DeliveryFeeCache
+        Used to calculate the delivery fee based on the request
+    metrics: MetricsRegistry | None
+        Records validation errors and the latency of validation and
+        calculation, or None to record nothing
+    fee_version: str
+        Identifies the fee configuration of the calculator
+    profile_name: str
+        The name of the pricing profile of the calculator
+    currency: str | None
+        The currency of the fees, None if not configured
+    quote_grids: tuple
+        The quote grid response and its ETag outside of the rush
+        and in the rush, see DeliveryFeeCalculator.quote_grid
+
+    Methods
+    -------
+    create(
+        delivery_fee_calculator: DeliveryFeeCalculator | None, fee_version: str,
+        profile_name: str, currency: str | None,
+        fee_cache_size: int, fee_cache_ttl_seconds: float | None,
+        metrics: MetricsRegistry | None
+    )
+        Builds a pricing context around a calculator.
+    response_headers()
+        Returns the HTTP headers describing the fees used for a response.
+    price_order(request_dict: dict, breakdown: bool = False)
+        Validates one order and calculates its delivery fee.
+    price_orders(request_list: list, max_batch_size: int)
+        Validates a list of orders and calculates their delivery fees.
+    quote_grid(query: dict, now: datetime)
+        Returns the quote grid for the time given in the query parameters.
+    cache_headers(response_dict: dict, now: datetime, etag: str | None)
+        Returns the headers that let HTTP caches store a response.
+    '''
+
+    delivery_fee_schema: DeliveryFeeSchema
+    delivery_fee_calculator: DeliveryFeeCalculator | DeliveryFeeCache
+    metrics: MetricsRegistry | None = None
+    fee_version: str = DeliveryFeeCalculator.DEFAULT_FEE_VERSION
+    profile_name: str = DEFAULT_PROFILE_NAME
+    currency: str | None = None
+    quote_grids: tuple = ()
+
+    @classmethod
+    def create(
+            cls, delivery_fee_calculator: DeliveryFeeCalculator | None = None,
+            fee_version: str = DeliveryFeeCalculator.DEFAULT_FEE_VERSION,
+            profile_name: str = DEFAULT_PROFILE_NAME, currency: str | None = None,
+            fee_cache_size: int = 0, fee_cache_ttl_seconds: float | None = None,
+            metrics: MetricsRegistry | None = None
+    ) -> 'PricingContext':
+        '''Builds a pricing context around a calculator.
+
+        Uses a calculator with the default fees when delivery_fee_calculator is None.
+        The pricing plan of the calculator is compiled here, so that the first
+        request doesn't pay for it. When fee_cache_size is greater than zero,
+        the calculator is wrapped in a DeliveryFeeCache of that size whose
+        entries expire after fee_cache_ttl_seconds, see
+        PricingProfiles.register_cache_gauges for its metrics. The quote grids
+        are built here too, so that they are built once per fee configuration.
+        '''
+
+        if delivery_fee_calculator is None:
+            delivery_fee_calculator = DeliveryFeeCalculator()
+        delivery_fee_calculator.compile_pricing_plan()
+        quote_grids = tuple(
+            (quote_grid, _etag(quote_grid))
+            for quote_grid in map(delivery_fee_calculator.quote_grid, (False, True))
+        )
+        if fee_cache_size > 0:
+            delivery_fee_calculator = DeliveryFeeCache(
+                delivery_fee_calculator, max_size=fee_cache_size,
+                ttl_seconds=fee_cache_ttl_seconds
+            )
+        return cls(
+            DeliveryFeeSchema(), delivery_fee_calculator, metrics,
+            fee_version, profile_name, currency, quote_grids
+        )
+
+    def response_headers(self) -> dict:
+        '''Returns the HTTP headers describing the fees used for a response.'''
+
+        headers = {'X-Fee-Version': self.fee_version, 'X-Pricing-Profile': self.profile_name}
+        if self.currency is not None:
+            headers['X-Fee-Currency'] = self.currency
+        return headers
+
+    def price_order(
+            self, request_dict: dict, breakdown: bool = False
+    ) -> tuple[dict, HTTPStatus]:
+        '''Validates one order and calculates its delivery fee.
+
+        Returns a dict with the calculated delivery_fee or a dict with
+        a message containing error data, and the HTTP status.
+        When breakdown is True, the dict also has the components
+        of the delivery fee, see FeeBreakdown.
+        '''
+
+        metrics = self.metrics
+        if metrics is not None:
+            validation_start = perf_counter()
+        try:
+            # Validate the request data with marshmallow
+            delivery_order = self.delivery_fee_schema.fast_load(data=request_dict)
+        except ValidationError as error:
+            if metrics is not None:
+                metrics.observe_stage('validation', perf_counter() - validation_start)
+                metrics.count_validation_errors(
+                    error.messages_dict, self.delivery_fee_schema.fields
+                )
+            return {
+                'message': 'Validation errors', 'errors': error.messages_dict
+            }, HTTPStatus.BAD_REQUEST
+
+        if metrics is not None:
+            calculation_start = perf_counter()
+            metrics.observe_stage('validation', calculation_start - validation_start)
+        if breakdown:
+            fee_breakdown = self.delivery_fee_calculator.calculate_delivery_fee_breakdown(
+                delivery_order
+            )
+            delivery_fee = fee_breakdown.delivery_fee
+        else:
+            delivery_fee = self.delivery_fee_calculator.calculate_delivery_fee(delivery_order)
+        if metrics is not None:
+            metrics.observe_stage('calculation', perf_counter() - calculation_start)
+
+        if breakdown:
+            breakdown_dict = fee_breakdown._asdict()
+            del breakdown_dict['delivery_fee']
+            return {
+                'delivery_fee': round(delivery_fee), 'breakdown': breakdown_dict
+            }, HTTPStatus.OK
+        return {'delivery_fee': round(delivery_fee)}, HTTPStatus.OK
+
+    def price_orders(self, request_list: list, max_batch_size: int) -> tuple[dict, HTTPStatus]:
+        '''Validates a list of orders and calculates their delivery fees.
+
+        Returns a dict with a list of results that is index-aligned with
+        request_list, and the HTTP status. Each result contains either the
+        calculated delivery_fee or a message containing error data.
+        '''
+
+        if isinstance(request_list, list) and len(request_list) > max_batch_size:
+            return {
+                'message': f'Batch size exceeds the maximum of {max_batch_size} orders.'
+            }, HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+        metrics = self.metrics
+        if metrics is not None:
+            validation_start = perf_counter()
+        try:
+            # Validate all orders with marshmallow in one pass
+            validated_orders, errors = self.delivery_fee_schema.load_batch(data=request_list)
+        except ValidationError as error:
+            if metrics is not None:
+                metrics.observe_stage('batch_validation', perf_counter() - validation_start)
+                metrics.count_validation_errors(
+                    error.messages_dict, self.delivery_fee_schema.fields
+                )
+            return {
+                'message': 'Validation errors', 'errors': error.messages_dict
+            }, HTTPStatus.BAD_REQUEST
+
+        if metrics is not None:
+            calculation_start = perf_counter()
+            metrics.observe_stage('batch_validation', calculation_start - validation_start)
+            for order_errors in errors.values():
+                metrics.count_validation_errors(order_errors, self.delivery_fee_schema.fields)
+        delivery_fees = self.delivery_fee_calculator.calculate_delivery_fees(validated_orders)
+        if metrics is not None:
+            metrics.observe_stage('batch_calculation', perf_counter() - calculation_start)
+
+        results = []
+        for index, delivery_fee in enumerate(delivery_fees):
+            if delivery_fee is None:
+                results.append({'message': 'Validation errors', 'errors': errors[index]})
+            else:
+                results.append({'delivery_fee': round(delivery_fee)})
+        return {'delivery_fees': results}, HTTPStatus.OK
+
+    def quote_grid(self, query: dict, now: datetime) -> tuple[dict, HTTPStatus, str | None]:
+        '''Returns the quote grid for the time given in the query parameters.
+
+        The time defaults to now. Returns the quote grid
+        or a dict with a message containing error data, the HTTP status,
+        and the ETag of the quote grid or None.
+        '''
+
+        try:
+            time_as_datetime = _QUOTE_GRID_SCHEMA.load(data=query)['time']
+        except ValidationError as error:
+            return {
+                'message': 'Validation errors', 'errors': error.messages_dict
+            }, HTTPStatus.BAD_REQUEST, None
+        if time_as_datetime is None:
+            time_as_datetime = now
+        quote_grid, etag = self.quote_grids[
+            self.delivery_fee_calculator.is_rush(time_as_datetime)
+        ]
+        return quote_grid, HTTPStatus.OK, etag
+
+    def cache_headers(self, response_dict: dict, now: datetime, etag: str | None = None) -> dict:
+        '''Returns the headers that let HTTP caches store a response.
+
+        The response is cached until the next time the rush starts or ends,
+        because a request without a time is priced at the current time.
+        The strong ETag is derived from response_dict unless it is given.
+        '''
+
+        max_age = int((self.delivery_fee_calculator.next_rush_boundary(now) - now).total_seconds())
+        return {
+            'ETag': f'"{etag or _etag(response_dict)}"',
+            'Cache-Control': f'public, max-age={max_age}',
+            'Vary': 'X-Pricing-Profile',
+        }
+
+
+class PricingProfiles(NamedTuple):
+    '''
+    The pricing contexts of all pricing profiles, indexed by profile name.
+
+    ...
+
+    Attributes
+    ----------
+    pricing_contexts: dict
+        PricingContext by profile name
+    default_profile_name: str
+        The profile used when a request does not choose one
+
+    Methods
+    -------
+    single(pricing_context: PricingContext)
+        Creates pricing profiles with one pricing context as the default.
+    get(profile_name: str | None)
+        Returns the pricing context of a profile.
+    register_cache_gauges(metrics: MetricsRegistry)
+        Exposes the counters of the fee caches of the profiles as metrics.
+    '''
+
+    pricing_contexts: dict
+    default_profile_name: str
+
+    @classmethod
+    def single(cls, pricing_context: PricingContext) -> 'PricingProfiles':
+        '''Creates pricing profiles with one pricing context as the default.'''
+
+        return cls({pricing_context.profile_name: pricing_context}, pricing_context.profile_name)
+
+    def get(self, profile_name: str | None = None) -> PricingContext | None:
+        '''Returns the pricing context of a profile, or of the default profile if None.
+
+        Returns None if there is no profile with the name.
+        '''
+
+        return self.pricing_contexts.get(profile_name or self.default_profile_name)
+
+    def register_cache_gauges(self, metrics: MetricsRegistry):
+        '''Exposes the counters of the fee caches of the profiles as metrics.
+
+        Replaces the fee cache gauges of the previous profiles, so that
+        the metrics of removed profiles disappear and their caches can
+        be freed.
+        '''
+
+        for name in (CACHE_HITS_GAUGE, CACHE_MISSES_GAUGE):
+            metrics.unregister_gauges(name)
+        for profile_name, pricing_context in self.pricing_contexts.items():
+            if isinstance(pricing_context.delivery_fee_calculator, DeliveryFeeCache):
+                _register_cache_gauges(
+                    metrics, pricing_context.delivery_fee_calculator, profile_name
+                )
+
+
+class PricingContextHolder:
+    '''
+    Holds the PricingProfiles shared by all requests.
+
+    Replacing the profiles is a single attribute assignment, which is atomic,
+    so requests never see a half-updated set of profiles. A request should
+    call get() once and use that context until it is done, so that requests
+    in flight keep using the context they started with.
+
+    ...
+
+    Attributes
+    ----------
+    pricing_profiles: PricingProfiles | None
+        The current pricing profiles, None until the first ones are swapped in
+
+    Methods
+    -------
+    get(profile_name: str | None)
+        Returns the current pricing context of a profile.
+    swap(pricing_profiles: PricingProfiles)
+        Replaces the current pricing profiles and returns the previous ones.
+    '''
+
+    def __init__(self, pricing_profiles: PricingProfiles | None):
+        self.pricing_profiles = pricing_profiles
+
+    def get(self, profile_name: str | None = None) -> PricingContext | None:
+        '''Returns the current pricing context of a profile, or of the default profile if None.
+
+        Returns None if there is no profile with the name.
+        '''
+
+        return self.pricing_profiles.get(profile_name)
+
+    def swap(self, pricing_profiles: PricingProfiles) -> PricingProfiles | None:
+        '''Replaces the current pricing profiles and returns the previous ones.'''
+
+        previous_pricing_profiles = self.pricing_profiles
+        self.pricing_profiles = pricing_profiles
+        return previous_pricing_profiles
+
+
+_QUOTE_GRID_SCHEMA = QuoteGridSchema()
+
+def _etag(response_dict: dict) -> str:
+    '''Returns a strong ETag derived from the content of a response body.'''
+    return blake2b(json_codec.dumps(response_dict), digest_size=16).hexdigest()
+
+def _register_cache_gauges(
+        metrics: MetricsRegistry, delivery_fee_cache: DeliveryFeeCache, profile_name: str
+):
+    '''Exposes the counters of the fee cache of a pricing profile as metrics.'''
+    labels = {'profile': profile_name}
+    metrics.register_gauge(
+        CACHE_HITS_GAUGE, 'Delivery fees found in the cache.',
+        lambda: delivery_fee_cache.hits, labels
+    )
+    metrics.register_gauge(
+        CACHE_MISSES_GAUGE, 'Delivery fees that had to be calculated.',
+        lambda: delivery_fee_cache.misses, labels
+    )
@@ -0,0 +1,295 @@
+'''Rush calendar.
+
+This module contains the RushCalendar class and the rush_calendar
+function, which compute the instants when a weekly rush in the
+local time of a time zone starts and ends, so that the rush can be
+looked up for a timezone aware datetime without converting it to the
+local time, including across daylight saving time transitions.
+'''
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from threading import Lock
+from zoneinfo import ZoneInfo
+
+# the calendar can cover the rushes from the first year up to but not including the last year,
+# rushes outside of it are calculated from the local time when they are needed
+CALENDAR_YEARS = (2000, 2100)
+# the days around a time that next_boundary needs in the calendar
+_NEXT_BOUNDARY_DAYS = timedelta(days=8)
+
+_ONE_MICROSECOND = timedelta(microseconds=1)
+_ONE_HOUR = timedelta(hours=1)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_MICROSECONDS_PER_DAY = 24 * 3600 * 1_000_000
+
+
+class RushCalendar:
+    '''
+    The rushes of a weekly rush in the local time of a time zone.
+
+    The rush is from start_hour to end_hour, both included, on the
+    weekday of each week in local time. Each rush is stored as an
+    interval of UTC instants, from its start to one microsecond after
+    its end, so that a time is in the rush when it is in an interval.
+    A rush can be split in two intervals when a clock is turned back.
+    The calendar starts empty and is extended a local year at a time
+    when a time outside of it is looked up, so that it only holds the
+    years the times of the orders are in.
+
+    ...
+
+    Attributes
+    ----------
+    time_zone: str
+        The IANA name of the time zone, for example Europe/Helsinki.
+    weekday: int
+        The weekday of the rush, Monday... Sunday = 0... 6.
+    start_hour: datetime.time
+        The local time when the rush starts.
+    end_hour: datetime.time
+        The local time when the rush ends.
+    boundaries: list
+        The sorted starts and ends of the rushes as datetimes in UTC,
+        so that a time is in the rush when an odd number of them are at
+        or before it. The ends are one microsecond after the end times.
+    rush_hours: dict
+        The rush of each UTC hour the rushes overlap, by the ordinal of the
+        day times 24 plus the hour: True if the whole hour is in the rush,
+        and None if the rush starts or ends within the hour, when it is
+        looked up from boundaries. For the days from first_ordinal up to
+        end_ordinal, the other hours are not in the rush.
+    first_ordinal: int
+        The ordinal of the first UTC day of the calendar.
+    end_ordinal: int
+        The ordinal of the UTC day after the last day of the calendar.
+    years: tuple
+        The local years the calendar covers, from the first year up to
+        but not including the last year.
+
+    Methods
+    -------
+    is_rush(time_as_datetime: datetime)
+        Tells whether the time is in the rush.
+    next_boundary(time_as_datetime: datetime)
+        Returns the first time after the given time when the rush starts or ends.
+    changes_within_hour(time_as_datetime: datetime)
+        Tells whether the rush starts or ends within the UTC hour of the time.
+    is_rush_columnar(microseconds)
+        Tells for each element of an array of UTC microseconds since the epoch whether it is in the rush.
+    '''
+
+    def __init__(self, time_zone: str, weekday: int, start_hour: time, end_hour: time):
+        self.time_zone = time_zone
+        self.weekday = weekday
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self._zone_info = ZoneInfo(time_zone)
+        self.boundaries = []
+        self.rush_hours = {}
+        self.first_ordinal = self.end_ordinal = 0
+        self.years = (0, 0)
+        self._boundary_microseconds = None
+        self._extend_lock = Lock()
+
+    def _extend(self, time_as_datetime: datetime):
+        '''Extends the calendar to the local year of the UTC time, if it is in CALENDAR_YEARS.
+
+        The calendar stays contiguous, so the years between the calendar
+        and the year of the time are added too. Safe to call from several
+        threads: the new rushes are added before the range of the calendar
+        is widened to include them.
+        '''
+        year = time_as_datetime.astimezone(self._zone_info).year
+        with self._extend_lock:
+            first_year, end_year = self.years
+            if first_year <= year < end_year or not CALENDAR_YEARS[0] <= year < CALENDAR_YEARS[1]:
+                return
+            if first_year == end_year:
+                first_year, end_year = year, year + 1
+                self.boundaries = self._add_rushes(year, year + 1)
+            elif year < first_year:
+                self.boundaries = self._add_rushes(year, first_year) + self.boundaries
+                first_year = year
+            else:
+                self.boundaries = self.boundaries + self._add_rushes(end_year, year + 1)
+                end_year = year + 1
+            # only whole UTC days of the local years are in the calendar
+            first_midnight = datetime(first_year, 1, 1, tzinfo=self._zone_info).astimezone(timezone.utc)
+            end_midnight = datetime(end_year, 1, 1, tzinfo=self._zone_info).astimezone(timezone.utc)
+            self.years = (first_year, end_year)
+            self.first_ordinal = first_midnight.toordinal() + (first_midnight.time() != time())
+            self.end_ordinal = end_midnight.toordinal()
+
+    def _add_rushes(self, first_year: int, end_year: int) -> list:
+        '''Adds the rush hours of the local years to rush_hours and returns their boundaries.'''
+        rush_day = date(first_year, 1, 1)
+        rush_day += timedelta(days=(self.weekday - rush_day.weekday()) % 7)
+        last_day = date(end_year, 1, 1)
+        boundaries = []
+        while rush_day < last_day:
+            for rush_start, rush_end in self._rush_intervals(rush_day):
+                boundaries += [rush_start, rush_end]
+                hour_start = rush_start.replace(minute=0, second=0, microsecond=0)
+                while hour_start < rush_end:
+                    self.rush_hours[hour_start.toordinal() * 24 + hour_start.hour] = (
+                        rush_start <= hour_start and hour_start + _ONE_HOUR <= rush_end or None
+                    )
+                    hour_start += _ONE_HOUR
+            rush_day += timedelta(days=7)
+        return boundaries
+
+    def _rush_intervals(self, rush_day: date) -> list:
+        '''Returns the (start, end plus one microsecond) intervals in UTC of the rush on a local day.
+
+        The intervals cover exactly the times whose local time is from
+        start_hour to end_hour. Usually that is one interval, but when a
+        clock is turned back during the rush and the local times of the
+        repeated hour are not all in the rush, it is two, and when a clock
+        is turned forward over the whole rush, none.
+        '''
+        # the UTC offset is constant in each span between the changes of the offset,
+        # and the local day is within a day of the UTC day
+        spans_start = datetime.combine(rush_day, time(), timezone.utc) - timedelta(days=1)
+        spans_end = spans_start + timedelta(days=3)
+        span_starts = [spans_start, *self._offset_changes(spans_start, spans_end)]
+        span_ends = span_starts[1:] + [spans_end]
+        local_start = datetime.combine(rush_day, self.start_hour, timezone.utc)
+        local_end = datetime.combine(rush_day, self.end_hour, timezone.utc) + _ONE_MICROSECOND
+        intervals = []
+        for span_start, span_end in zip(span_starts, span_ends):
+            offset = span_start.astimezone(self._zone_info).utcoffset()
+            rush_start = max(local_start - offset, span_start)
+            rush_end = min(local_end - offset, span_end)
+            if rush_start >= rush_end:
+                continue
+            if intervals and intervals[-1][1] == rush_start:
+                intervals[-1] = (intervals[-1][0], rush_end)
+            else:
+                intervals.append((rush_start, rush_end))
+        return intervals
+
+    def _offset_changes(self, start: datetime, end: datetime) -> list:
+        '''Returns the times in UTC when the UTC offset changes between start and end.
+
+        Assumes that the offset changes at most once in a couple of days.
+        '''
+        start_offset = start.astimezone(self._zone_info).utcoffset()
+        if end.astimezone(self._zone_info).utcoffset() == start_offset:
+            return []
+        earlier, later = start, end
+        while later - earlier > _ONE_MICROSECOND:
+            middle = earlier + (later - earlier) // 2
+            if middle.astimezone(self._zone_info).utcoffset() == start_offset:
+                earlier = middle
+            else:
+                later = middle
+        return [later]
+
+    def _is_rush_outside_calendar(self, time_as_datetime: datetime) -> bool:
+        '''Tells whether a time outside of the calendar years is in the rush from its local time.'''
+        local_time = time_as_datetime.astimezone(self._zone_info)
+        return (
+            local_time.weekday() == self.weekday
+            and self.start_hour <= local_time.time() <= self.end_hour
+        )
+
+    def is_rush(self, time_as_datetime: datetime) -> bool:
+        '''Tells whether the timezone aware time is in the rush.
+
+        Looks up the rush of the UTC hour of the time, so that it takes
+        a dict lookup and, in the hours when the rush starts or ends,
+        a binary search of the boundaries, see rush_hours.
+        '''
+        if time_as_datetime.tzinfo is not timezone.utc:
+            time_as_datetime = time_as_datetime.astimezone(timezone.utc)
+        ordinal = time_as_datetime.toordinal()
+        if not self.first_ordinal <= ordinal < self.end_ordinal:
+            self._extend(time_as_datetime)
+            if not self.first_ordinal <= ordinal < self.end_ordinal:
+                return self._is_rush_outside_calendar(time_as_datetime)
+        rush = self.rush_hours.get(ordinal * 24 + time_as_datetime.hour, False)
+        if rush is None:
+            rush = bisect_right(self.boundaries, time_as_datetime) % 2 == 1
+        return rush
+
+    def changes_within_hour(self, time_as_datetime: datetime) -> bool:
+        '''Tells whether the rush starts or ends within the UTC hour of the timezone aware time.
+
+        Also True outside of CALENDAR_YEARS, where the hours are not tabulated.
+        '''
+        if time_as_datetime.tzinfo is not timezone.utc:
+            time_as_datetime = time_as_datetime.astimezone(timezone.utc)
+        ordinal = time_as_datetime.toordinal()
+        if not self.first_ordinal <= ordinal < self.end_ordinal:
+            self._extend(time_as_datetime)
+            if not self.first_ordinal <= ordinal < self.end_ordinal:
+                return True
+        return self.rush_hours.get(ordinal * 24 + time_as_datetime.hour, False) is None
+
+    def next_boundary(self, time_as_datetime: datetime) -> datetime:
+        '''Returns the first time in UTC after time_as_datetime when the rush starts or ends.
+
+        Until then is_rush gives the same result as at time_as_datetime.
+        '''
+        if time_as_datetime.tzinfo is not timezone.utc:
+            time_as_datetime = time_as_datetime.astimezone(timezone.utc)
+        if (
+                time_as_datetime.toordinal() < self.first_ordinal
+                or (time_as_datetime + _NEXT_BOUNDARY_DAYS).toordinal() >= self.end_ordinal
+        ):
+            self._extend(time_as_datetime)
+            self._extend(time_as_datetime + _NEXT_BOUNDARY_DAYS)
+        boundaries = self.boundaries
+        index = bisect_right(boundaries, time_as_datetime)
+        if 0 < index < len(boundaries):
+            return boundaries[index]
+        # outside of the calendar, the rushes of the weeks around the time are calculated
+        local_day = time_as_datetime.astimezone(self._zone_info).date()
+        rush_day = local_day + timedelta(days=(self.weekday - local_day.weekday()) % 7 - 7)
+        for week in range(3):
+            for rush_interval in self._rush_intervals(rush_day + timedelta(days=7 * week)):
+                for boundary in rush_interval:
+                    if boundary > time_as_datetime:
+                        return boundary
+        raise ValueError(f'No rush after {time_as_datetime}')
+
+    def is_rush_columnar(self, microseconds):
+        '''Tells for each UTC time in microseconds since the epoch whether it is in the rush.
+
+        microseconds is a one-dimensional int64 numpy array. Returns a numpy
+        array of booleans, looked up with one binary search per element.
+        '''
+        import numpy as np
+
+        if len(microseconds) > 0:
+            for extreme in (microseconds.min(), microseconds.max()):
+                self._extend(_EPOCH + timedelta(microseconds=int(extreme)))
+        first_ordinal, end_ordinal = self.first_ordinal, self.end_ordinal
+        boundaries = self.boundaries
+        # the array is cached with the list it was made from, which is replaced when the calendar grows
+        if self._boundary_microseconds is None or self._boundary_microseconds[0] is not boundaries:
+            self._boundary_microseconds = (boundaries, np.array(
+                [(boundary - _EPOCH) // _ONE_MICROSECOND for boundary in boundaries],
+                dtype=np.int64
+            ))
+        boundary_microseconds = self._boundary_microseconds[1]
+        is_rush = np.searchsorted(boundary_microseconds, microseconds, side='right') % 2 == 1
+        first_microseconds = (first_ordinal - _EPOCH_ORDINAL) * _MICROSECONDS_PER_DAY
+        end_microseconds = (end_ordinal - _EPOCH_ORDINAL) * _MICROSECONDS_PER_DAY
+        outside = np.flatnonzero((microseconds < first_microseconds) | (microseconds >= end_microseconds))
+        for index in outside:
+            is_rush[index] = self._is_rush_outside_calendar(
+                _EPOCH + timedelta(microseconds=int(microseconds[index]))
+            )
+        return is_rush
+
+
+@lru_cache(maxsize=16)
+def rush_calendar(time_zone: str, weekday: int, start_hour: time, end_hour: time) -> RushCalendar:
+    '''Returns the RushCalendar of a rush, creating it only the first time it is needed.
+
+    Raises zoneinfo.ZoneInfoNotFoundError if time_zone is not a known time zone.
+    '''
+    return RushCalendar(time_zone, weekday, start_hour, end_hour)
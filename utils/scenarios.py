@@ -0,0 +1,249 @@
+'''What-if pricing scenarios.
+
+This module contains the ScenarioResult class and the functions
+scenario_calculators and evaluate_scenarios for repricing an archive of
+order records under many fee configurations at once, for example to
+compare a higher rush multiplier or a lower maximum fee with the
+current rules.
+
+The records are read once, a chunk at a time. Within a chunk, each
+component of the fee, like the distance fee or the rush hours, is
+computed once for each distinct set of the parameters it depends on and
+shared by all scenarios that have the same parameters, so a scenario
+that only changes the rush multiplier or the maximum fee costs little
+more than the aggregation of its fees.
+'''
+from typing import NamedTuple
+import numpy as np
+from utils.delivery_fee_calculator import DeliveryFeeCalculator
+
+
+class ScenarioResult(NamedTuple):
+    '''
+    The aggregated delivery fees of a scenario.
+
+    ...
+
+    Attributes
+    ----------
+    order_count: int
+        The number of priced orders.
+    total_revenue: int
+        The sum of the rounded delivery fees in cents.
+    cap_hit_count: int
+        The number of orders whose fee was limited to the maximum delivery fee.
+    fees: numpy.ndarray
+        The distinct rounded delivery fees in cents in ascending order.
+    fee_counts: numpy.ndarray
+        The number of orders with each of the fees, so that fee_counts[i]
+        is the number of orders with a fee of fees[i] cents.
+
+    Methods
+    -------
+    cap_hit_share()
+        Returns the share of orders whose fee was limited to the maximum delivery fee.
+    mean_fee()
+        Returns the mean delivery fee in cents.
+    fee_percentile(fraction: float)
+        Returns the delivery fee below which fraction of the fees fall.
+    fee_histogram(bucket_cents: int)
+        Counts the orders in buckets of delivery fees.
+    as_dict()
+        Summarizes the result as a JSON serializable dict.
+    '''
+
+    order_count: int
+    total_revenue: int
+    cap_hit_count: int
+    fees: np.ndarray
+    fee_counts: np.ndarray
+
+    def cap_hit_share(self) -> float:
+        '''Returns the share of orders whose fee was limited to the maximum delivery fee.'''
+        return self.cap_hit_count / self.order_count if self.order_count else 0.0
+
+    def mean_fee(self) -> float:
+        '''Returns the mean delivery fee in cents.'''
+        return self.total_revenue / self.order_count if self.order_count else 0.0
+
+    def fee_percentile(self, fraction: float) -> int | None:
+        '''Returns the delivery fee below which fraction of the fees fall, by the nearest rank.
+
+        Returns None if there are no orders.
+        '''
+        if not self.order_count:
+            return None
+        rank = max(round(fraction * self.order_count), 1)
+        return int(self.fees[np.searchsorted(np.cumsum(self.fee_counts), rank)])
+
+    def fee_histogram(self, bucket_cents: int = 100) -> dict:
+        '''Counts the orders in buckets of delivery fees.
+
+        Returns a dict from the lowest fee of each bucket in cents to the
+        number of orders with a fee from it up to bucket_cents more.
+        Empty buckets are left out.
+        '''
+        buckets, bucket_counts = _sum_counts(self.fees // bucket_cents, self.fee_counts)
+        return {
+            int(bucket) * bucket_cents: int(count)
+            for bucket, count in zip(buckets, bucket_counts)
+        }
+
+    def as_dict(self, percentiles: tuple = (0.1, 0.5, 0.9, 0.99), bucket_cents: int = 100) -> dict:
+        '''Summarizes the result as a JSON serializable dict.'''
+        return {
+            'order_count': self.order_count,
+            'total_revenue': self.total_revenue,
+            'mean_fee': self.mean_fee(),
+            'fee_percentiles': {
+                f'p{fraction * 100:g}': self.fee_percentile(fraction) for fraction in percentiles
+            },
+            'fee_histogram': self.fee_histogram(bucket_cents),
+            'cap_hit_count': self.cap_hit_count,
+            'cap_hit_share': self.cap_hit_share(),
+        }
+
+
+def _count_fees(delivery_fees: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''Returns the distinct fees in ascending order and the number of orders with each.
+
+    np.bincount is faster than np.unique, but its memory grows with the
+    highest fee, so it is only used when the highest fee is low compared
+    to the number of fees.
+    '''
+    if len(delivery_fees) and delivery_fees.max() <= 4 * len(delivery_fees) + 65536:
+        fee_counts = np.bincount(delivery_fees)
+        fees = np.flatnonzero(fee_counts)
+        return fees, fee_counts[fees]
+    return np.unique(delivery_fees, return_counts=True)
+
+def _sum_counts(values: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''Returns the distinct values in ascending order and the sum of the counts of each.'''
+    distinct_values, inverse = np.unique(values, return_inverse=True)
+    summed_counts = np.zeros(len(distinct_values), dtype=np.int64)
+    np.add.at(summed_counts, inverse, counts)
+    return distinct_values, summed_counts
+
+def _distance_fees(delivery_distances: np.ndarray, plan) -> np.ndarray:
+    '''Calculates the distance fees, see DeliveryFeeCalculator.add_delivery_distance_fee.'''
+    number_of_additional_lengths = -(
+        -np.maximum(delivery_distances - plan.delivery_distance_start_meters, 0)
+        // plan.delivery_distance_additional_length_meters
+    )
+    return (
+        plan.delivery_distance_start_fee_cents
+        + number_of_additional_lengths * plan.delivery_distance_additional_length_fee_cents
+    )
+
+def _number_of_items_fees(numbers_of_items: np.ndarray, plan) -> np.ndarray:
+    '''Calculates the item and bulk fees, see DeliveryFeeCalculator.add_number_of_items_fee.'''
+    return (
+        np.maximum(numbers_of_items - plan.number_of_items_surcharge_limit, 0)
+        * plan.number_of_items_surcharge_fee_cents
+        + np.where(
+            numbers_of_items > plan.number_of_items_bulk_limit,
+            plan.number_of_items_bulk_fee_cents, 0
+        )
+    )
+
+def scenario_calculators(scenario_configs: dict, base_config: dict | None = None) -> dict:
+    '''Builds a calculator for each scenario of a dict of fee configurations.
+
+    scenario_configs maps scenario names to DeliveryFeeCalculator attributes,
+    as validated by FeeProfileSchema, that override base_config.
+    Attributes in neither keep their default values.
+    '''
+    return {
+        name: DeliveryFeeCalculator.from_config({**(base_config or {}), **scenario_config})
+        for name, scenario_config in scenario_configs.items()
+    }
+
+def evaluate_scenarios(
+        records: np.ndarray, calculators: dict, chunk_size: int = 1_000_000
+) -> dict:
+    '''Prices order records under each scenario and aggregates the delivery fees.
+
+    records is an array of utils.order_records.RECORD_DTYPE, for example
+    from read_order_records, and calculators maps scenario names to
+    DeliveryFeeCalculator objects. The records are read once, chunk_size
+    records at a time. Returns a dict from scenario names to ScenarioResult,
+    with the fees rounded as by the delivery fee end points.
+    '''
+    plans = {name: calculator.compile_pricing_plan() for name, calculator in calculators.items()}
+    total_revenues = dict.fromkeys(calculators, 0)
+    cap_hit_counts = dict.fromkeys(calculators, 0)
+    fees = {name: np.zeros(0, dtype=np.int64) for name in calculators}
+    fee_counts = {name: np.zeros(0, dtype=np.int64) for name in calculators}
+
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        cart_values = chunk['cart_value'].astype(np.int64)
+        delivery_distances = chunk['delivery_distance'].astype(np.int64)
+        numbers_of_items = chunk['number_of_items'].astype(np.int64)
+        times = chunk['time'].astype(np.int64)
+        components = {}
+
+        def component(key: tuple, compute):
+            '''Returns the component of key, computing it only for the first scenario.'''
+            if key not in components:
+                components[key] = compute()
+            return components[key]
+
+        for name, calculator in calculators.items():
+            plan = plans[name]
+            distance_key = (
+                'distance', plan.delivery_distance_start_meters,
+                plan.delivery_distance_start_fee_cents,
+                plan.delivery_distance_additional_length_meters,
+                plan.delivery_distance_additional_length_fee_cents,
+            )
+            items_key = (
+                'items', plan.number_of_items_surcharge_limit,
+                plan.number_of_items_surcharge_fee_cents,
+                plan.number_of_items_bulk_limit, plan.number_of_items_bulk_fee_cents,
+            )
+            cart_value_key = (
+                'cart_value', plan.cart_value_surcharge_limit_cents,
+                plan.cart_value_free_delivery_limit_cents,
+            )
+            rush_key = (
+                'rush', calculator.time_zone, calculator.time_rush_weekday,
+                calculator.time_rush_start_hour, calculator.time_rush_end_hour,
+            )
+
+            # fees before the rush multiplier, see calculate_delivery_fees_columnar
+            subtotal_key = ('subtotal', distance_key, items_key, cart_value_key)
+            subtotals = component(subtotal_key, lambda: np.where(
+                (cart_values >= plan.cart_value_surcharge_limit_cents)
+                & (cart_values >= plan.cart_value_free_delivery_limit_cents), 0,
+                component(distance_key, lambda: _distance_fees(delivery_distances, plan))
+                + component(items_key, lambda: _number_of_items_fees(numbers_of_items, plan))
+                + component(cart_value_key, lambda: np.maximum(
+                    plan.cart_value_surcharge_limit_cents - cart_values, 0
+                ))
+            ).astype(np.float64))
+            is_rush = component(rush_key, lambda: plan.rush_calendar.is_rush_columnar(times))
+            uncapped_fees = component(
+                ('uncapped', subtotal_key, rush_key, plan.time_rush_multiplier),
+                lambda: np.where(is_rush, subtotals * plan.time_rush_multiplier, subtotals)
+            )
+
+            is_capped = uncapped_fees > plan.max_delivery_fee
+            delivery_fees = np.rint(
+                np.minimum(uncapped_fees, plan.max_delivery_fee)
+            ).astype(np.int64)
+            total_revenues[name] += int(delivery_fees.sum())
+            cap_hit_counts[name] += int(np.count_nonzero(is_capped))
+            chunk_fees, chunk_fee_counts = _count_fees(delivery_fees)
+            fees[name], fee_counts[name] = _sum_counts(
+                np.concatenate((fees[name], chunk_fees)),
+                np.concatenate((fee_counts[name], chunk_fee_counts))
+            )
+
+    return {
+        name: ScenarioResult(
+            len(records), total_revenues[name], cap_hit_counts[name],
+            fees[name], fee_counts[name]
+        )
+        for name in calculators
+    }
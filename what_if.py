@@ -0,0 +1,102 @@
+'''What-if repricing of an order archive under several fee configurations.
+
+Reads a file of binary order records, made with convert_orders.py, once
+and prices it under each scenario of a JSON scenario file, which maps
+scenario names to the fees they change, for example:
+{"current": {}, "rush 1.3": {"time_rush_multiplier": 1.3}, "cap 12 euros": {"max_delivery_fee": 1200}}
+Prints the total revenue, fee distribution and share of orders hitting
+the maximum delivery fee of each scenario, see utils.scenarios.
+
+Usage, from the root folder of the project:
+python3 what_if.py orders.bin --scenarios scenarios.json --output results.json
+'''
+import argparse
+import json
+from marshmallow import ValidationError
+from schemas.fee_config import FeeProfileSchema
+from utils.fee_config import load_fee_config, profile_calculator_configs
+from utils.order_records import read_order_records
+from utils.scenarios import evaluate_scenarios, scenario_calculators
+
+
+def parse_args(args: list | None = None) -> argparse.Namespace:
+    '''Reads the command line arguments.'''
+    parser = argparse.ArgumentParser(
+        description='Reprices order records under several fee configurations.'
+    )
+    parser.add_argument('input', help='file of order records made with convert_orders.py')
+    parser.add_argument(
+        '--scenarios', required=True, help='JSON file of the fees changed by each scenario'
+    )
+    parser.add_argument(
+        '--fee-config', help='fee configuration the scenarios change, by default the default fees'
+    )
+    parser.add_argument(
+        '--profile', help='pricing profile of the fee configuration, by default its default profile'
+    )
+    parser.add_argument('--output', help='file to write the results to as JSON')
+    parser.add_argument(
+        '--chunk-size', type=int, default=1_000_000, help='number of orders priced at a time'
+    )
+    return parser.parse_args(args)
+
+def load_scenarios(args: argparse.Namespace) -> dict:
+    '''Builds a calculator for each scenario of args.scenarios.
+
+    Raises marshmallow.ValidationError if a scenario or the fee configuration is not valid.
+    '''
+    base_config = {}
+    if args.fee_config:
+        calculator_configs, default_profile_name = profile_calculator_configs(
+            load_fee_config(args.fee_config)
+        )
+        profile_name = args.profile or default_profile_name
+        if profile_name not in calculator_configs:
+            raise ValidationError('Not one of the profiles.', 'profile')
+        base_config = calculator_configs[profile_name]
+        base_config.pop('currency', None)
+    with open(args.scenarios, encoding='utf-8') as scenarios_file:
+        scenario_configs = json.load(scenarios_file)
+    fee_profile_schema = FeeProfileSchema(exclude=['currency'])
+    errors = {}
+    for name, scenario_config in scenario_configs.items():
+        try:
+            scenario_configs[name] = fee_profile_schema.load(scenario_config)
+        except ValidationError as error:
+            errors[name] = error.messages
+    if errors:
+        raise ValidationError(errors)
+    return scenario_calculators(scenario_configs, base_config)
+
+def print_results(results: dict):
+    '''Prints the results of each scenario, with the revenue compared to the first one.'''
+    print(
+        f'{"scenario":<20} {"revenue":>14} {"change":>8} {"mean":>8} {"p50":>6} '
+        f'{"p90":>6} {"p99":>6} {"capped":>8}'
+    )
+    base_revenue = next(iter(results.values())).total_revenue if results else 0
+    for name, result in results.items():
+        change = result.total_revenue / base_revenue - 1 if base_revenue else 0.0
+        print(
+            f'{name:<20} {result.total_revenue:>14} {change:>+8.1%} {result.mean_fee():>8.1f} '
+            f'{result.fee_percentile(0.5)!s:>6} {result.fee_percentile(0.9)!s:>6} '
+            f'{result.fee_percentile(0.99)!s:>6} {result.cap_hit_share():>8.2%}'
+        )
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    try:
+        calculators = load_scenarios(arguments)
+    except ValidationError as validation_error:
+        raise SystemExit(f'Invalid scenarios: {validation_error.messages}') from validation_error
+    scenario_results = evaluate_scenarios(
+        read_order_records(arguments.input), calculators, arguments.chunk_size
+    )
+    print_results(scenario_results)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as output_file:
+            json.dump(
+                {name: result.as_dict() for name, result in scenario_results.items()},
+                output_file, indent=2
+            )
@@ -0,0 +1,9 @@
+'''WSGI entry point.
+
+Exposes the Flask app as the module level variable app,
+so that any WSGI server can serve it, for example:
+gunicorn --workers 4 --threads 8 wsgi:app
+'''
+from main import create_app
+
+app = create_app()